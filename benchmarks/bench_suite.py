@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Reproducible load-test scenarios for the MCP server
+
+Runs mcp_sse_server.app in this process under uvicorn (on its own thread
+and event loop, so the load generator doesn't steal its scheduling), with
+its WordPress client wired to benchmarks/fake_wordpress.py through an
+in-process httpx.ASGITransport - no real site and no network hop to one. Each scenario drives /mcp or /sse at a fixed concurrency for a
+fixed time and reports requests/s, p50/p95/p99 latency and memory use.
+
+Results are printed as a table and, with --output, written as JSON;
+--compare checks them against an earlier JSON file and exits with status 1
+when a scenario regressed by more than --max-regression.
+
+Usage:
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --scenarios get_posts,sse_get_posts --wp-error-rate 0.02
+    python benchmarks/bench_suite.py --compare results.json --max-regression 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import uvicorn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_DIR = tempfile.mkdtemp(prefix="wpmcp-bench-")
+
+# The server reads its settings at import time
+os.environ.update({
+    "WPMCP_WORDPRESS_URL": "http://fake-wordpress/",
+    "WPMCP_LOG_LEVEL": "WARNING",
+    "WPMCP_HTTP_WARMUP_CONNECTIONS": "0",
+    "WPMCP_WORKERS": "1",
+    "WPMCP_MIRROR_ENABLED": "false",
+    "WPMCP_ADMISSION_CLIENT_RATE": "0",  # all load comes from one address
+    "WPMCP_JOB_JOURNAL_PATH": os.path.join(STATE_DIR, "jobs.sqlite3"),
+    "WPMCP_MEDIA_INDEX_PATH": os.path.join(STATE_DIR, "media.sqlite3")
+})
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_wordpress  # noqa: E402
+import mcp_sse_server  # noqa: E402
+
+try:
+    import uvloop
+    new_event_loop = uvloop.new_event_loop  # what uvicorn itself would use
+except ImportError:
+    new_event_loop = asyncio.new_event_loop
+
+Call = Callable[[httpx.AsyncClient, int], Awaitable[bool]]
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB"""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        # Peak instead of current where /proc isn't available (kB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+def percentile(values: List[float], share: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+def tool_call(name: str, arguments: Dict[str, Any], request_id: Any = 1) -> Dict[str, Any]:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": name, "arguments": arguments}
+    }
+
+def succeeded(response: Dict[str, Any]) -> bool:
+    """True if a tools/call response carries a successful tool result"""
+    if "error" in response:
+        return False
+    text = response.get("result", {}).get("content", [{}])[0].get("text", "{}")
+    return json.loads(text).get("success", True) is not False
+
+async def post_mcp(client: httpx.AsyncClient, message: Dict[str, Any]) -> bool:
+    response = await client.post("/mcp", json=message)
+    return response.status_code == 200 and succeeded(response.json())
+
+# ============================================================================
+# Scenarios
+# ============================================================================
+
+async def call_tools_list(client: httpx.AsyncClient, worker: int) -> bool:
+    response = await client.post("/mcp", json={"jsonrpc": "2.0", "id": worker, "method": "tools/list"})
+    return response.status_code == 200
+
+async def call_get_posts(client: httpx.AsyncClient, worker: int) -> bool:
+    return await post_mcp(client, tool_call("get_posts", {"per_page": 20, "page": random.randint(1, 20)}, worker))
+
+async def call_get_posts_hot(client: httpx.AsyncClient, worker: int) -> bool:
+    return await post_mcp(client, tool_call("get_posts", {"per_page": 10, "page": random.randint(1, 3)}, worker))
+
+async def call_get_post(client: httpx.AsyncClient, worker: int) -> bool:
+    return await post_mcp(client, tool_call("get_post", {"post_id": random.randint(1, fake_wordpress.POST_COUNT)}, worker))
+
+async def call_update_post(client: httpx.AsyncClient, worker: int) -> bool:
+    post_id = random.randint(1, fake_wordpress.POST_COUNT)
+    arguments = {"post_id": post_id, "title": f"Post {post_id} rev {random.randint(0, 10 ** 9)}"}
+    return await post_mcp(client, tool_call("update_post", arguments, worker))
+
+class SSEClient:
+    """One MCP-over-SSE session: POSTs messages and waits for their answers on the stream"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.endpoint: Optional[str] = None
+        self._pending: Dict[Any, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def open(self):
+        self._task = asyncio.ensure_future(self._read())
+        await asyncio.wait_for(self._ready.wait(), 10.0)
+
+    async def _read(self):
+        async with self.client.stream("GET", "/sse") as response:
+            event, data = "", []
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].strip())
+                elif not line and event:
+                    self._dispatch(event, "\n".join(data))
+                    event, data = "", []
+
+    def _dispatch(self, event: str, data: str):
+        if event == "endpoint":
+            self.endpoint = data
+            self._ready.set()
+        elif event == "message":
+            message = json.loads(data)
+            waiter = self._pending.pop(message.get("id"), None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(message)
+
+    async def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        waiter = asyncio.get_running_loop().create_future()
+        self._pending[message["id"]] = waiter
+        response = await self.client.post(self.endpoint, json=message)
+        if response.status_code != 202:
+            self._pending.pop(message["id"], None)
+            return {"error": {"code": response.status_code}}
+        return await asyncio.wait_for(waiter, 30.0)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, httpx.HTTPError):
+                pass
+
+class SSEGetPosts:
+    """get_posts over MCP-over-SSE sessions, one session per simulated client"""
+
+    def __init__(self):
+        self.sessions: Dict[int, SSEClient] = {}
+        self.counter = 0
+
+    async def __call__(self, client: httpx.AsyncClient, worker: int) -> bool:
+        session = self.sessions.get(worker)
+        if session is None:
+            session = self.sessions[worker] = SSEClient(client)
+            await session.open()
+        self.counter += 1
+        message = tool_call("get_posts", {"per_page": 20, "page": random.randint(1, 20)}, self.counter)
+        return succeeded(await session.request(message))
+
+    async def close(self):
+        await asyncio.gather(*(session.close() for session in self.sessions.values()))
+
+# name -> (description, factory returning the per-request coroutine, post caches on?)
+SCENARIOS: Dict[str, Any] = {
+    "tools_list": ("tools/list on /mcp (static, ETag-able response)", lambda: call_tools_list, True),
+    "get_posts": ("get_posts on /mcp, 20 pages, cache off", lambda: call_get_posts, False),
+    "get_posts_cached": ("get_posts on /mcp, 3 hot pages, cache on", lambda: call_get_posts_hot, True),
+    "get_post": ("get_post on /mcp, random IDs batched by the post loader, cache off", lambda: call_get_post, False),
+    "update_post": ("update_post on /mcp (diff prefetch + write)", lambda: call_update_post, False),
+    "sse_get_posts": ("get_posts through MCP-over-SSE sessions, cache off", SSEGetPosts, False),
+}
+
+# ============================================================================
+# Runner
+# ============================================================================
+
+async def run_scenario(base_url: str, name: str, concurrency: int, duration: float, warmup: float) -> Dict[str, Any]:
+    description, factory, cached = SCENARIOS[name]
+    wp = mcp_sse_server.sites.get(mcp_sse_server.sites.default)
+    wp.posts_cache = mcp_sse_server.TTLCache(mcp_sse_server.POSTS_CACHE_MAX_ENTRIES, mcp_sse_server.POSTS_CACHE_TTL if cached else 0)
+    wp.post_cache = mcp_sse_server.TTLCache(mcp_sse_server.POST_CACHE_MAX_ENTRIES, mcp_sse_server.POST_CACHE_TTL if cached else 0)
+    call = factory()
+
+    latencies: List[float] = []
+    errors = 0
+    peak_rss = rss_mb()
+
+    async def client_loop(client: httpx.AsyncClient, worker: int, deadline: float, record: bool):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = await call(client, worker)
+            except (httpx.HTTPError, asyncio.TimeoutError, ValueError):
+                ok = False
+            if not record:
+                continue
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    async def sample_memory():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, rss_mb())
+            await asyncio.sleep(0.1)
+
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        if warmup > 0:
+            deadline = time.monotonic() + warmup
+            await asyncio.gather(*(client_loop(client, i, deadline, False) for i in range(concurrency)))
+
+        rss_before = rss_mb()
+        sampler = asyncio.ensure_future(sample_memory())
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(client_loop(client, i, deadline, True) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+        sampler.cancel()
+        if hasattr(call, "close"):
+            await call.close()
+
+    latencies.sort()
+    return {
+        "name": name,
+        "description": description,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "rss_before_mb": round(rss_before, 1),
+        "rss_peak_mb": round(max(peak_rss, rss_mb()), 1),
+        "rss_after_mb": round(rss_mb(), 1)
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class ServerThread(threading.Thread):
+    """The MCP server under uvicorn on a separate thread and event loop"""
+
+    def __init__(self, port: int):
+        super().__init__(daemon=True)
+        self.server = uvicorn.Server(uvicorn.Config(mcp_sse_server.app, host="127.0.0.1", port=port, log_level="warning"))
+        self.loop = new_event_loop()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+        self.loop.close()
+
+    def call(self, coroutine: Awaitable[Any]) -> Any:
+        """Run a coroutine on the server's loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def stop(self):
+        self.server.should_exit = True
+        self.join()
+
+async def use_fake_wordpress():
+    """Route the server's WordPress traffic to the in-process fake (runs on the server loop)"""
+    wp = mcp_sse_server.sites.get(mcp_sse_server.sites.default)
+    await wp.client.aclose()
+    wp.client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_wordpress.app),
+        auth=("bench", "bench"),
+        timeout=wp.client.timeout,
+        headers={"Content-Type": "application/json"}
+    )
+
+async def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    fake_wordpress.LATENCY = args.wp_latency
+    fake_wordpress.ERROR_RATE = args.wp_error_rate
+
+    port = free_port()
+    server = ServerThread(port)
+    server.start()
+    while not server.server.started:
+        if not server.is_alive():
+            raise RuntimeError("MCP server failed to start")
+        await asyncio.sleep(0.05)
+    server.call(use_fake_wordpress())
+
+    results = []
+    try:
+        for name in args.scenarios.split(","):
+            result = await run_scenario(f"http://127.0.0.1:{port}", name, args.concurrency, args.duration, args.warmup)
+            results.append(result)
+            print(f"{name}: {result['rps']:.0f} req/s, p99 {result['p99_ms']:.1f} ms", file=sys.stderr, flush=True)
+    finally:
+        server.stop()
+
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "wp_latency_s": args.wp_latency,
+            "wp_error_rate": args.wp_error_rate,
+            "wp_posts": fake_wordpress.POST_COUNT,
+            "seed": args.seed
+        },
+        "scenarios": results
+    }
+
+def print_table(report: Dict[str, Any]):
+    print(f"{'scenario':<18} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'peak MiB':>9}")
+    for result in report["scenarios"]:
+        print(
+            f"{result['name']:<18} {result['rps']:>9.0f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+            f"{result['p99_ms']:>8.1f} {result['errors']:>7} {result['rss_peak_mb']:>9.1f}"
+        )
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> bool:
+    """Print throughput and p99 changes against baseline; False if any scenario regressed"""
+    previous = {result["name"]: result for result in baseline.get("scenarios", [])}
+    ok = True
+    print()
+    print(f"Compared with {baseline.get('revision') or 'baseline'} (max regression {max_regression:.0%}):")
+    if baseline.get("settings") != report["settings"]:
+        print(f"  note: baseline was run with different settings: {baseline.get('settings')}")
+    for result in report["scenarios"]:
+        base = previous.get(result["name"])
+        if base is None or not base["rps"] or not base["p99_ms"]:
+            continue
+        rps_change = result["rps"] / base["rps"] - 1
+        p99_change = result["p99_ms"] / base["p99_ms"] - 1
+        regressed = rps_change < -max_regression or p99_change > max_regression
+        ok = ok and not regressed
+        print(
+            f"  {result['name']:<18} req/s {rps_change:+7.1%}  p99 {p99_change:+7.1%}"
+            f"{'  REGRESSION' if regressed else ''}"
+        )
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP server load-test scenarios against an in-process fake WordPress")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent simulated clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each scenario")
+    parser.add_argument("--wp-latency", type=float, default=0.01, help="Fake WordPress delay per request (s)")
+    parser.add_argument("--wp-error-rate", type=float, default=0.0, help="Share of fake WordPress requests failing with 503")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for request parameters and errors")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="Allowed req/s drop or p99 rise (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios.split(",") if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    random.seed(args.seed)
+
+    try:
+        report = asyncio.run(run_suite(args))
+    finally:
+        shutil.rmtree(STATE_DIR, ignore_errors=True)
+    print_table(report)
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+    if args.compare:
+        with open(args.compare) as handle:
+            if not compare(report, json.load(handle), args.max_regression):
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
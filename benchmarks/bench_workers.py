@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Throughput of the MCP server with 1..N worker processes
+
+Starts benchmarks/fake_wordpress.py, then runs mcp_sse_server.py with each
+requested WORKERS value (configured through WPMCP_* environment variables)
+and drives concurrent tools/call get_posts requests against /mcp.
+The get_posts cache is disabled so every call does the full request path.
+
+Usage:
+    python benchmarks/bench_workers.py --workers 1,2,4 --concurrency 64 --duration 15
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable] + args,
+        cwd=ROOT,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+def stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+async def run_load(url: str, concurrency: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client: httpx.AsyncClient, worker: int):
+        nonlocal errors
+        request_id = 0
+        while time.monotonic() < deadline:
+            request_id += 1
+            message = {
+                "jsonrpc": "2.0",
+                "id": f"{worker}-{request_id}",
+                "method": "tools/call",
+                "params": {
+                    "name": "get_posts",
+                    "arguments": {"per_page": 20, "page": random.randint(1, 20)}
+                }
+            }
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=message)
+                ok = response.status_code == 200 and "error" not in response.json()
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(client_loop(client, i) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="MCP server throughput vs. worker processes")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated WORKERS values")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent client requests")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per measurement")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the MCP server")
+    parser.add_argument("--wp-port", type=int, default=8081, help="Port for the fake WordPress")
+    parser.add_argument("--wp-latency", type=float, default=0.005, help="Fake WordPress delay (s)")
+    args = parser.parse_args()
+
+    fake_wp = start(
+        ["benchmarks/fake_wordpress.py", "--port", str(args.wp_port)],
+        {"FAKE_WP_LATENCY": str(args.wp_latency)}
+    )
+    results = []
+    try:
+        await wait_ready(f"http://127.0.0.1:{args.wp_port}/wp-json/wp/v2/posts")
+
+        for workers in [int(value) for value in args.workers.split(",")]:
+            with tempfile.TemporaryDirectory() as state_dir:
+                server = start(["mcp_sse_server.py"], {
+                    "WPMCP_WORDPRESS_URL": f"http://127.0.0.1:{args.wp_port}/",
+                    "WPMCP_SERVER_HOST": "127.0.0.1",
+                    "WPMCP_SERVER_PORT": str(args.port),
+                    "WPMCP_WORKERS": str(workers),
+                    "WPMCP_SHARED_STATE_DIR": state_dir,
+                    "WPMCP_LOG_LEVEL": "WARNING",
+                    "WPMCP_POSTS_CACHE_TTL": "0",
+                    "WPMCP_ADMISSION_CLIENT_RATE": "0",
+                    "WPMCP_HTTP_WARMUP_CONNECTIONS": "0"
+                })
+                try:
+                    await wait_ready(f"http://127.0.0.1:{args.port}/health")
+                    await run_load(f"http://127.0.0.1:{args.port}/mcp", args.concurrency, 2.0)  # warm-up
+                    result = await run_load(f"http://127.0.0.1:{args.port}/mcp", args.concurrency, args.duration)
+                finally:
+                    stop(server)
+            result["workers"] = workers
+            results.append(result)
+            print(f"workers={workers}: {result['rps']:.0f} req/s", flush=True)
+    finally:
+        stop(fake_wp)
+
+    baseline = results[0]["rps"] if results else 0
+    print()
+    print(f"CPU cores: {os.cpu_count()}, concurrency: {args.concurrency}, duration: {args.duration}s")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for result in results:
+        speedup = result["rps"] / baseline if baseline else 0.0
+        print(
+            f"{result['workers']:>8} {result['rps']:>10.0f} {speedup:>7.2f}x "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['errors']:>7}"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
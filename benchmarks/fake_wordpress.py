@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Minimal fake WordPress REST API for benchmarks
+
+Serves /wp-json/wp/v2/posts from memory with a configurable response delay
+and error rate, so benchmarks measure the MCP server and not a real
+WordPress site. Runs as a standalone server or in-process as an ASGI app
+(bench_suite.py mounts `app` behind an httpx.ASGITransport).
+
+Usage:
+    FAKE_WP_POSTS=500 FAKE_WP_LATENCY=0.02 FAKE_WP_ERROR_RATE=0.01 python benchmarks/fake_wordpress.py --port 8081
+"""
+
+import argparse
+import asyncio
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+POST_COUNT = int(os.environ.get("FAKE_WP_POSTS", "500"))  # Posts served
+LATENCY = float(os.environ.get("FAKE_WP_LATENCY", "0.02"))  # Seconds added to every response
+ERROR_RATE = float(os.environ.get("FAKE_WP_ERROR_RATE", "0"))  # Share of requests answered with 503
+
+app = FastAPI(title="Fake WordPress")
+
+def make_post(post_id: int, title: str, content: str, status: str = "publish") -> Dict[str, Any]:
+    return {
+        "id": post_id,
+        "title": {"raw": title, "rendered": title},
+        "content": {"raw": content, "rendered": content},
+        "excerpt": {"raw": "", "rendered": ""},
+        "status": status,
+        "date": "2025-01-01T00:00:00",
+        "modified": "2025-01-01T00:00:00",
+        "modified_gmt": "2025-01-01T00:00:00",
+        "link": f"https://example.com/?p={post_id}",
+        "slug": f"post-{post_id}"
+    }
+
+posts: Dict[int, Dict[str, Any]] = {
+    post_id: make_post(post_id, f"Post {post_id}", f"<p>Content of post {post_id}</p>" * 20)
+    for post_id in range(1, POST_COUNT + 1)
+}
+next_id = POST_COUNT + 1
+revision = 0
+
+def project(post: Dict[str, Any], fields: str) -> Dict[str, Any]:
+    if not fields:
+        return post
+    names = {name.split(".")[0] for name in fields.split(",")}
+    return {key: value for key, value in post.items() if key in names}
+
+async def simulate() -> Optional[Response]:
+    """Apply the configured latency; returns an error response for a share of requests"""
+    await asyncio.sleep(LATENCY)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse({"code": "fake_unavailable", "message": "Injected error"}, status_code=503)
+    return None
+
+@app.head("/wp-json/")
+async def index():
+    return Response()
+
+@app.get("/wp-json/wp/v2/posts")
+async def list_posts(request: Request):
+    error = await simulate()
+    if error:
+        return error
+    params = request.query_params
+    per_page = int(params.get("per_page", 10))
+    page = int(params.get("page", 1))
+    selected = posts.values()
+    if params.get("include"):
+        included = {int(post_id) for post_id in params["include"].split(",")}
+        selected = [post for post in selected if post["id"] in included]
+    ordered: List[Dict[str, Any]] = sorted(
+        selected,
+        key=lambda post: post["id"],
+        reverse=params.get("order", "desc") == "desc"
+    )
+    chunk = ordered[(page - 1) * per_page:page * per_page]
+    return JSONResponse(
+        [project(post, params.get("_fields", "")) for post in chunk],
+        headers={
+            "X-WP-Total": str(len(ordered)),
+            "X-WP-TotalPages": str(max((len(ordered) + per_page - 1) // per_page, 1))
+        }
+    )
+
+@app.post("/wp-json/wp/v2/posts")
+async def create_post(request: Request):
+    global next_id
+    error = await simulate()
+    if error:
+        return error
+    data = await request.json()
+    post = make_post(next_id, data.get("title", ""), data.get("content", ""), data.get("status", "draft"))
+    posts[next_id] = post
+    next_id += 1
+    return JSONResponse(post, status_code=201)
+
+@app.get("/wp-json/wp/v2/posts/{post_id}")
+async def get_post(post_id: int, request: Request):
+    error = await simulate()
+    if error:
+        return error
+    if post_id not in posts:
+        return JSONResponse({"code": "rest_post_invalid_id"}, status_code=404)
+    return JSONResponse(project(posts[post_id], request.query_params.get("_fields", "")))
+
+@app.post("/wp-json/wp/v2/posts/{post_id}")
+async def update_post(post_id: int, request: Request):
+    global revision
+    error = await simulate()
+    if error:
+        return error
+    if post_id not in posts:
+        return JSONResponse({"code": "rest_post_invalid_id"}, status_code=404)
+    post = posts[post_id]
+    for field, value in (await request.json()).items():
+        if field in ("title", "content", "excerpt"):
+            post[field] = {"raw": value, "rendered": value}
+        else:
+            post[field] = value
+    revision += 1
+    post["modified"] = post["modified_gmt"] = f"2025-01-02T{revision // 3600 % 24:02d}:{revision // 60 % 60:02d}:{revision % 60:02d}"
+    return JSONResponse(post)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -1,15 +1,29 @@
 """
 WordPress MCP Server Configuration Example
 Copy this file to config.py and fill in your credentials
+
+Any constant from the CONFIGURATION block of mcp_sse_server.py can be set
+here. Environment variables WPMCP_<NAME> take precedence over this file.
 """
 
 # WordPress Site Configuration
 WORDPRESS_URL = "https://your-wordpress-site.com/"
 WORDPRESS_USERNAME = "your-username"
 WORDPRESS_PASSWORD = "your-application-password"
+# WORDPRESS_AUTH = "jwt"  # exchange the password once for a bearer token (needs a JWT auth plugin)
+
+# Several sites in one process (replaces the three settings above when set)
+# SITES = {
+#     "blog": {"url": "https://blog.example.com/", "username": "editor", "password": "app-password"},
+#     "shop": {"url": "https://shop.example.com/", "username": "bot", "password": "app-password", "rate_limit": 5},
+# }
+# DEFAULT_SITE = "blog"
 
 # Server Configuration
 SERVER_HOST = "0.0.0.0"
 SERVER_PORT = 8000
 LOG_LEVEL = "INFO"
 
+# Worker processes (share the get_posts cache and SSE session routing)
+WORKERS = 1
+SHARED_STATE_DIR = ""  # "" = $XDG_RUNTIME_DIR/wordpress-mcp or a per-user temp dir; must be mode 700
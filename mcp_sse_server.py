@@ -5,16 +5,45 @@ Provides WordPress post management through Model Context Protocol over SSE
 """
 
 import asyncio
+import atexit
+import base64
+import bisect
+import hashlib
+import hmac
+import html
+import importlib.util
+import ipaddress
 import json
 import logging
+import logging.handlers
+import math
+import mimetypes
+import os
+import queue
+import random
+import re
+import socket
+import sqlite3
+import stat
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from typing import Any, Dict, List, Optional
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+from urllib.parse import quote, urlparse
 
 import httpx
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 from sse_starlette.sse import EventSourceResponse
@@ -26,462 +55,6116 @@ from sse_starlette.sse import EventSourceResponse
 WORDPRESS_URL = "https://your-wordpress-site.com/"  # Your WordPress site URL (with trailing slash)
 WORDPRESS_USERNAME = "your-username"  # Your WordPress username
 WORDPRESS_PASSWORD = "your-password"  # Your WordPress application password
+WORDPRESS_AUTH = "basic"  # basic (application password on every request) or jwt (exchanged once for a bearer token)
+
+# Bearer tokens (WORDPRESS_AUTH = "jwt", needs a JWT auth plugin on the site)
+WORDPRESS_TOKEN_PATH = "jwt-auth/v1/token"  # Token endpoint under /wp-json/
+WORDPRESS_TOKEN_TTL = 3600.0  # Seconds a token is trusted when it carries no exp claim
+WORDPRESS_TOKEN_REFRESH_MARGIN = 300.0  # Seconds before expiry a new token is requested in the background
+WORDPRESS_TOKEN_RETRY_INTERVAL = 60.0  # Seconds Basic auth is used after a failed token request
+
+# Several WordPress sites in one process (tools take a "site" argument, or use /sites/<name>/mcp)
+SITES = {}  # name -> {"url", "username", "password", optional per-site limits}; empty = only WORDPRESS_URL
+DEFAULT_SITE = ""  # Site used when a call doesn't name one ("" = first entry of SITES)
+SITE_IDLE_TIMEOUT = 600.0  # Seconds an unused site client stays open
+SITE_MAX_CLIENTS = 50  # Site clients open at once; the least recently used idle ones are closed first
+SITE_RATE_LIMIT = 0.0  # Requests per second sent to each site (0 = unlimited)
+
+# Admission control for tool calls (per client address, see TRUSTED_PROXIES)
+ADMISSION_ENABLED = True  # Rate-limit clients and queue tool calls in read/write lanes
+ADMISSION_CLIENT_RATE = 20.0  # Tool calls per second per client (0 = unlimited)
+ADMISSION_CLIENT_BURST = 100  # Calls a client may make back to back before the rate applies
+ADMISSION_READ_CONCURRENCY = 16  # Read tool calls executed at once
+ADMISSION_WRITE_CONCURRENCY = 4  # Write tool calls executed at once (bulk writers can't take the read slots)
+ADMISSION_MAX_QUEUE = 200  # Calls waiting per lane; further calls are refused
+ADMISSION_READ_MAX_WAIT = 2.0  # Seconds a read may wait for a slot before it is refused
+ADMISSION_WRITE_MAX_WAIT = 30.0  # Seconds a write may wait for a slot before it is refused
+ADMISSION_SCAN_CONCURRENCY = 2  # Full-site scans (iter_posts, streamed or not) running at once
+ADMISSION_SCAN_MAX_WAIT = 10.0  # Seconds a scan may wait for a slot before it is refused
+
+# JSON-RPC batch requests on /mcp
+MCP_BATCH_MAX_SIZE = 100  # Maximum number of messages in one batch
+MCP_BATCH_CONCURRENCY = 8  # Maximum number of messages processed in parallel
+
+# Bulk post tools (create_posts, update_posts, delete_posts)
+BULK_DEFAULT_BATCH_SIZE = 25  # Used when the site doesn't advertise its batch limit
+BULK_FALLBACK_CONCURRENCY = 5  # Parallel requests when /batch/v1 is unavailable
+
+# get_posts read-through cache (invalidated by our own writes)
+POSTS_CACHE_TTL = 30.0  # Seconds a listing stays fresh (0 disables the cache)
+POSTS_CACHE_MAX_ENTRIES = 256  # Listings kept before LRU eviction
+
+# Single-post reads (get_post, get_posts_by_ids)
+POST_LOADER_WINDOW = 0.005  # Seconds concurrent lookups are collected into one /posts?include= request
+POST_CACHE_TTL = 30.0  # Seconds a fetched post is reused (0 disables the cache)
+POST_CACHE_MAX_ENTRIES = 1024  # Posts kept before LRU eviction
+POST_NEGATIVE_CACHE_TTL = 10.0  # Seconds an ID WordPress didn't return is answered as missing
+
+# Diff-aware update_post
+UPDATE_DIFF_ENABLED = True  # Send only fields that differ from the current post
+UPDATE_DIFF_CACHE_ENTRIES = 256  # Posts whose raw field values are remembered between updates
+
+# iter_posts full-site scans
+ITER_POSTS_PREFETCH = 2  # Pages requested ahead of the page being processed
+ITER_POSTS_MAX_BUFFERED = 1000  # Posts returned when the client can't stream
+
+# Upstream WordPress connection pool
+HTTP_MAX_CONNECTIONS = 20  # Total connections to WordPress
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10  # Idle connections kept open
+HTTP_KEEPALIVE_EXPIRY = 60.0  # Seconds an idle connection is kept
+HTTP_CONNECT_TIMEOUT = 5.0  # Seconds to establish a connection (incl. TLS)
+HTTP_READ_TIMEOUT = 30.0  # Seconds to wait for response data
+HTTP_WRITE_TIMEOUT = 30.0  # Seconds to send request data
+HTTP_POOL_TIMEOUT = 10.0  # Seconds to wait for a free connection from the pool
+HTTP2_ENABLED = True  # Use HTTP/2 when the 'h2' package is installed
+HTTP_WARMUP_CONNECTIONS = 4  # Connections opened at startup (0 disables warm-up)
+
+# Upstream resilience: retries, circuit breaker, adaptive concurrency
+RETRY_MAX_ATTEMPTS = 3  # Attempts per request (1 disables retries)
+RETRY_BASE_DELAY = 0.5  # Seconds, doubled on every retry (with full jitter)
+RETRY_MAX_DELAY = 10.0  # Upper bound for one backoff / Retry-After wait
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+CIRCUIT_RESET_TIMEOUT = 30.0  # Seconds before a probe request is let through
+ADAPTIVE_CONCURRENCY_INITIAL = 10  # Starting limit of concurrent upstream requests
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = HTTP_MAX_CONNECTIONS
+ADAPTIVE_LATENCY_TARGET = 2.0  # Seconds; slower responses shrink the limit
+
+# MCP over SSE sessions
+SSE_MAX_SESSIONS = 10000  # Open /sse streams accepted at the same time
+SSE_QUEUE_SIZE = 100  # Outbound events buffered per session
+SSE_SEND_TIMEOUT = 10.0  # Seconds a response waits for queue space before the client is dropped
+SSE_HEARTBEAT_INTERVAL = 15.0  # Seconds between heartbeat events on an idle stream
+SSE_HEARTBEAT_SLOTS = 60  # Timer wheel buckets the heartbeat fan-out is spread over
+SESSION_FORWARD_TIMEOUT = 5.0  # Seconds to hand a message to the worker owning its session
+
+# Background jobs (tool calls with "async": true)
+JOB_WORKERS = 2  # Jobs executed at the same time
+JOB_MAX_QUEUED = 100  # Jobs waiting for a worker before new ones are refused
+JOB_JOURNAL_PATH = "jobs.sqlite3"  # Job journal (relative to the server directory)
+JOB_RETENTION = 86400.0  # Seconds finished jobs stay available to job_status
+JOB_PROGRESS_INTERVAL = 1.0  # Seconds between progress writes to the journal
+
+# Local post mirror with full-text search (search_posts, get_post)
+MIRROR_ENABLED = False  # Keep a local SQLite copy of all posts
+MIRROR_PATH = "mirror.sqlite3"  # Mirror database (relative to the server directory)
+MIRROR_SYNC_INTERVAL = 300.0  # Seconds between incremental syncs (modified_after)
+MIRROR_RECONCILE_INTERVAL = 3600.0  # Seconds between checks for posts deleted elsewhere
+
+# Media uploads (upload_media)
+MEDIA_LOCAL_ROOT = ""  # Directory local files may be uploaded from ("" disables local files)
+MEDIA_ALLOW_URLS = False  # Allow uploading files from http(s) URLs (only hosts with public addresses)
+MEDIA_URL_HOSTS = ""  # Comma-separated hosts URLs may point to, "*.example.com" for subdomains ("" = any public host)
+MEDIA_URL_MAX_REDIRECTS = 3  # Redirects followed when downloading a URL; every hop is checked again
+MEDIA_UPLOAD_CONCURRENCY = 3  # Files uploaded at the same time
+MEDIA_CHUNK_SIZE = 262144  # Bytes read and sent per chunk (256 KiB)
+MEDIA_MAX_BYTES = 104857600  # Largest file accepted (100 MiB)
+MEDIA_DEDUPE_MIN_BYTES = 262144  # Files this large are hashed so they're uploaded only once
+MEDIA_INDEX_PATH = "media.sqlite3"  # Hash -> media ID index (relative to the server directory)
+
+# Monitoring (/health, /metrics)
+HEALTH_CHECK_TTL = 5.0  # Seconds a WordPress reachability result is reused by /health
+HEALTH_CHECK_TIMEOUT = 3.0  # Seconds /health waits for WordPress before reporting not ready
+METRICS_SNAPSHOT_INTERVAL = 5.0  # Seconds between metric snapshots shared with other workers
+
+# Request tracing and profiling
+TRACE_SERVER_TIMING = True  # Add a Server-Timing header with per-phase durations to /mcp responses
+TRACE_EXPORT_PATH = ""  # Append OpenTelemetry (OTLP JSON) spans to this file ("" disables export)
+TRACE_EXPORT_SAMPLE_RATE = 1.0  # Share of requests exported
+ADMIN_TOKEN = ""  # Bearer token for the /admin endpoints ("" disables them)
+PROFILE_DIR = "profiles"  # Where sampling profiles are written (relative to the server directory)
+PROFILE_MAX_SECONDS = 300.0  # Longest profiling window accepted
+PROFILE_SAMPLE_INTERVAL = 0.005  # Default seconds between stack samples
+
+# Tool result serialization
+RESPONSE_JSON_COMPACT = True  # Compact JSON (orjson if installed) instead of indent=2
+
+# Server process
+SERVER_HOST = "0.0.0.0"  # Interface to listen on
+SERVER_PORT = 8000  # Port to listen on
+TRUSTED_PROXIES = "127.0.0.1"  # Comma-separated proxy addresses whose X-Forwarded-For names the client (e.g. cloudflared)
+LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
+LOG_FORMAT = "json"  # json (one object per line) or text
+LOG_QUEUE_SIZE = 10000  # Records buffered for the log writer thread; records beyond that are dropped
+LOG_MAX_FIELD_CHARS = 256  # Longer string values in structured log fields are truncated
+LOG_MAX_MESSAGE_CHARS = 2048  # Longer log messages are truncated
+LOG_SAMPLE_RATES = "sse.heartbeat=0.01,tool.call.get_posts=0.1"  # event=share pairs; records of an event kept
+WORKERS = 1  # Worker processes; >1 shares cache and SSE routing between them
+SHARED_STATE_DIR = ""  # Shared cache and worker sockets (WORKERS > 1); "" = $XDG_RUNTIME_DIR/wordpress-mcp or a per-user temp dir
+
+# ============================================================================
+# SETTINGS OVERRIDES
+# ============================================================================
+
+def load_settings(names: List[str]) -> Set[str]:
+    """
+    Override the constants above from config.py and the environment
+    
+    config.py (see config.example.py) is applied first, then environment
+    variables named WPMCP_<CONSTANT>, e.g. WPMCP_WORKERS=4. Environment
+    values are converted to the type of the default.
+    
+    Returns:
+        Names that were overridden
+    
+    Raises:
+        ValueError: An environment value can't be converted
+    """
+    try:
+        import config as user_config
+    except ImportError:
+        user_config = None
+    
+    overridden = set()
+    for name in names:
+        default = globals()[name]
+        value = default
+        if user_config is not None and hasattr(user_config, name):
+            value = getattr(user_config, name)
+        
+        raw = os.environ.get(f"WPMCP_{name}")
+        if raw is not None:
+            if isinstance(default, bool):
+                if raw.lower() not in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+                    raise ValueError(f"WPMCP_{name} must be a boolean, got {raw!r}")
+                value = raw.lower() in ("1", "true", "yes", "on")
+            elif isinstance(default, (int, float)):
+                try:
+                    value = type(default)(raw)
+                except ValueError:
+                    raise ValueError(f"WPMCP_{name} must be a number, got {raw!r}") from None
+            else:
+                value = raw
+        
+        if value is not default:
+            globals()[name] = value
+            overridden.add(name)
+    return overridden
+
+_overridden = load_settings([name for name in list(globals()) if name.isupper()])
+if "ADAPTIVE_CONCURRENCY_MAX" not in _overridden:
+    ADAPTIVE_CONCURRENCY_MAX = HTTP_MAX_CONNECTIONS
+if not SHARED_STATE_DIR:
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        SHARED_STATE_DIR = os.path.join(os.environ["XDG_RUNTIME_DIR"], "wordpress-mcp")
+    else:
+        SHARED_STATE_DIR = os.path.join(tempfile.gettempdir(), f"wordpress-mcp-{os.getuid()}")
+
+def private_directory(path: str) -> str:
+    """
+    Create a directory only the current user can access, or check an existing one
+    
+    Worker sockets and the shared cache live there: a directory another
+    user created (or can write to) would let them plant or take over both.
+    
+    Raises:
+        RuntimeError: The path is a symlink or not a directory, belongs to
+            another user, or is accessible to group or others
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise RuntimeError(f"{path} is not a directory (symlinks are not accepted)")
+    if info.st_uid != os.getuid():
+        raise RuntimeError(f"{path} belongs to another user (uid {info.st_uid})")
+    if info.st_mode & 0o077:
+        raise RuntimeError(f"{path} is accessible to other users (mode {stat.S_IMODE(info.st_mode):o}, expected 700)")
+    return path
 
 # ============================================================================
 # LOGGING SETUP
 # ============================================================================
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+LOG_MAX_ITEMS = 20  # List items kept in structured log fields
+
+def truncate(value: Any, limit: Optional[int] = None) -> Any:
+    """
+    Copy of a log field value with long strings and lists shortened
+    
+    Runs on the calling thread, so the record never holds on to a large
+    payload (e.g. the HTML content of a post) and its cost doesn't depend on
+    the payload size.
+    """
+    limit = LOG_MAX_FIELD_CHARS if limit is None else limit
+    if isinstance(value, str):
+        if len(value) <= limit:
+            return value
+        return f"{value[:limit]}...(+{len(value) - limit} chars)"
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, dict):
+        return {str(key): truncate(item, limit) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = [truncate(item, limit) for item in list(value)[:LOG_MAX_ITEMS]]
+        if len(value) > LOG_MAX_ITEMS:
+            items.append(f"...(+{len(value) - LOG_MAX_ITEMS} items)")
+        return items
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return truncate(str(value), limit)
+
+class JSONLogFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, event fields, trace_id, exc"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "message": truncate(record.getMessage(), LOG_MAX_MESSAGE_CHARS)
+        }
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            entry.setdefault(key, value)
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextLogFormatter(logging.Formatter):
+    """The classic text line with event fields appended as key=value"""
+    
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = truncate(record.message, LOG_MAX_MESSAGE_CHARS)
+        line = super().formatMessage(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={json.dumps(value, ensure_ascii=False, default=str)}" for key, value in fields.items())
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            line += f" trace_id={trace_id}"
+        return line
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the log writer thread without blocking the event loop
+    
+    Formatting and the write to stderr happen in a QueueListener thread.
+    When the bounded queue is full the record is dropped and counted rather
+    than stalling request handling on a slow log sink.
+    """
+    
+    def __init__(self, size: int):
+        super().__init__(queue.Queue(size))
+        self.dropped = 0
+        self.context: Optional[Callable[[logging.LogRecord], None]] = None  # Adds request context (trace id)
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Freeze what can change later; formatting is left to the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if self.context is not None:
+            self.context(record)
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "format": LOG_FORMAT,
+            "queued": self.queue.qsize(),
+            "dropped": self.dropped,
+            "sampled_out": dict(log_sampled_out)
+        }
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """
+    Parse LOG_SAMPLE_RATES ("event=share,...")
+    
+    Raises:
+        ValueError: An entry isn't event=number with the number in [0, 1]
+    """
+    rates = {}
+    for entry in str(spec).split(","):
+        if not entry.strip():
+            continue
+        event, _, share = entry.partition("=")
+        try:
+            rate = float(share)
+        except ValueError:
+            raise ValueError(f"LOG_SAMPLE_RATES entry {entry.strip()!r} must be event=share") from None
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"LOG_SAMPLE_RATES share for {event.strip()!r} must be between 0 and 1")
+        rates[event.strip()] = rate
+    return rates
+
+log_sample_rates = parse_sample_rates(LOG_SAMPLE_RATES)
+log_sampled_out: Dict[str, int] = {}
+_event_rates: Dict[str, float] = {}
+MAX_TRACKED_EVENTS = 256  # Distinct events remembered; later ones are counted as "other" (bounds metric labels)
+
+def event_sample_rate(event: str) -> float:
+    """Share of records kept for an event; "tool.call.get_posts" falls back to "tool.call", then "tool" """
+    rate = _event_rates.get(event)
+    if rate is None:
+        rate = 1.0
+        name = event
+        while name:
+            if name in log_sample_rates:
+                rate = log_sample_rates[name]
+                break
+            name = name.rpartition(".")[0]
+        if len(_event_rates) < MAX_TRACKED_EVENTS:
+            _event_rates[event] = rate
+    return rate
+
+def log_event(level: int, event: str, message: str, **fields: Any):
+    """
+    Log a structured record, subject to LOG_SAMPLE_RATES
+    
+    Field values are truncated to LOG_MAX_FIELD_CHARS before the record is
+    queued. Sampled records carry sample_rate so counts can be scaled back up.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = event_sample_rate(event)
+    if rate < 1.0:
+        if random.random() >= rate:
+            key = event if event in log_sampled_out or len(log_sampled_out) < MAX_TRACKED_EVENTS else "other"
+            log_sampled_out[key] = log_sampled_out.get(key, 0) + 1
+            return
+        fields["sample_rate"] = rate
+    logger.log(level, message, extra={"event": event, "fields": truncate(fields)})
+
+def setup_logging() -> LogQueueHandler:
+    """Route the root logger (and uvicorn's loggers) through the log writer thread"""
+    stream = logging.StreamHandler()
+    stream.setFormatter(TextLogFormatter() if str(LOG_FORMAT).lower() == "text" else JSONLogFormatter())
+    handler = LogQueueHandler(LOG_QUEUE_SIZE)
+    listener = logging.handlers.QueueListener(handler.queue, stream)
+    
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, str(LOG_LEVEL).upper(), logging.INFO))
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+    
+    listener.start()
+    atexit.register(listener.stop)  # Flush queued records on shutdown
+    return handler
+
+log_handler = setup_logging()
 logger = logging.getLogger(__name__)
 
 # ============================================================================
-# WordPress MCP Client
+# Serialization
 # ============================================================================
 
-class WordPressMCP:
-    """WordPress MCP client for managing posts via REST API"""
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+def dump_json(data: Any) -> str:
+    """
+    Serialize a tool result or protocol message
     
-    def __init__(self, url: str, username: str, password: str):
-        """Initialize WordPress client with Basic Auth"""
-        self.url = url.rstrip('/') + '/wp-json/wp/v2'
-        self.client = httpx.AsyncClient(
-            auth=(username, password),
-            timeout=30.0,
-            headers={'Content-Type': 'application/json'}
-        )
-        logger.info(f"WordPress MCP client initialized for {url}")
+    Compact mode (RESPONSE_JSON_COMPACT) drops pretty-printing and uses
+    orjson when it is installed.
+    """
+    if not RESPONSE_JSON_COMPACT:
+        return json.dumps(data, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        try:
+            return orjson.dumps(data).decode()
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+class CompactJSONResponse(JSONResponse):
+    """JSONResponse rendered with dump_json"""
     
-    async def create_post(
-        self, 
-        title: str, 
-        content: str, 
-        excerpt: str = "", 
-        status: str = "publish"
-    ) -> Dict[str, Any]:
+    def render(self, content: Any) -> bytes:
+        return dump_json(content).encode("utf-8")
+
+# ============================================================================
+# Caching
+# ============================================================================
+
+class TTLCache:
+    """
+    Size-bounded LRU cache with per-entry TTL and hit/miss counters
+    
+    Expired entries are kept (until evicted or invalidated) together with
+    optional metadata such as HTTP validators, so callers can revalidate
+    them upstream instead of refetching.
+    """
+    
+    def __init__(self, max_entries: int, ttl: float):
         """
-        Create a new WordPress post
-        
         Args:
-            title: Post title
-            content: Post content (HTML)
-            excerpt: Post excerpt
-            status: Post status (publish, draft, private)
-            
-        Returns:
-            Dict with success, post_id, url, message
+            max_entries: Maximum number of entries before LRU eviction
+            ttl: Entry lifetime in seconds (0 disables caching)
         """
-        try:
-            logger.info(f"Creating post: {title}")
-            
-            data = {
-                "title": title,
-                "content": content,
-                "excerpt": excerpt,
-                "status": status
-            }
-            
-            response = await self.client.post(f"{self.url}/posts", json=data)
-            response.raise_for_status()
-            
-            post = response.json()
-            post_id = post.get('id')
-            post_url = post.get('link')
-            
-            logger.info(f"Post created successfully: ID={post_id}, URL={post_url}")
-            
-            return {
-                "success": True,
-                "post_id": post_id,
-                "url": post_url,
-                "message": f"Post '{title}' created successfully!"
-            }
-            
-        except httpx.HTTPStatusError as e:
-            error_msg = f"HTTP error creating post: {e.response.status_code} - {e.response.text}"
-            logger.error(error_msg)
-            return {
-                "success": False,
-                "post_id": None,
-                "url": None,
-                "message": error_msg
-            }
-        except Exception as e:
-            error_msg = f"Error creating post: {str(e)}"
-            logger.error(error_msg)
-            return {
-                "success": False,
-                "post_id": None,
-                "url": None,
-                "message": error_msg
-            }
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
     
-    async def update_post(
-        self,
-        post_id: int,
-        title: Optional[str] = None,
-        content: Optional[str] = None,
-        excerpt: Optional[str] = None
-    ) -> Dict[str, Any]:
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh cached value, or None on miss"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def peek(self, key: Hashable) -> Optional[Tuple[Any, Any]]:
+        """Return (value, metadata) even if expired, or None if absent"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[1], entry[2]
+    
+    def set(self, key: Hashable, value: Any, metadata: Any = None):
+        """Store a value, evicting the least recently used entries if full"""
+        if not self.enabled:
+            return
+        
+        self._entries[key] = (time.monotonic() + self.ttl, value, metadata)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def refresh(self, key: Hashable) -> bool:
+        """Mark an expired entry as fresh again after upstream revalidation"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        
+        self._entries[key] = (time.monotonic() + self.ttl, entry[1], entry[2])
+        self._entries.move_to_end(key)
+        self.revalidations += 1
+        return True
+    
+    def invalidate(self, predicate: Optional[Callable[[Hashable, Any], bool]] = None) -> int:
         """
-        Update an existing WordPress post
+        Drop entries matching predicate (all entries if predicate is None)
         
-        Args:
-            post_id: Post ID to update
-            title: New title (optional)
-            content: New content (optional)
-            excerpt: New excerpt (optional)
-            
         Returns:
-            Dict with success, post_id, url, message
+            Number of dropped entries
         """
+        if predicate is None:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+        
+        keys = [key for key, (_, value, _) in self._entries.items() if predicate(key, value)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "revalidations": self.revalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one in-flight execution
+    
+    Only use for reads: every caller with the same key receives the result
+    of the first caller's call.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self.executed = 0
+        self.deduplicated = 0
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn, or wait for the identical call already in flight"""
+        task = self._calls.get(key)
+        if task is not None:
+            self.deduplicated += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.executed += 1
+        
+        # Shielded so one cancelled caller doesn't cancel the call for the others
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: Hashable, task: "asyncio.Future[Any]"):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+    
+    def stats(self) -> Dict[str, Any]:
+        total = self.executed + self.deduplicated
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+            "dedup_rate": round(self.deduplicated / total, 4) if total else 0.0
+        }
+
+class BatchLoader:
+    """
+    Collect keys requested within a short window into one batched load (DataLoader)
+    
+    Keys passed to load() within `window` seconds of the first pending one
+    go to a single batch_fn call, at most max_batch keys per call; a key
+    requested again while pending is loaded once. Keys are grouped (e.g. by
+    field set) and only keys of the same group share a call. batch_fn
+    returns {key: value}; keys it leaves out resolve to None, and its
+    exception is raised to every caller of the batch.
+    """
+    
+    def __init__(
+        self,
+        batch_fn: Callable[[Hashable, List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+        window: float,
+        max_batch: int
+    ):
+        self._batch_fn = batch_fn
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[Hashable, Dict[Hashable, "asyncio.Future[Any]"]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._running: Set["asyncio.Future[None]"] = set()
+        self.batches = 0
+        self.loaded = 0
+        self.deduplicated = 0
+    
+    async def load(self, group: Hashable, key: Hashable) -> Any:
+        """Value of key, loaded together with the other keys of the group requested meanwhile"""
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(group)
+        if pending is None:
+            pending = self._pending[group] = {}
+            self._timers[group] = loop.call_later(self.window, self._dispatch, group)
+        
+        future = pending.get(key)
+        if future is None:
+            future = pending[key] = loop.create_future()
+            self.loaded += 1
+            if len(pending) >= self.max_batch:
+                self._dispatch(group)
+        else:
+            self.deduplicated += 1
+        
+        # Shielded so one cancelled caller doesn't cancel the load for the others
+        return await asyncio.shield(future)
+    
+    def _dispatch(self, group: Hashable):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(group, None)
+        if not pending:
+            return
+        self.batches += 1
+        task = asyncio.ensure_future(self._run(group, pending))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+    
+    async def _run(self, group: Hashable, pending: Dict[Hashable, "asyncio.Future[Any]"]):
         try:
-            logger.info(f"Updating post ID: {post_id}")
-            
-            data = {}
-            if title is not None:
-                data["title"] = title
-            if content is not None:
-                data["content"] = content
-            if excerpt is not None:
-                data["excerpt"] = excerpt
-            
-            if not data:
-                return {
-                    "success": False,
-                    "post_id": post_id,
-                    "url": None,
-                    "message": "No fields to update"
-                }
-            
-            response = await self.client.post(f"{self.url}/posts/{post_id}", json=data)
-            response.raise_for_status()
-            
-            post = response.json()
-            post_url = post.get('link')
-            
-            logger.info(f"Post updated successfully: ID={post_id}, URL={post_url}")
-            
-            return {
-                "success": True,
-                "post_id": post_id,
-                "url": post_url,
-                "message": f"Post ID {post_id} updated successfully!"
-            }
-            
-        except httpx.HTTPStatusError as e:
-            error_msg = f"HTTP error updating post: {e.response.status_code} - {e.response.text}"
-            logger.error(error_msg)
-            return {
-                "success": False,
-                "post_id": post_id,
-                "url": None,
-                "message": error_msg
-            }
+            values = await self._batch_fn(group, list(pending))
+        except asyncio.CancelledError:
+            for future in pending.values():
+                future.cancel()
+            raise
         except Exception as e:
-            error_msg = f"Error updating post: {str(e)}"
-            logger.error(error_msg)
-            return {
-                "success": False,
-                "post_id": post_id,
-                "url": None,
-                "message": error_msg
-            }
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(values.get(key))
     
-    async def get_posts(self, per_page: int = 10, page: int = 1) -> Dict[str, Any]:
-        """
-        Get list of WordPress posts
-        
-        Args:
-            per_page: Number of posts per page (1-100)
-            page: Page number
-            
-        Returns:
-            Dict with success, posts, count, message
-        """
+    def close(self):
+        """Cancel scheduled and running batches"""
+        for group in list(self._timers):
+            self._timers.pop(group).cancel()
+            for future in self._pending.pop(group, {}).values():
+                future.cancel()
+        for task in self._running:
+            task.cancel()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "loaded": self.loaded,
+            "deduplicated": self.deduplicated,
+            "avg_batch_size": round(self.loaded / self.batches, 2) if self.batches else 0.0
+        }
+
+class DatabaseThread:
+    """
+    A thread that runs every call on one SQLite connection, off the event loop
+    
+    sqlite3 calls block on disk I/O and on locks held by other processes (up
+    to the connection timeout), which would stall every request of the
+    worker. One thread per connection also keeps the calls in order.
+    """
+    
+    def __init__(self, name: str):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+    
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Run function(*args) in the thread and return its result"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+    
+    async def close(self, function: Callable[[], Any]):
+        """Run function (e.g. the connection's close) after the queued calls, then stop the thread"""
         try:
-            logger.info(f"Getting posts: per_page={per_page}, page={page}")
-            
-            params = {
-                "per_page": min(max(per_page, 1), 100),
-                "page": max(page, 1)
-            }
-            
-            response = await self.client.get(f"{self.url}/posts", params=params)
-            response.raise_for_status()
-            
-            posts = response.json()
-            
-            # Extract relevant post information
-            post_list = [
-                {
-                    "id": post.get('id'),
-                    "title": post.get('title', {}).get('rendered', ''),
-                    "excerpt": post.get('excerpt', {}).get('rendered', ''),
-                    "url": post.get('link'),
-                    "status": post.get('status'),
-                    "date": post.get('date')
+            await self.run(function)
+        finally:
+            self._executor.shutdown(wait=False)
+
+class SharedCache:
+    """
+    Second-level cache and write generation shared by worker processes
+    
+    Backed by a SQLite database in SHARED_STATE_DIR (WAL mode, so readers
+    in other workers don't block). A write in any worker bumps the shared
+    generation; every worker drops its local cache when it sees a newer
+    generation, and entries stored under an older one are never returned.
+    Errors are logged and treated as misses - the cache is best-effort.
+    Database calls run in a DatabaseThread.
+    """
+    
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.last_generation: Optional[int] = None  # Generation seen by the latest check (for stats)
+        self._thread = DatabaseThread("shared-cache")
+        self._db = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS generation (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER)")
+        self._db.execute("INSERT OR IGNORE INTO generation VALUES (0, 0)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, generation INTEGER, expires_at REAL, value TEXT, metadata TEXT)"
+        )
+    
+    async def generation(self) -> Optional[int]:
+        """Current shared write generation (None if the database is unavailable)"""
+        self.last_generation = await self._thread.run(self._generation)
+        return self.last_generation
+    
+    def _generation(self) -> Optional[int]:
+        try:
+            return self._db.execute("SELECT value FROM generation WHERE id = 0").fetchone()[0]
+        except sqlite3.Error as e:
+            self._error("read generation", e)
+            return None
+    
+    async def bump_generation(self) -> Optional[int]:
+        """Invalidate every worker's listings; returns the new generation"""
+        generation = await self._thread.run(self._bump_generation)
+        if generation is not None:
+            self.last_generation = generation
+        return generation
+    
+    def _bump_generation(self) -> Optional[int]:
+        try:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("UPDATE generation SET value = value + 1 WHERE id = 0")
+                generation = self._db.execute("SELECT value FROM generation WHERE id = 0").fetchone()[0]
+                self._db.execute("DELETE FROM entries WHERE generation < ?", (generation,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            return generation
+        except sqlite3.Error as e:
+            self._error("bump generation", e)
+            return None
+    
+    async def get(self, key: str, generation: int) -> Optional[Tuple[Any, Any]]:
+        """Return (value, metadata) stored under this generation and still fresh"""
+        row = await self._thread.run(self._get, key, generation)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0]), json.loads(row[1]) if row[1] else None
+    
+    def _get(self, key: str, generation: int) -> Optional[Tuple[str, Optional[str]]]:
+        try:
+            return self._db.execute(
+                "SELECT value, metadata FROM entries WHERE key = ? AND generation = ? AND expires_at > ?",
+                (key, generation, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._error("read", e)
+            return None
+    
+    async def set(self, key: str, generation: int, value: Any, metadata: Any = None):
+        await self._thread.run(
+            self._set,
+            key,
+            generation,
+            dump_json(value),
+            dump_json(metadata) if metadata is not None else None
+        )
+    
+    def _set(self, key: str, generation: int, value: str, metadata: Optional[str]):
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, generation, time.time() + self.ttl, value, metadata)
+            )
+        except sqlite3.Error as e:
+            self._error("write", e)
+    
+    def _error(self, action: str, error: Exception):
+        self.errors += 1
+        logger.warning(f"Shared cache {action} failed: {error}")
+    
+    async def close(self):
+        await self._thread.close(self._db.close)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "generation": self.last_generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
+
+# ============================================================================
+# Resilience
+# ============================================================================
+
+class CircuitOpenError(Exception):
+    """Raised when WordPress requests are short-circuited by an open breaker"""
+
+class CircuitBreaker:
+    """
+    Fail fast while the upstream site is down
+    
+    After `failure_threshold` consecutive failures the circuit opens and all
+    requests fail immediately for `reset_timeout` seconds. Then a single
+    probe request is let through (half-open): success closes the circuit,
+    failure opens it again.
+    """
+    
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_started: Optional[float] = None
+    
+    def before_request(self):
+        """Raise CircuitOpenError if the request must not be sent"""
+        if self.state == "closed":
+            return
+        
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        
+        # A probe that never reported back (e.g. cancelled) is replaced after a timeout
+        now = time.monotonic()
+        if self.state == "half_open" and (
+            self._probe_started is None or now - self._probe_started >= self.reset_timeout
+        ):
+            self._probe_started = now
+            return
+        
+        raise CircuitOpenError(
+            f"WordPress is unavailable (circuit open), retry in {max(remaining, 0):.1f}s"
+        )
+    
+    def record_success(self):
+        if self.state != "closed":
+            logger.info("WordPress circuit closed")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_started = None
+    
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_started = None
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(
+                    f"WordPress circuit opened after {self.consecutive_failures} failures"
+                )
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened
+        }
+
+class AIMDLimiter:
+    """
+    Adaptive upstream concurrency limit (additive increase, multiplicative decrease)
+    
+    The limit grows by about one slot per window of fast, successful requests
+    and is cut by `decrease_factor` when latency exceeds the target or the
+    site signals overload, at most once per latency target interval.
+    """
+    
+    def __init__(
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        latency_target: float,
+        decrease_factor: float = 0.5
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_use = 0
+        self.waiting = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+    
+    async def acquire(self):
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self.in_use < int(self.limit))
+            finally:
+                self.waiting -= 1
+            self.in_use += 1
+    
+    async def release(self, latency: float, overloaded: bool):
+        """
+        Args:
+            latency: Seconds the request took
+            overloaded: Whether upstream signalled overload (429/503/timeout)
+        """
+        async with self._condition:
+            self.in_use -= 1
+            now = time.monotonic()
+            if overloaded or latency > self.latency_target:
+                if now - self._last_decrease >= self.latency_target:
+                    self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "latency_target": self.latency_target
+        }
+
+class RateLimiter:
+    """
+    Token bucket pacing requests to `rate` per second, with bursts of `burst`
+    
+    A caller that finds the bucket empty reserves the next token and sleeps
+    until it is due, so waiters are released in arrival order at the
+    configured rate. A rate of 0 disables the limit.
+    """
+    
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.burst
+        self.delayed = 0
+        self._updated = time.monotonic()
+    
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            self.delayed += 1
+            await asyncio.sleep(-self.tokens / self.rate)
+    
+    def try_acquire(self) -> float:
+        """Take a token if one is available: 0.0, else seconds until one is (nothing taken)"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "delayed": self.delayed
+        }
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+# ============================================================================
+# Metrics
+# ============================================================================
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class MetricFamily:
+    """
+    One Prometheus metric with labels: a counter, gauge or histogram
+    
+    Samples are keyed by the tuple of label values. A histogram sample is
+    a list of per-bucket counts (non-cumulative, last one is +Inf) followed
+    by the sum of observed values.
+    """
+    
+    def __init__(self, name: str, kind: str, help_text: str, labels: Tuple[str, ...], buckets: Tuple[float, ...] = ()):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.samples: Dict[Tuple[str, ...], Any] = {}
+    
+    def inc(self, *labels: str, value: float = 1.0):
+        self.samples[labels] = self.samples.get(labels, 0.0) + value
+    
+    def set(self, *labels: str, value: float):
+        self.samples[labels] = value
+    
+    def observe(self, value: float, *labels: str):
+        sample = self.samples.get(labels)
+        if sample is None:
+            sample = self.samples[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        sample[bisect.bisect_left(self.buckets, value)] += 1
+        sample[-1] += value
+
+class Metrics:
+    """
+    Registry of this process's metrics, rendered in the Prometheus text format
+    
+    Gauges and counters that mirror existing stats() output are filled in
+    by collectors right before a scrape, so the hot paths only pay for the
+    histograms and counters that have no other source.
+    
+    With several workers each process periodically writes snapshot() to
+    SHARED_STATE_DIR; /metrics sums the snapshots of all live workers.
+    """
+    
+    def __init__(self):
+        self.families: Dict[str, MetricFamily] = {}
+        self.collectors: List[Callable[[], None]] = []
+    
+    def _add(self, family: MetricFamily) -> MetricFamily:
+        self.families[family.name] = family
+        return family
+    
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> MetricFamily:
+        return self._add(MetricFamily(name, "counter", help_text, labels))
+    
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> MetricFamily:
+        return self._add(MetricFamily(name, "gauge", help_text, labels))
+    
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._add(MetricFamily(name, "histogram", help_text, labels, tuple(buckets)))
+    
+    def collector(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Decorator: run fn before every snapshot to refresh derived metrics"""
+        self.collectors.append(fn)
+        return fn
+    
+    def snapshot(self) -> Dict[str, List[Any]]:
+        """Current samples as JSON-serializable {name: [[label values, value], ...]}"""
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                logger.error(f"Metrics collector {collect.__name__} failed: {e}")
+        return {
+            family.name: [[list(labels), value] for labels, value in family.samples.items()]
+            for family in self.families.values()
+        }
+    
+    @staticmethod
+    def merge(snapshots: List[Dict[str, List[Any]]]) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        """Sum snapshots sample by sample (counters, gauges and histogram buckets alike)"""
+        merged: Dict[str, Dict[Tuple[str, ...], Any]] = {}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                target = merged.setdefault(name, {})
+                for labels, value in samples:
+                    key = tuple(labels)
+                    current = target.get(key)
+                    if current is None:
+                        target[key] = list(value) if isinstance(value, list) else value
+                    elif isinstance(value, list):
+                        target[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = current + value
+        return merged
+    
+    @staticmethod
+    def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = []
+        for name, value in zip(names, values):
+            escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+            pairs.append(f'{name}="{escaped}"')
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+    
+    @staticmethod
+    def _number(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+    
+    def publish(self, directory: str, node: str):
+        """Write snapshot() where the other workers' /metrics can read it"""
+        path = os.path.join(directory, f"metrics-{node}.json")
+        with open(path + ".tmp", "w") as handle:
+            json.dump(self.snapshot(), handle, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+    
+    @staticmethod
+    def peers(directory: str, node: str, max_age: float) -> List[Dict[str, List[Any]]]:
+        """Snapshots published by the other workers; stale ones (exited workers) are skipped"""
+        snapshots = []
+        now = time.time()
+        for name in os.listdir(directory):
+            if not (name.startswith("metrics-") and name.endswith(".json")) or name == f"metrics-{node}.json":
+                continue
+            path = os.path.join(directory, name)
+            try:
+                if now - os.path.getmtime(path) > max_age:
+                    continue
+                with open(path) as handle:
+                    snapshots.append(json.load(handle))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping metrics snapshot {name}: {e}")
+        return snapshots
+    
+    def render(self, merged: Dict[str, Dict[Tuple[str, ...], Any]]) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        for family in self.families.values():
+            samples = merged.get(family.name)
+            if not samples:
+                continue
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labels, value in sorted(samples.items()):
+                if family.kind != "histogram":
+                    lines.append(f"{family.name}{self._labels(family.labels, labels)} {self._number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(family.buckets + (float("inf"),), value[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    bucket_labels = self._labels(family.labels, labels, 'le="' + le + '"')
+                    lines.append(f"{family.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{family.name}_sum{self._labels(family.labels, labels)} {self._number(value[-1])}")
+                lines.append(f"{family.name}_count{self._labels(family.labels, labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+jsonrpc_requests = metrics.counter(
+    "wpmcp_jsonrpc_requests_total", "JSON-RPC requests handled, by method and outcome", ("method", "outcome")
+)
+jsonrpc_duration = metrics.histogram(
+    "wpmcp_jsonrpc_request_duration_seconds", "Time to answer a JSON-RPC request", ("method",)
+)
+tool_calls = metrics.counter(
+    "wpmcp_tool_calls_total", "Tool executions (foreground calls and background jobs), by outcome", ("tool", "outcome")
+)
+tool_duration = metrics.histogram(
+    "wpmcp_tool_duration_seconds", "Tool execution time including all upstream requests", ("tool",)
+)
+upstream_requests = metrics.counter(
+    "wpmcp_upstream_requests_total", "Requests sent to WordPress (every attempt), by site, REST route and status", ("site", "method", "route", "status")
+)
+upstream_duration = metrics.histogram(
+    "wpmcp_upstream_request_duration_seconds", "WordPress response time per attempt", ("site", "method", "route")
+)
+upstream_queue_wait = metrics.histogram(
+    "wpmcp_upstream_queue_wait_seconds", "Time a request waited for the adaptive concurrency limiter"
+)
+
+# ============================================================================
+# Tracing and Profiling
+# ============================================================================
+
+class Span:
+    """One timed phase of a traced request; use as a context manager"""
+    
+    __slots__ = ("trace", "name", "kind", "attributes", "span_id", "parent_id", "start", "end", "_token")
+    
+    def __init__(self, trace: "Trace", name: str, kind: int, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = current_span.get()
+        self.start = time.monotonic()
+        self.end = self.start
+        self._token = None
+    
+    def __enter__(self) -> "Span":
+        self._token = current_span.set(self.span_id)
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.end = time.monotonic()
+        current_span.reset(self._token)
+        self.trace.spans.append(self)
+    
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+class NullSpan:
+    """Stand-in returned by span() when the request isn't traced"""
+    
+    def __enter__(self) -> "NullSpan":
+        return self
+    
+    def __exit__(self, *exc_info):
+        pass
+    
+    def set(self, key: str, value: Any):
+        pass
+
+NULL_SPAN = NullSpan()
+
+# OpenTelemetry span kinds
+SPAN_INTERNAL, SPAN_SERVER, SPAN_CLIENT = 1, 2, 3
+
+class Trace:
+    """
+    Spans recorded while serving one request
+    
+    Summarized per phase into a Server-Timing header and, when
+    TRACE_EXPORT_PATH is set, exported as OpenTelemetry (OTLP JSON) spans.
+    """
+    
+    def __init__(self, name: str, **attributes: Any):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.started_ns = time.time_ns()
+        self.root = Span(self, name, SPAN_SERVER, attributes)
+        self.root.parent_id = None
+        self.spans: List[Span] = []
+    
+    def __enter__(self) -> "Trace":
+        self._trace_token = current_trace.set(self)
+        self.root.__enter__()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.root.__exit__(*exc_info)
+        current_trace.reset(self._trace_token)
+    
+    def server_timing(self) -> str:
+        """Server-Timing header value: total milliseconds per phase (upstream with a request count)"""
+        totals: Dict[str, List[float]] = {}
+        for span in self.spans:
+            if span is self.root:
+                continue
+            entry = totals.setdefault(span.name, [0.0, 0])
+            entry[0] += span.end - span.start
+            entry[1] += 1
+        parts = []
+        for name, (duration, count) in totals.items():
+            part = f"{name};dur={duration * 1000:.2f}"
+            if count > 1:
+                part += f';desc="{count}x"'
+            parts.append(part)
+        parts.append(f"total;dur={(self.root.end - self.root.start) * 1000:.2f}")
+        return ", ".join(parts)
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        """The spans as an OTLP/JSON ExportTraceServiceRequest"""
+        origin = self.root.start
+        
+        def attribute(key: str, value: Any) -> Dict[str, Any]:
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+        
+        spans = []
+        for span in self.spans:
+            record = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(self.started_ns + int((span.start - origin) * 1e9)),
+                "endTimeUnixNano": str(self.started_ns + int((span.end - origin) * 1e9)),
+                "attributes": [attribute(key, value) for key, value in span.attributes.items()]
+            }
+            if span.parent_id:
+                record["parentSpanId"] = span.parent_id
+            spans.append(record)
+        
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    attribute("service.name", "wordpress-mcp-sse-server"),
+                    attribute("process.pid", os.getpid())
+                ]},
+                "scopeSpans": [{"scope": {"name": "mcp_sse_server"}, "spans": spans}]
+            }]
+        }
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+def span(name: str, kind: int = SPAN_INTERNAL, **attributes: Any) -> Any:
+    """Time a phase of the current request (a no-op outside a traced request)"""
+    trace = current_trace.get()
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name, kind, attributes)
+
+def add_trace_context(record: logging.LogRecord):
+    """Tag log records written while handling a traced request with its trace id"""
+    trace = current_trace.get()
+    if trace is not None:
+        record.trace_id = trace.trace_id
+
+log_handler.context = add_trace_context
+
+class TraceExporter:
+    """
+    Appends finished traces to TRACE_EXPORT_PATH as OTLP JSON lines
+    
+    The file uses the OpenTelemetry Collector file exporter format, one
+    ExportTraceServiceRequest per line, so it can be replayed into a
+    collector (otlpjsonfile receiver) or read directly. Lines are buffered
+    in memory and written from a thread once a second.
+    """
+    
+    MAX_PENDING = 10000  # Traces buffered before new ones are dropped
+    
+    def __init__(self, path: str, sample_rate: float):
+        self.path = path
+        self.sample_rate = sample_rate
+        self._pending: List[str] = []
+        self.exported = 0
+        self.dropped = 0
+    
+    def export(self, trace: Trace):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        if len(self._pending) >= self.MAX_PENDING:
+            self.dropped += 1
+            return
+        self._pending.append(json.dumps(trace.to_otlp(), separators=(",", ":")))
+    
+    def _write(self, lines: List[str]):
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+    
+    async def flush(self):
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+            self.exported += len(lines)
+        except OSError as e:
+            self.dropped += len(lines)
+            logger.error(f"Writing traces to {self.path} failed: {e}")
+    
+    async def run(self):
+        try:
+            while True:
+                await asyncio.sleep(1.0)
+                await self.flush()
+        finally:
+            if self._pending:
+                self._write(self._pending)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "pending": len(self._pending),
+            "exported": self.exported,
+            "dropped": self.dropped
+        }
+
+# Set up at startup when TRACE_EXPORT_PATH is configured
+trace_exporter: Optional[TraceExporter] = None
+
+class SamplingProfiler:
+    """
+    Samples the event loop thread's Python stack for a fixed window
+    
+    A helper thread reads the loop thread's current frame every interval
+    (sys._current_frames) and counts identical stacks. The result is saved
+    in the folded format ("outer;inner;leaf count" per line) read by
+    flamegraph.pl, inferno and speedscope. Idle time shows up as stacks
+    ending in the selector's poll.
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path: Optional[str] = None
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.seconds = 0.0
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, seconds: float, interval: float) -> str:
+        """Start sampling the calling thread; returns the path the profile will be written to"""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(self.directory, f"profile-{stamp}-{os.getpid()}.folded")
+        self.samples = 0
+        self.started_at = time.time()
+        self.seconds = seconds
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(threading.get_ident(), seconds, interval, self.path),
+            name="sampling-profiler",
+            daemon=True
+        )
+        self._thread.start()
+        return self.path
+    
+    def _run(self, target: int, seconds: float, interval: float, path: str):
+        stacks: Dict[str, int] = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(target)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                key = ";".join(reversed(names))
+                stacks[key] = stacks.get(key, 0) + 1
+                self.samples += 1
+            time.sleep(interval)
+        
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in sorted(stacks.items(), key=lambda item: -item[1]):
+                handle.write(f"{stack} {count}\n")
+        logger.info(f"Profile with {self.samples} samples written to {path}")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "path": self.path,
+            "samples": self.samples,
+            "started_at": self.started_at,
+            "seconds": self.seconds
+        }
+
+profiler = SamplingProfiler(os.path.join(os.path.dirname(os.path.abspath(__file__)), PROFILE_DIR))
+
+# ============================================================================
+# Media Uploads
+# ============================================================================
+
+class FileChunks:
+    """
+    Async byte stream of a local file, read chunk by chunk in a thread
+    
+    Re-iterable, so a retried upload request sends the file from the start.
+    """
+    
+    def __init__(self, path: str, chunk_size: int = MEDIA_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        with open(self.path, "rb") as file:
+            while True:
+                chunk = await loop.run_in_executor(None, file.read, self.chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+async def hash_file(path: str) -> str:
+    """SHA-256 of a file, computed without loading it into memory"""
+    digest = hashlib.sha256()
+    async for chunk in FileChunks(path):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def content_disposition(filename: str) -> str:
+    """Content-Disposition header for a raw /wp/v2/media upload"""
+    ascii_name = filename.encode("ascii", "ignore").decode().replace('"', "").strip() or "upload"
+    value = f'attachment; filename="{ascii_name}"'
+    if ascii_name != filename:
+        value += f"; filename*=UTF-8''{quote(filename)}"
+    return value
+
+def media_host_allowed(host: str) -> bool:
+    """Whether MEDIA_URL_HOSTS lets URL uploads come from host"""
+    patterns = [pattern.strip().lower() for pattern in MEDIA_URL_HOSTS.split(",") if pattern.strip()]
+    if not patterns:
+        return True
+    host = host.lower().rstrip(".")
+    for pattern in patterns:
+        if pattern.startswith("*."):
+            if host.endswith(pattern[1:]):
+                return True
+        elif host == pattern:
+            return True
+    return False
+
+def is_public_address(address: str) -> bool:
+    """Whether an IP address is globally routable (not private, loopback, link-local, reserved, ...)"""
+    ip = ipaddress.ip_address(address.split("%")[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not (ip.is_multicast or ip.is_reserved or ip.is_unspecified)
+
+async def pin_media_url(url: httpx.URL) -> Tuple[httpx.URL, Dict[str, str], Dict[str, Any]]:
+    """
+    Check a URL upload source and pin it to a public address of its host
+    
+    The host is resolved once and the request goes to that address (with
+    the original Host header and TLS server name), so a DNS answer that
+    changes between the check and the connection can't reach an internal
+    address.
+    
+    Returns:
+        (URL with the address as host, headers, request extensions)
+    
+    Raises:
+        ValueError: Not http(s), host not in MEDIA_URL_HOSTS or not a public address
+    """
+    if url.scheme not in ("http", "https") or not url.host:
+        raise ValueError(f"Only http(s) URLs can be uploaded: {url}")
+    if not media_host_allowed(url.host):
+        raise ValueError(f"Host {url.host} is not in MEDIA_URL_HOSTS")
+    
+    port = url.port or (443 if url.scheme == "https" else 80)
+    try:
+        addresses = [str(ipaddress.ip_address(url.host))]
+    except ValueError:
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(url.host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise ValueError(f"Couldn't resolve {url.host}: {e}") from None
+        addresses = [info[4][0] for info in infos]
+    if not addresses or not all(is_public_address(address) for address in addresses):
+        raise ValueError(f"{url.host} doesn't resolve to a public address")
+    
+    extensions = {"sni_hostname": url.host} if url.scheme == "https" else {}
+    return url.copy_with(host=addresses[0].split("%")[0]), {"Host": url.netloc.decode("ascii")}, extensions
+
+class MediaIndex:
+    """
+    SQLite map of file content hash -> uploaded media, so a file isn't uploaded twice
+    
+    Database calls run in a DatabaseThread.
+    """
+    
+    def __init__(self, path: str):
+        self._thread = DatabaseThread("media-index")
+        self._db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS media ("
+            "sha256 TEXT PRIMARY KEY, media_id INTEGER, url TEXT, mime_type TEXT, bytes INTEGER, uploaded_at REAL)"
+        )
+    
+    async def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        return await self._thread.run(self._get, sha256)
+    
+    def _get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(
+            "SELECT media_id, url, mime_type FROM media WHERE sha256 = ?", (sha256,)
+        ).fetchone()
+        return dict(zip(("media_id", "url", "mime_type"), row)) if row else None
+    
+    async def set(self, sha256: str, media_id: int, url: str, mime_type: str, size: int):
+        await self._thread.run(self._set, sha256, media_id, url, mime_type, size)
+    
+    def _set(self, sha256: str, media_id: int, url: str, mime_type: str, size: int):
+        self._db.execute(
+            "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?)",
+            (sha256, media_id, url, mime_type, size, time.time())
+        )
+    
+    async def forget(self, sha256: str):
+        await self._thread.run(self._db.execute, "DELETE FROM media WHERE sha256 = ?", (sha256,))
+    
+    async def close(self):
+        await self._thread.close(self._db.close)
+
+# ============================================================================
+# WordPress MCP Client
+# ============================================================================
+
+def http_error_detail(e: httpx.HTTPStatusError) -> str:
+    """Status code and response body for error messages, with the body cut to LOG_MAX_MESSAGE_CHARS"""
+    return f"{e.response.status_code} - {truncate(e.response.text, LOG_MAX_MESSAGE_CHARS)}"
+
+# Values accepted for WORDPRESS_AUTH and a site's "auth" setting
+UPSTREAM_AUTH_MODES = ("basic", "jwt")
+
+class TokenAuth(httpx.Auth):
+    """
+    Bearer token auth for WordPress, with Basic auth as the fallback
+    
+    WordPress checks an application password with a deliberately slow hash
+    on every request; a JWT only needs an HMAC. The username and password
+    are exchanged once at WORDPRESS_TOKEN_PATH, the token is reused and,
+    WORDPRESS_TOKEN_REFRESH_MARGIN seconds before it expires, replaced in
+    the background while requests keep using the old one. Concurrent
+    requests for a token share one exchange.
+    
+    Without a token requests are sent with Basic auth: for good if the
+    site has no token endpoint (404), for WORDPRESS_TOKEN_RETRY_INTERVAL
+    seconds after any other failure. A request whose token is refused
+    (jwt_auth_* error) drops the token and is resent once.
+    """
+    
+    def __init__(
+        self,
+        token_url: str,
+        username: str,
+        password: str,
+        fetch: Callable[[str, Dict[str, str]], Awaitable[httpx.Response]]
+    ):
+        """
+        Args:
+            token_url: Token endpoint
+            fetch: Sends the credentials to the token endpoint (without auth)
+        """
+        self.token_url = token_url
+        self._credentials = {"username": username, "password": password}
+        self._basic_header = "Basic " + base64.b64encode(f"{username}:{password}".encode()).decode()
+        self._fetch = fetch
+        self._token: Optional[str] = None
+        self._refresh_at = 0.0
+        self._expires = 0.0
+        self._basic_until = 0.0  # Monotonic time until which no token is requested
+        self._exchanges = SingleFlight()
+        self._background: Optional["asyncio.Future[Optional[str]]"] = None
+        self.issued = 0
+        self.failures = 0
+        self.rejected = 0
+        self.basic_requests = 0
+        self.last_error: Optional[str] = None
+    
+    async def async_auth_flow(self, request: httpx.Request) -> AsyncIterator[httpx.Request]:
+        token = await self.token()
+        self._authorize(request, token)
+        response = yield request
+        
+        if token is None or response.status_code not in (401, 403) or not isinstance(request.stream, httpx.ByteStream):
+            return
+        await response.aread()
+        try:
+            code = response.json().get("code", "")
+        except (ValueError, AttributeError):
+            code = ""
+        if not str(code).startswith("jwt_auth"):
+            return
+        
+        self.rejected += 1
+        logger.warning(f"WordPress rejected the bearer token ({code}), requesting a new one")
+        if self._token == token:
+            self._token = None
+        token = await self.token()
+        self._authorize(request, token)
+        yield request
+    
+    def _authorize(self, request: httpx.Request, token: Optional[str]):
+        if token is None:
+            self.basic_requests += 1
+            request.headers["Authorization"] = self._basic_header
+        else:
+            request.headers["Authorization"] = f"Bearer {token}"
+    
+    async def token(self) -> Optional[str]:
+        """Current token, exchanging credentials first if needed; None means use Basic auth"""
+        now = time.monotonic()
+        if self._token is not None and now < self._expires:
+            if now >= self._refresh_at and (self._background is None or self._background.done()):
+                self._background = asyncio.ensure_future(self._exchanges.do("token", self._exchange))
+            return self._token
+        if now < self._basic_until:
+            return None
+        return await self._exchanges.do("token", self._exchange)
+    
+    async def _exchange(self) -> Optional[str]:
+        """Request a token; on failure keep Basic auth for a while (never raises)"""
+        try:
+            response = await self._fetch(self.token_url, self._credentials)
+        except httpx.HTTPError as e:
+            return self._failed(f"{type(e).__name__}: {e}", WORDPRESS_TOKEN_RETRY_INTERVAL)
+        if response.status_code == 404:
+            return self._failed(f"no token endpoint at {self.token_url}", float("inf"))
+        
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        token = None
+        if isinstance(body, dict):
+            # JWT Authentication for WP REST API returns {"token"}, JWT Auth {"data": {"token"}}
+            data = body.get("data")
+            token = body.get("token") or (data.get("token") if isinstance(data, dict) else None)
+        if response.status_code >= 400 or not isinstance(token, str) or not token:
+            return self._failed(f"HTTP {response.status_code}: {truncate(response.text, LOG_MAX_FIELD_CHARS)}", WORDPRESS_TOKEN_RETRY_INTERVAL)
+        
+        expires_at = self.jwt_expiry(token)
+        ttl = expires_at - time.time() if expires_at is not None else WORDPRESS_TOKEN_TTL
+        now = time.monotonic()
+        self._token = token
+        self._expires = now + ttl
+        self._refresh_at = now + max(ttl - WORDPRESS_TOKEN_REFRESH_MARGIN, ttl / 2)
+        self.issued += 1
+        self.last_error = None
+        logger.info(f"Obtained WordPress bearer token from {self.token_url}, valid for {ttl:.0f}s")
+        return token
+    
+    def _failed(self, error: str, retry_after: float) -> Optional[str]:
+        self.failures += 1
+        self.last_error = error
+        self._basic_until = time.monotonic() + retry_after
+        if self._token is not None and time.monotonic() < self._expires:
+            # Try again after the retry interval, not on the next request
+            self._refresh_at = min(time.monotonic() + retry_after, self._expires)
+            logger.warning(f"Bearer token refresh failed, keeping the current token: {error}")
+            return self._token
+        self._token = None
+        until = "from now on" if retry_after == float("inf") else f"for {retry_after:.0f}s"
+        logger.warning(f"No WordPress bearer token, using Basic auth {until}: {error}")
+        return None
+    
+    @staticmethod
+    def jwt_expiry(token: str) -> Optional[float]:
+        """exp claim of a JWT as a Unix timestamp (signature not checked); None if absent"""
+        try:
+            payload = token.split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            expiry = claims.get("exp")
+        except (IndexError, ValueError, AttributeError):
+            return None
+        return float(expiry) if isinstance(expiry, (int, float)) and not isinstance(expiry, bool) else None
+    
+    def close(self):
+        if self._background is not None and not self._background.done():
+            self._background.cancel()
+    
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        valid = self._token is not None and now < self._expires
+        return {
+            "mode": "jwt" if valid else "basic",
+            "token_expires_in": round(self._expires - now, 1) if valid else None,
+            "issued": self.issued,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "basic_requests": self.basic_requests,
+            "last_error": self.last_error
+        }
+
+class WordPressMCP:
+    """WordPress MCP client for managing posts via REST API"""
+    
+    # Post fields always requested from WordPress (via _fields)
+    BASE_FIELDS = ("id", "title", "excerpt", "link", "status", "date")
+    # Additional post fields callers may ask for
+    EXTRA_FIELDS = (
+        "content", "modified", "slug", "author", "categories",
+        "tags", "featured_media", "sticky", "format", "comment_status"
+    )
+    
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        shared: Optional[SharedCache] = None,
+        site: str = "default",
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        rate_limit: float = SITE_RATE_LIMIT,
+        cache_ttl: float = POSTS_CACHE_TTL,
+        auth: str = WORDPRESS_AUTH
+    ):
+        """
+        Initialize WordPress client with Basic or bearer token auth and a tuned connection pool
+        
+        Args:
+            site: Name of the site in the registry (metrics label)
+            max_connections: Connection pool size, also caps the adaptive concurrency limit
+            rate_limit: Requests per second sent to the site (0 = unlimited)
+            cache_ttl: Seconds get_posts results are cached
+            auth: "basic" or "jwt" (see TokenAuth)
+        """
+        self.site = site
+        self.api_root = url.rstrip('/') + '/wp-json'
+        self.url = self.api_root + '/wp/v2'
+        self._api_path = urlparse(self.api_root).path
+        
+        self.token_auth: Optional[TokenAuth] = None
+        if username and str(auth).lower() == "jwt":
+            self.token_auth = TokenAuth(
+                f"{self.api_root}/{WORDPRESS_TOKEN_PATH.strip('/')}", username, password, self._fetch_token
+            )
+        
+        self.http2 = HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+        if HTTP2_ENABLED and not self.http2:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+        
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(HTTP_MAX_KEEPALIVE_CONNECTIONS, max_connections),
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        )
+        self.client = httpx.AsyncClient(
+            auth=self.token_auth or ((username, password) if username else None),
+            timeout=httpx.Timeout(
+                connect=HTTP_CONNECT_TIMEOUT,
+                read=HTTP_READ_TIMEOUT,
+                write=HTTP_WRITE_TIMEOUT,
+                pool=HTTP_POOL_TIMEOUT
+            ),
+            limits=self.limits,
+            http2=self.http2,
+            headers={'Content-Type': 'application/json'}
+        )
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self.breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        self.limiter = AIMDLimiter(
+            ADAPTIVE_CONCURRENCY_INITIAL,
+            ADAPTIVE_CONCURRENCY_MIN,
+            min(ADAPTIVE_CONCURRENCY_MAX, max_connections),
+            ADAPTIVE_LATENCY_TARGET
+        )
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.retries = 0
+        self._batch_max_items: Optional[int] = None  # None until probed, 0 = unsupported
+        self.posts_cache = TTLCache(POSTS_CACHE_MAX_ENTRIES, cache_ttl)
+        self._posts_generation = 0  # Bumped by every write that touches listings
+        # Single-post reads: (post_id, extra_fields) -> post, and IDs WordPress didn't return
+        self.post_cache = TTLCache(POST_CACHE_MAX_ENTRIES, POST_CACHE_TTL)
+        self.missing_posts = TTLCache(POST_CACHE_MAX_ENTRIES, POST_NEGATIVE_CACHE_TTL)
+        self.post_loader = BatchLoader(self._load_posts, POST_LOADER_WINDOW, 100)
+        self.authenticated = bool(username)
+        self.shared = shared  # Cache shared with other worker processes, if any
+        self.mirror: Optional[PostMirror] = None  # Local searchable copy, if enabled
+        # post_id -> (modified_gmt, {field: raw value}) for diffing updates; validated by modified_gmt
+        self.raw_fields = TTLCache(UPDATE_DIFF_CACHE_ENTRIES if UPDATE_DIFF_ENABLED else 0, 3600.0)
+        self.update_bytes_saved = 0
+        self.updates_skipped = 0
+        self.media_index: Optional[MediaIndex] = None  # Uploaded file hashes, set at startup
+        self._source_client: Optional[httpx.AsyncClient] = None  # Fetches upload_media URLs
+        self._shared_generation: Optional[int] = None
+        self.reads = SingleFlight()
+        self._probes = SingleFlight()
+        self._upstream_check: Optional[Dict[str, Any]] = None
+        self._upstream_checked = 0.0
+        logger.info(f"WordPress MCP client initialized for {url} (site {site})")
+    
+    # Methods safe to resend after a failure that may have reached WordPress
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+    # Statuses worth retrying; 429 is retried for any method (request was refused)
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request to WordPress through the resilience layer
+        
+        Idempotent requests are retried with jittered exponential backoff
+        (honoring Retry-After); non-idempotent ones only when the connection
+        could not be established. Every attempt passes the circuit breaker
+        and the adaptive concurrency limiter.
+        
+        Raises:
+            CircuitOpenError: WordPress is considered down
+            httpx.TransportError: Network failure after all attempts
+        """
+        idempotent = method in self.IDEMPOTENT_METHODS
+        route = self._route(url)
+        attempt = 1
+        
+        while True:
+            try:
+                self.breaker.before_request()
+            except CircuitOpenError:
+                upstream_requests.inc(self.site, method, route, "circuit_open")
+                raise
+            
+            queued = time.monotonic()
+            with span("queue"):
+                await self.rate_limiter.acquire()
+                await self.limiter.acquire()
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+            started = time.monotonic()
+            upstream_queue_wait.observe(started - queued)
+            response = None
+            error = None
+            with span("upstream", SPAN_CLIENT, **{"http.request.method": method, "url.template": route}) as upstream_span:
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    error = e
+                finally:
+                    self._in_flight -= 1
+                    elapsed = time.monotonic() - started
+                    overloaded = (
+                        isinstance(error, httpx.TimeoutException)
+                        or (response is not None and response.status_code in (429, 503))
+                    )
+                    await self.limiter.release(elapsed, overloaded)
+                    upstream_duration.observe(elapsed, self.site, method, route)
+                    upstream_requests.inc(self.site, method, route, str(response.status_code) if response is not None else "error")
+                upstream_span.set("http.response.status_code" if response is not None else "error.type",
+                                  response.status_code if response is not None else type(error).__name__)
+            
+            if error is not None:
+                self.breaker.record_failure()
+                retryable = idempotent or isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+            elif response.status_code >= 500:
+                self.breaker.record_failure()
+                retryable = idempotent and response.status_code in self.RETRY_STATUSES
+            else:
+                self.breaker.record_success()
+                retryable = response.status_code == 429
+            
+            if not retryable or attempt >= RETRY_MAX_ATTEMPTS:
+                if error is not None:
+                    raise error
+                return response
+            
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+            if response is not None:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    delay = min(retry_after, RETRY_MAX_DELAY)
+            
+            reason = error if error is not None else f"HTTP {response.status_code}"
+            logger.warning(
+                f"Retrying {method} {url} in {delay:.2f}s "
+                f"(attempt {attempt + 1}/{RETRY_MAX_ATTEMPTS}): {reason}"
+            )
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+    
+    # Numeric path segments (post IDs etc.), collapsed so routes stay low-cardinality
+    ROUTE_ID_RE = re.compile(r"/\d+(?=/|$)")
+    
+    def _route(self, url: str) -> str:
+        """REST route of a request URL for metrics, e.g. /wp/v2/posts/{id}"""
+        path = urlparse(url).path
+        if path.startswith(self._api_path):
+            path = path[len(self._api_path):] or "/"
+        return self.ROUTE_ID_RE.sub("/{id}", path)
+    
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Retry, circuit breaker and concurrency limiter state for monitoring"""
+        return {
+            "retries": self.retries,
+            "circuit": self.breaker.stats(),
+            "concurrency": self.limiter.stats(),
+            "rate_limit": self.rate_limiter.stats(),
+            "auth": self.token_auth.stats() if self.token_auth else {"mode": "basic"}
+        }
+    
+    async def _fetch_token(self, url: str, credentials: Dict[str, str]) -> httpx.Response:
+        """Exchange credentials for a bearer token (TokenAuth), bypassing auth and the request limiters"""
+        started = time.monotonic()
+        response = None
+        try:
+            response = await self.client.post(url, json=credentials, auth=None)
+            return response
+        finally:
+            route = self._route(url)
+            upstream_duration.observe(time.monotonic() - started, self.site, "POST", route)
+            upstream_requests.inc(self.site, "POST", route, str(response.status_code) if response is not None else "error")
+    
+    async def warm_up(self, connections: int = HTTP_WARMUP_CONNECTIONS):
+        """
+        Open connections to WordPress ahead of the first tool call
+        
+        Concurrent HEAD requests force the TLS handshakes now instead of on
+        the first user request. With HTTP/2 a single connection is enough.
+        """
+        if connections <= 0:
+            return
+        if self.http2:
+            connections = 1
+        
+        started = time.monotonic()
+        results = await asyncio.gather(
+            *(self._request("HEAD", f"{self.api_root}/") for _ in range(connections)),
+            return_exceptions=True
+        )
+        failed = [result for result in results if isinstance(result, Exception)]
+        
+        if failed:
+            logger.warning(f"Connection warm-up: {len(failed)} of {connections} failed: {failed[0]}")
+        else:
+            logger.info(
+                f"Warmed up {connections} connections in "
+                f"{(time.monotonic() - started) * 1000:.0f} ms"
+            )
+    
+    async def check_upstream(self) -> Dict[str, Any]:
+        """
+        Whether WordPress is answering right now, for /health readiness
+        
+        Sends HEAD /wp-json/ directly through the client - no retries,
+        circuit breaker or concurrency limiter, so a probe isn't queued behind
+        tool traffic. The result is reused for HEALTH_CHECK_TTL seconds and
+        concurrent probes share one request.
+        """
+        if self._upstream_check is not None and time.monotonic() - self._upstream_checked < HEALTH_CHECK_TTL:
+            return self._upstream_check
+        return await self._probes.do("upstream", self._probe_upstream)
+    
+    async def _probe_upstream(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        check: Dict[str, Any] = {"reachable": False, "status_code": None, "latency_ms": None, "error": None}
+        try:
+            response = await self.client.head(f"{self.api_root}/", timeout=HEALTH_CHECK_TIMEOUT)
+            check["status_code"] = response.status_code
+            check["reachable"] = response.status_code < 400
+            if not check["reachable"]:
+                check["error"] = f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            check["error"] = f"{type(e).__name__}: {e}"
+        check["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+        
+        if self._upstream_check and self._upstream_check["reachable"] != check["reachable"]:
+            log = logger.info if check["reachable"] else logger.warning
+            log(f"WordPress became {'reachable' if check['reachable'] else 'unreachable'}: {check['error'] or 'OK'}")
+        self._upstream_check = check
+        self._upstream_checked = time.monotonic()
+        return check
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool utilisation for monitoring"""
+        stats = {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "utilisation": round(self._in_flight / self.limits.max_connections, 4)
+        }
+        
+        # httpcore doesn't expose pool state publicly; read it if available
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        pool_connections = getattr(pool, "connections", None)
+        if pool_connections is not None:
+            stats["open_connections"] = len(pool_connections)
+            stats["idle_connections"] = sum(1 for conn in pool_connections if conn.is_idle())
+        
+        return stats
+    
+    async def create_post(
+        self, 
+        title: str, 
+        content: str, 
+        excerpt: str = "", 
+        status: str = "publish"
+    ) -> Dict[str, Any]:
+        """
+        Create a new WordPress post
+        
+        Args:
+            title: Post title
+            content: Post content (HTML)
+            excerpt: Post excerpt
+            status: Post status (publish, draft, private)
+            
+        Returns:
+            Dict with success, post_id, url, message
+        """
+        try:
+            logger.info(f"Creating post: {title}")
+            
+            data = {
+                "title": title,
+                "content": content,
+                "excerpt": excerpt,
+                "status": status
+            }
+            
+            response = await self._request("POST", f"{self.url}/posts", json=data)
+            response.raise_for_status()
+            
+            post = response.json()
+            post_id = post.get('id')
+            post_url = post.get('link')
+            
+            logger.info(f"Post created successfully: ID={post_id}, URL={post_url}")
+            await self.invalidate_posts_cache()
+            self.forget_posts({post_id})
+            if self.mirror is not None:
+                await self.mirror.upsert([post])
+            
+            return {
+                "success": True,
+                "post_id": post_id,
+                "url": post_url,
+                "message": f"Post '{title}' created successfully!"
+            }
+            
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP error creating post: {http_error_detail(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "post_id": None,
+                "url": None,
+                "message": error_msg
+            }
+        except Exception as e:
+            error_msg = f"Error creating post: {str(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "post_id": None,
+                "url": None,
+                "message": error_msg
+            }
+    
+    async def update_post(
+        self,
+        post_id: int,
+        title: Optional[str] = None,
+        content: Optional[str] = None,
+        excerpt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Update an existing WordPress post
+        
+        Args:
+            post_id: Post ID to update
+            title: New title (optional)
+            content: New content (optional)
+            excerpt: New excerpt (optional)
+            
+        Returns:
+            Dict with success, post_id, url, message
+        """
+        try:
+            logger.info(f"Updating post ID: {post_id}")
+            
+            data = {}
+            if title is not None:
+                data["title"] = title
+            if content is not None:
+                data["content"] = content
+            if excerpt is not None:
+                data["excerpt"] = excerpt
+            
+            if not data:
+                return {
+                    "success": False,
+                    "post_id": post_id,
+                    "url": None,
+                    "message": "No fields to update"
+                }
+            
+            data, saved_bytes = await self._diff_update(post_id, data)
+            if not data:
+                return self._skipped_update(post_id, saved_bytes)
+            return await self._send_update(post_id, data, saved_bytes)
+            
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP error updating post: {http_error_detail(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "post_id": post_id,
+                "url": None,
+                "message": error_msg
+            }
+        except Exception as e:
+            error_msg = f"Error updating post: {str(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "post_id": post_id,
+                "url": None,
+                "message": error_msg
+            }
+    
+    async def _diff_update(self, post_id: int, data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+        """
+        Drop the fields of an update that already have the requested values
+        
+        Returns:
+            (fields to send, bytes of request body saved)
+        
+        Raises:
+            httpx.HTTPStatusError: The post doesn't exist (404)
+        """
+        requested_bytes = len(dump_json(data).encode("utf-8"))
+        if UPDATE_DIFF_ENABLED:
+            current = await self._current_raw_fields(post_id, tuple(data))
+            if current is not None:
+                data = {field: value for field, value in data.items() if current.get(field) != value}
+        saved_bytes = requested_bytes - len(dump_json(data).encode("utf-8")) if data else requested_bytes
+        return data, saved_bytes
+    
+    def _skipped_update(self, post_id: int, saved_bytes: int) -> Dict[str, Any]:
+        """Result of an update that would change nothing (not sent)"""
+        logger.info(f"Post ID {post_id} unchanged, skipping update ({saved_bytes} bytes not sent)")
+        self.updates_skipped += 1
+        self.update_bytes_saved += saved_bytes
+        return {
+            "success": True,
+            "post_id": post_id,
+            "url": None,
+            "skipped": True,
+            "changed_fields": [],
+            "bytes_saved": saved_bytes,
+            "message": f"Post ID {post_id} already has these values, nothing was changed"
+        }
+    
+    async def _send_update(self, post_id: int, data: Dict[str, Any], saved_bytes: int) -> Dict[str, Any]:
+        """Send already diffed fields of a post update"""
+        try:
+            response = await self._request("POST", f"{self.url}/posts/{post_id}", json=data)
+            response.raise_for_status()
+            
+            post = response.json()
+            post_url = post.get('link')
+            
+            logger.info(f"Post updated successfully: ID={post_id}, URL={post_url}, fields={list(data)}")
+            self.update_bytes_saved += saved_bytes
+            await self.invalidate_posts_cache({post_id})
+            self.forget_posts({post_id})
+            self._remember_raw_fields(post)
+            if self.mirror is not None:
+                await self.mirror.upsert([post])
+            
+            return {
+                "success": True,
+                "post_id": post_id,
+                "url": post_url,
+                "skipped": False,
+                "changed_fields": list(data),
+                "bytes_saved": saved_bytes,
+                "message": f"Post ID {post_id} updated successfully!"
+            }
+            
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP error updating post: {http_error_detail(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "post_id": post_id,
+                "url": None,
+                "message": error_msg
+            }
+        except Exception as e:
+            error_msg = f"Error updating post: {str(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "post_id": post_id,
+                "url": None,
+                "message": error_msg
+            }
+    
+    async def _current_raw_fields(self, post_id: int, fields: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        """
+        Current raw (unrendered) values of a post's fields, for diffing an update
+        
+        Values remembered from an earlier update are reused if the post's
+        modified_gmt hasn't changed, so only that one field is downloaded;
+        otherwise the requested fields are fetched with context=edit.
+        
+        Returns:
+            Dict of field -> raw value, or None if they couldn't be determined
+            (the update then sends every field)
+        
+        Raises:
+            httpx.HTTPStatusError: The post doesn't exist (404)
+        """
+        try:
+            cached = self.raw_fields.get(post_id)
+            if cached is not None and all(field in cached[1] for field in fields):
+                response = await self._request(
+                    "GET",
+                    f"{self.url}/posts/{post_id}",
+                    params={"context": "edit", "_fields": "modified_gmt"}
+                )
+                response.raise_for_status()
+                if response.json().get("modified_gmt") == cached[0]:
+                    return cached[1]
+            
+            response = await self._request(
+                "GET",
+                f"{self.url}/posts/{post_id}",
+                params={"context": "edit", "_fields": ",".join(("modified_gmt",) + fields)}
+            )
+            response.raise_for_status()
+            post = response.json()
+            self._remember_raw_fields(post, post_id)
+            return self._raw_values(post)
+            
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                raise  # the update would fail the same way
+            logger.warning(f"Couldn't read post ID {post_id} for diffing (HTTP {e.response.status_code}), sending all fields")
+            return None
+        except Exception as e:
+            logger.warning(f"Couldn't read post ID {post_id} for diffing, sending all fields: {e}")
+            return None
+    
+    @staticmethod
+    def _raw_values(post: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            field: post[field]["raw"]
+            for field in ("title", "content", "excerpt")
+            if isinstance(post.get(field), dict) and "raw" in post[field]
+        }
+    
+    def _remember_raw_fields(self, post: Dict[str, Any], post_id: Optional[int] = None):
+        """Keep raw values from an edit-context response for the next diff"""
+        post_id = post.get("id", post_id)
+        values = self._raw_values(post)
+        if post_id is not None and values and post.get("modified_gmt"):
+            self.raw_fields.set(post_id, (post["modified_gmt"], values))
+    
+    @classmethod
+    def _normalize_fields(cls, fields: Optional[List[str]]) -> Tuple[str, ...]:
+        """Reduce requested extra fields to a sorted tuple of supported ones"""
+        if not fields:
+            return ()
+        return tuple(sorted(set(fields) & set(cls.EXTRA_FIELDS)))
+    
+    @classmethod
+    def _fields_param(cls, extra_fields: Tuple[str, ...]) -> str:
+        """Build the WordPress _fields parameter for a post listing"""
+        return ",".join(cls.BASE_FIELDS + extra_fields)
+    
+    @staticmethod
+    def _project_post(post: Dict[str, Any], extra_fields: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """Extract relevant post information from a WordPress post object"""
+        projected = {
+            "id": post.get('id'),
+            "title": post.get('title', {}).get('rendered', ''),
+            "excerpt": post.get('excerpt', {}).get('rendered', ''),
+            "url": post.get('link'),
+            "status": post.get('status'),
+            "date": post.get('date')
+        }
+        for field in extra_fields:
+            value = post.get(field)
+            if isinstance(value, dict) and "rendered" in value:
+                value = value["rendered"]
+            projected[field] = value
+        return projected
+    
+    async def get_posts(
+        self,
+        per_page: int = 10,
+        page: int = 1,
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get list of WordPress posts
+        
+        Only the needed fields are requested from WordPress (_fields).
+        Concurrent identical calls share a single upstream request.
+        
+        Args:
+            per_page: Number of posts per page (1-100)
+            page: Page number
+            fields: Extra post fields to include (see EXTRA_FIELDS)
+            
+        Returns:
+            Dict with success, posts, count, message
+        """
+        logger.info(f"Getting posts: per_page={per_page}, page={page}, fields={fields}")
+        
+        extra_fields = self._normalize_fields(fields)
+        params = {
+            "per_page": min(max(per_page, 1), 100),
+            "page": max(page, 1),
+            "_fields": self._fields_param(extra_fields)
+        }
+        
+        cache_key = ("posts", params["per_page"], params["page"], extra_fields)
+        await self._sync_shared_generation()
+        cached = self.posts_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Returning {cached['count']} posts from cache")
+            return cached
+        
+        if self.shared is not None and self.posts_cache.enabled:
+            entry = await self.shared.get(self._shared_key(cache_key), self._shared_generation)
+            if entry is not None:
+                self.posts_cache.set(cache_key, entry[0], entry[1])
+                logger.info(f"Returning {entry[0]['count']} posts from shared cache")
+                return entry[0]
+        
+        # Readers arriving after one of our writes must not join an older read
+        generation = self._posts_generation
+        return await self.reads.do(
+            (cache_key, generation),
+            lambda: self._fetch_posts(params, cache_key, extra_fields, generation)
+        )
+    
+    async def _fetch_posts(
+        self,
+        params: Dict[str, Any],
+        cache_key: Hashable,
+        extra_fields: Tuple[str, ...],
+        generation: int
+    ) -> Dict[str, Any]:
+        """Fetch (or revalidate) a post listing from WordPress and cache it"""
+        shared_generation = self._shared_generation
+        try:
+            # Revalidate an expired listing instead of downloading it again
+            headers = {}
+            stale = self.posts_cache.peek(cache_key)
+            if stale is not None and stale[1] is not None:
+                etag, last_modified = stale[1]
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+            
+            response = await self._request("GET", f"{self.url}/posts", params=params, headers=headers)
+            
+            if response.status_code == 304 and headers:
+                self.posts_cache.refresh(cache_key)
+                logger.info(f"Posts not modified, reusing {stale[0]['count']} cached posts")
+                return stale[0]
+            
+            response.raise_for_status()
+            
+            posts = response.json()
+            
+            post_list = [self._project_post(post, extra_fields) for post in posts]
+            
+            logger.info(f"Retrieved {len(post_list)} posts")
+            
+            result = {
+                "success": True,
+                "posts": post_list,
+                "count": len(post_list),
+                "message": f"Retrieved {len(post_list)} posts"
+            }
+            
+            # A write finished while we were reading: the listing may be stale
+            if generation == self._posts_generation:
+                validators = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                metadata = validators if any(validators) else None
+                self.posts_cache.set(cache_key, result, metadata)
+                if self.shared is not None and self.posts_cache.enabled:
+                    await self.shared.set(self._shared_key(cache_key), shared_generation, result, metadata)
+            
+            return result
+            
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP error getting posts: {http_error_detail(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "posts": [],
+                "count": 0,
+                "message": error_msg
+            }
+        except Exception as e:
+            error_msg = f"Error getting posts: {str(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "posts": [],
+                "count": 0,
+                "message": error_msg
+            }
+    
+    # ------------------------------------------------------------------------
+    # Single-post reads
+    # ------------------------------------------------------------------------
+    
+    # Extra fields returned by get_post / get_posts_by_ids when none are requested
+    POST_DETAIL_FIELDS = ("content", "modified", "slug")
+    
+    async def get_posts_by_ids(
+        self,
+        post_ids: List[int],
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get posts by ID
+        
+        Posts are answered from the mirror (when enabled, no fields are
+        given and it was synced within POST_CACHE_TTL, so it is no staler
+        than the cache), then the per-post cache. The rest go through the post
+        loader: lookups from all concurrent calls arriving within
+        POST_LOADER_WINDOW are sent as one /posts?include= request. IDs
+        WordPress doesn't return are remembered as missing for
+        POST_NEGATIVE_CACHE_TTL seconds.
+        
+        Args:
+            post_ids: Post IDs, returned in this order
+            fields: Extra post fields to include (default: content, modified, slug)
+        
+        Returns:
+            Dict with success, posts, missing (IDs not found), count, message
+        """
+        extra_fields = self.POST_DETAIL_FIELDS if fields is None else self._normalize_fields(fields)
+        await self._sync_shared_generation()
+        
+        use_mirror = (
+            self.mirror is not None and fields is None
+            and await self.mirror.synced_within(POST_CACHE_TTL)
+        )
+        found: Dict[int, Optional[Dict[str, Any]]] = {}
+        to_load = []
+        for post_id in dict.fromkeys(post_ids):
+            post = await self.mirror.get(post_id) if use_mirror else None
+            if post is None:
+                post = self.post_cache.get((post_id, extra_fields))
+            if post is not None:
+                found[post_id] = post
+            elif self.missing_posts.get(post_id) is not None:
+                found[post_id] = None
+            else:
+                to_load.append(post_id)
+        
+        if to_load:
+            logger.info(f"Loading posts by ID: {to_load}, fields={list(extra_fields)}")
+            try:
+                loaded = await asyncio.gather(*(self.post_loader.load(extra_fields, post_id) for post_id in to_load))
+            except httpx.HTTPStatusError as e:
+                error_msg = f"HTTP error getting posts: {http_error_detail(e)}"
+                logger.error(error_msg)
+                return {"success": False, "posts": [], "missing": [], "count": 0, "message": error_msg}
+            except Exception as e:
+                error_msg = f"Error getting posts: {str(e)}"
+                logger.error(error_msg)
+                return {"success": False, "posts": [], "missing": [], "count": 0, "message": error_msg}
+            found.update(zip(to_load, loaded))
+        
+        posts = [post for post in found.values() if post is not None]
+        missing = [post_id for post_id, post in found.items() if post is None]
+        message = f"Retrieved {len(posts)} posts"
+        if missing:
+            message += f", not found: {', '.join(str(post_id) for post_id in missing)}"
+        return {
+            "success": True,
+            "posts": posts,
+            "missing": missing,
+            "count": len(posts),
+            "message": message
+        }
+    
+    async def get_post(self, post_id: int, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Get a single post (see get_posts_by_ids)
+        
+        Returns:
+            Dict with success, post, message
+        """
+        result = await self.get_posts_by_ids([post_id], fields)
+        if not result["success"]:
+            return {"success": False, "post": None, "message": result["message"]}
+        if not result["posts"]:
+            return {"success": False, "post": None, "message": f"Post ID {post_id} not found"}
+        return {"success": True, "post": result["posts"][0], "message": f"Retrieved post ID {post_id}"}
+    
+    async def _load_posts(self, extra_fields: Tuple[str, ...], post_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Batch function of the post loader: one /posts?include= request, results cached per ID"""
+        generation = self._posts_generation
+        params = {
+            "include": ",".join(str(post_id) for post_id in post_ids),
+            "per_page": 100,
+            "_fields": self._fields_param(extra_fields)
+        }
+        if self.authenticated:
+            params["status"] = "any"  # include drafts, pending and private posts like /posts/<id> does
+        
+        response = await self._request("GET", f"{self.url}/posts", params=params)
+        response.raise_for_status()
+        posts = {post["id"]: self._project_post(post, extra_fields) for post in response.json()}
+        logger.info(f"Loaded {len(posts)} of {len(post_ids)} posts in one request")
+        
+        # A write finished while we were reading: don't cache what may be stale
+        if generation == self._posts_generation:
+            for post_id in post_ids:
+                if post_id in posts:
+                    self.post_cache.set((post_id, extra_fields), posts[post_id])
+                else:
+                    self.missing_posts.set(post_id, True)
+        return posts
+    
+    # ------------------------------------------------------------------------
+    # Full-site iteration
+    # ------------------------------------------------------------------------
+    
+    async def iter_post_pages(
+        self,
+        per_page: int = 100,
+        prefetch: int = ITER_POSTS_PREFETCH,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over every post on the site, one page at a time
+        
+        Up to `prefetch` following pages are requested while the current page
+        is being consumed, so at most prefetch + 1 pages are held in memory.
+        Posts are ordered by ID so that new posts don't shift pages mid-scan.
+        
+        Args:
+            per_page: Posts per upstream request (1-100)
+            prefetch: Number of pages fetched ahead of the consumer
+            fields: Extra post fields to include (see EXTRA_FIELDS)
+            
+        Yields:
+            Dict with page, total_pages, total, posts
+        """
+        per_page = min(max(per_page, 1), 100)
+        extra_fields = self._normalize_fields(fields)
+        params = {
+            "per_page": per_page,
+            "orderby": "id",
+            "order": "asc",
+            "_fields": self._fields_param(extra_fields)
+        }
+        
+        async def fetch(page: int) -> httpx.Response:
+            response = await self._request("GET", f"{self.url}/posts", params={**params, "page": page})
+            response.raise_for_status()
+            return response
+        
+        first = await fetch(1)
+        total = int(first.headers.get("X-WP-Total", 0))
+        total_pages = int(first.headers.get("X-WP-TotalPages", 1))
+        logger.info(f"Iterating posts: total={total}, pages={total_pages}")
+        
+        pending: Deque[asyncio.Task] = deque()
+        next_page = 2
+        try:
+            while next_page <= total_pages and len(pending) < prefetch:
+                pending.append(asyncio.create_task(fetch(next_page)))
+                next_page += 1
+            
+            page, response = 1, first
+            while True:
+                posts = [self._project_post(post, extra_fields) for post in response.json()]
+                yield {
+                    "page": page,
+                    "total_pages": total_pages,
+                    "total": total,
+                    "posts": posts
                 }
-                for post in posts
-            ]
+                
+                if not pending:
+                    break
+                response = await pending.popleft()
+                page += 1
+                if next_page <= total_pages:
+                    pending.append(asyncio.create_task(fetch(next_page)))
+                    next_page += 1
+        finally:
+            # Consumer stopped early or a page failed: drop prefetched pages and
+            # wait for them, so none outlive the generator or leave an unretrieved error
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def iter_posts(
+        self,
+        per_page: int = 100,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every post on the site (see iter_post_pages)
+        
+        Args:
+            per_page: Posts per upstream request (1-100)
+            fields: Extra post fields to include (see EXTRA_FIELDS)
             
-            logger.info(f"Retrieved {len(post_list)} posts")
+        Yields:
+            Post dicts in the same shape as get_posts
+        """
+        async for page in self.iter_post_pages(per_page, fields=fields):
+            for post in page["posts"]:
+                yield post
+    
+    async def collect_posts(
+        self,
+        max_posts: int = ITER_POSTS_MAX_BUFFERED,
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Collect posts from the whole site into a single, size-capped result
+        
+        Used when the caller can't receive a streamed response.
+        
+        Args:
+            max_posts: Maximum number of posts to return (at most ITER_POSTS_MAX_BUFFERED)
+            fields: Extra post fields to include (see EXTRA_FIELDS)
+            
+        Returns:
+            Dict with success, posts, count, total, truncated, message
+        """
+        max_posts = min(max_posts, ITER_POSTS_MAX_BUFFERED)
+        post_list: List[Dict[str, Any]] = []
+        total = 0
+        try:
+            logger.info(f"Collecting posts: max_posts={max_posts}")
+            
+            async for page in self.iter_post_pages(fields=fields):
+                total = page["total"]
+                post_list.extend(page["posts"][:max_posts - len(post_list)])
+                report_progress(len(post_list), min(total, max_posts))
+                if len(post_list) >= max_posts:
+                    break
+            
+            truncated = len(post_list) < total
+            message = f"Retrieved {len(post_list)} of {total} posts"
+            if truncated:
+                message += " (request the tool with Accept: text/event-stream to stream all posts)"
             
             return {
                 "success": True,
                 "posts": post_list,
                 "count": len(post_list),
-                "message": f"Retrieved {len(post_list)} posts"
+                "total": total,
+                "truncated": truncated,
+                "message": message
+            }
+            
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP error iterating posts: {http_error_detail(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "posts": [],
+                "count": 0,
+                "total": total,
+                "truncated": False,
+                "message": error_msg
+            }
+        except Exception as e:
+            error_msg = f"Error iterating posts: {str(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "posts": [],
+                "count": 0,
+                "total": total,
+                "truncated": False,
+                "message": error_msg
+            }
+    
+    async def delete_post(self, post_id: int) -> Dict[str, Any]:
+        """
+        Delete a WordPress post
+        
+        Args:
+            post_id: Post ID to delete
+            
+        Returns:
+            Dict with success, post_id, message
+        """
+        try:
+            logger.info(f"Deleting post ID: {post_id}")
+            
+            response = await self._request("DELETE", f"{self.url}/posts/{post_id}")
+            response.raise_for_status()
+            
+            logger.info(f"Post deleted successfully: ID={post_id}")
+            await self.invalidate_posts_cache()
+            self.forget_posts({post_id})
+            if self.mirror is not None:
+                await self.mirror.delete([post_id])
+            
+            return {
+                "success": True,
+                "post_id": post_id,
+                "message": f"Post ID {post_id} deleted successfully!"
+            }
+            
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP error deleting post: {http_error_detail(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "post_id": post_id,
+                "message": error_msg
+            }
+        except Exception as e:
+            error_msg = f"Error deleting post: {str(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "post_id": post_id,
+                "message": error_msg
+            }
+    
+    async def invalidate_posts_cache(self, post_ids: Optional[Set[int]] = None):
+        """
+        Drop cached listings affected by a write
+        
+        Args:
+            post_ids: Updated post IDs. Only listings containing them are dropped.
+                If None (create/delete shifts pagination), all listings are dropped.
+        """
+        self._posts_generation += 1
+        if self.shared is not None:
+            previous = self._shared_generation
+            self._shared_generation = await self.shared.bump_generation()
+            if self._shared_generation != (previous or 0) + 1:
+                post_ids = None  # another worker wrote too; its changes are unknown here
+        if post_ids is None:
+            dropped = self.posts_cache.invalidate()
+        else:
+            dropped = self.posts_cache.invalidate(
+                lambda key, value: any(post["id"] in post_ids for post in value["posts"])
+            )
+        if dropped:
+            logger.info(f"Invalidated {dropped} cached post listings")
+    
+    def forget_posts(self, post_ids: Set[int]):
+        """Drop cached single posts (and missing-ID entries) for posts we wrote"""
+        self.post_cache.invalidate(lambda key, value: key[0] in post_ids)
+        self.missing_posts.invalidate(lambda key, value: key in post_ids)
+    
+    async def _sync_shared_generation(self):
+        """Drop local listings if another worker has written since the last check"""
+        if self.shared is None:
+            return
+        generation = await self.shared.generation()
+        if generation != self._shared_generation:
+            self._shared_generation = generation
+            self._posts_generation += 1
+            self.posts_cache.invalidate()
+            self.post_cache.invalidate()
+            self.missing_posts.invalidate()
+    
+    @staticmethod
+    def _shared_key(cache_key: Tuple[Any, ...]) -> str:
+        _, per_page, page, extra_fields = cache_key
+        return f"posts:{per_page}:{page}:{','.join(extra_fields)}"
+    
+    # ------------------------------------------------------------------------
+    # Bulk operations (WordPress /batch/v1)
+    # ------------------------------------------------------------------------
+    
+    async def get_batch_max_items(self) -> int:
+        """
+        Discover the WordPress batch endpoint limit
+        
+        Returns:
+            Max requests per batch, or 0 if the site doesn't support batching
+        """
+        if self._batch_max_items is not None:
+            return self._batch_max_items
+        
+        try:
+            response = await self._request("OPTIONS", f"{self.api_root}/batch/v1")
+            if response.status_code in (404, 405, 501):
+                self._batch_max_items = 0
+                logger.info("WordPress batch endpoint not available, using parallel requests")
+                return 0
+            response.raise_for_status()
+            
+            endpoints = response.json().get("endpoints") or [{}]
+            max_items = (
+                endpoints[0].get("args", {}).get("requests", {}).get("maxItems")
+                or BULK_DEFAULT_BATCH_SIZE
+            )
+            self._batch_max_items = int(max_items)
+            logger.info(f"WordPress batch endpoint available: maxItems={self._batch_max_items}")
+            return self._batch_max_items
+            
+        except Exception as e:
+            # Not cached: the probe is retried on the next bulk call
+            logger.error(f"Error probing batch endpoint: {str(e)}")
+            return 0
+    
+    async def _run_bulk(
+        self,
+        operations: List[Dict[str, Any]],
+        to_request: Callable[[Dict[str, Any]], Dict[str, Any]],
+        to_result: Callable[[Dict[str, Any], int, Any], Dict[str, Any]],
+        to_error: Callable[[Dict[str, Any], str], Dict[str, Any]],
+        fallback: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute operations through /batch/v1, falling back to parallel requests
+        
+        Args:
+            operations: Validated operations, one per item
+            to_request: Builds a batch sub-request from an operation
+            to_result: Builds an item result from (operation, status, body)
+            to_error: Builds an item failure result from (operation, message)
+            fallback: Executes a single operation with an individual request
+            
+        Returns:
+            List of item results in operation order
+        """
+        results: List[Dict[str, Any]] = []
+        max_items = await self.get_batch_max_items()
+        position = 0
+        
+        while position < len(operations) and max_items:
+            chunk = operations[position:position + max_items]
+            
+            try:
+                response = await self._request(
+                    "POST",
+                    f"{self.api_root}/batch/v1",
+                    json={
+                        "validation": "normal",
+                        "requests": [to_request(op) for op in chunk]
+                    }
+                )
+                if response.status_code in (404, 405, 501):
+                    # Batching went away (plugin/config change): nothing was applied
+                    self._batch_max_items = 0
+                    break
+                response.raise_for_status()
+                
+                responses = response.json().get("responses", [])
+                for index, op in enumerate(chunk):
+                    if index < len(responses):
+                        item = responses[index]
+                        results.append(to_result(op, item.get("status", 500), item.get("body")))
+                    else:
+                        results.append(to_error(op, "Missing response in batch"))
+                
+            except httpx.HTTPStatusError as e:
+                error_msg = f"HTTP error in batch request: {http_error_detail(e)}"
+                logger.error(error_msg)
+                results.extend(to_error(op, error_msg) for op in chunk)
+            except Exception as e:
+                error_msg = f"Error in batch request: {str(e)}"
+                logger.error(error_msg)
+                results.extend(to_error(op, error_msg) for op in chunk)
+            
+            position += len(chunk)
+            report_progress(position, len(operations))
+        
+        if position < len(operations):
+            semaphore = asyncio.Semaphore(BULK_FALLBACK_CONCURRENCY)
+            done = position
+            
+            async def run(op: Dict[str, Any]) -> Dict[str, Any]:
+                nonlocal done
+                async with semaphore:
+                    result = await fallback(op)
+                done += 1
+                report_progress(done, len(operations))
+                return result
+            
+            results.extend(await asyncio.gather(*(run(op) for op in operations[position:])))
+        
+        return results
+    
+    @staticmethod
+    def _bulk_summary(results: List[Dict[str, Any]], action: str) -> Dict[str, Any]:
+        """Summarize per-item bulk results"""
+        succeeded = sum(1 for result in results if result.get("success"))
+        failed = len(results) - succeeded
+        
+        logger.info(f"Bulk {action}: {succeeded} succeeded, {failed} failed")
+        
+        return {
+            "success": failed == 0,
+            "results": results,
+            "succeeded": succeeded,
+            "failed": failed,
+            "message": f"{succeeded} of {len(results)} posts {action} successfully"
+        }
+    
+    @staticmethod
+    def _item_error_message(action: str, status: int, body: Any) -> str:
+        """Format a failed batch item like the single-post error messages"""
+        return f"HTTP error {action} post: {status} - {json.dumps(body)}"
+    
+    async def create_posts(self, posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Create multiple WordPress posts
+        
+        Args:
+            posts: List of dicts with title, content, excerpt, status
+            
+        Returns:
+            Dict with success, results (one per post, same shape as create_post),
+            succeeded, failed, message
+        """
+        logger.info(f"Creating {len(posts)} posts")
+        
+        def to_request(op: Dict[str, Any]) -> Dict[str, Any]:
+            return {"method": "POST", "path": "/wp/v2/posts", "body": op}
+        
+        mirrored: List[Dict[str, Any]] = []  # Written to the mirror in one go afterwards
+        
+        def to_result(op: Dict[str, Any], status: int, body: Any) -> Dict[str, Any]:
+            if status >= 400 or not isinstance(body, dict):
+                return to_error(op, self._item_error_message("creating", status, body))
+            mirrored.append(body)
+            return {
+                "success": True,
+                "post_id": body.get('id'),
+                "url": body.get('link'),
+                "message": f"Post '{op['title']}' created successfully!"
+            }
+        
+        def to_error(op: Dict[str, Any], message: str) -> Dict[str, Any]:
+            return {
+                "success": False,
+                "post_id": None,
+                "url": None,
+                "message": message
+            }
+        
+        async def fallback(op: Dict[str, Any]) -> Dict[str, Any]:
+            return await self.create_post(**op)
+        
+        operations = []
+        invalid: Dict[int, Dict[str, Any]] = {}
+        for index, post in enumerate(posts):
+            if not isinstance(post, dict) or "title" not in post or "content" not in post:
+                invalid[index] = to_error({}, "Each post requires title and content")
+                continue
+            operations.append({
+                "title": post["title"],
+                "content": post["content"],
+                "excerpt": post.get("excerpt", ""),
+                "status": post.get("status", "publish")
+            })
+        
+        results = await self._run_bulk(operations, to_request, to_result, to_error, fallback)
+        if self.mirror is not None and mirrored:
+            await self.mirror.upsert(mirrored)
+        if any(result["success"] for result in results):
+            await self.invalidate_posts_cache()
+            self.forget_posts({result["post_id"] for result in results if result["success"]})
+        return self._bulk_summary(self._merge_invalid(results, invalid), "created")
+    
+    async def update_posts(self, posts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Update multiple WordPress posts
+        
+        Like update_post, each post is diffed against its current values
+        first: unchanged fields are not sent and posts that would not change
+        are skipped without a request (and without a new revision).
+        
+        Args:
+            posts: List of dicts with post_id and optional title, content, excerpt
+            
+        Returns:
+            Dict with success, results (one per post, same shape as update_post),
+            succeeded, failed, message
+        """
+        logger.info(f"Updating {len(posts)} posts")
+        
+        def to_request(op: Dict[str, Any]) -> Dict[str, Any]:
+            return {"method": "POST", "path": f"/wp/v2/posts/{op['post_id']}", "body": op["data"]}
+        
+        mirrored: List[Dict[str, Any]] = []  # Written to the mirror in one go afterwards
+        
+        def to_result(op: Dict[str, Any], status: int, body: Any) -> Dict[str, Any]:
+            if status >= 400 or not isinstance(body, dict):
+                return to_error(op, self._item_error_message("updating", status, body))
+            mirrored.append(body)
+            self.update_bytes_saved += op["bytes_saved"]
+            self._remember_raw_fields(body, op["post_id"])
+            return {
+                "success": True,
+                "post_id": op["post_id"],
+                "url": body.get('link'),
+                "skipped": False,
+                "changed_fields": list(op["data"]),
+                "bytes_saved": op["bytes_saved"],
+                "message": f"Post ID {op['post_id']} updated successfully!"
+            }
+        
+        def to_error(op: Dict[str, Any], message: str) -> Dict[str, Any]:
+            return {
+                "success": False,
+                "post_id": op.get("post_id"),
+                "url": None,
+                "message": message
+            }
+        
+        async def fallback(op: Dict[str, Any]) -> Dict[str, Any]:
+            return await self._send_update(op["post_id"], op["data"], op["bytes_saved"])
+        
+        requested = []
+        unsent: Dict[int, Dict[str, Any]] = {}  # Results of items not sent (invalid or unchanged)
+        for index, post in enumerate(posts):
+            if not isinstance(post, dict) or "post_id" not in post:
+                unsent[index] = to_error({}, "Each post requires post_id")
+                continue
+            data = {
+                field: post[field]
+                for field in ("title", "content", "excerpt")
+                if post.get(field) is not None
+            }
+            if not data:
+                unsent[index] = to_error(post, "No fields to update")
+                continue
+            requested.append((index, {"post_id": post["post_id"], "data": data}))
+        
+        semaphore = asyncio.Semaphore(BULK_FALLBACK_CONCURRENCY)
+        
+        async def diff(op: Dict[str, Any]) -> Optional[str]:
+            """Reduce op to its changed fields; returns an error message if the post can't be updated"""
+            async with semaphore:
+                try:
+                    op["data"], op["bytes_saved"] = await self._diff_update(op["post_id"], op["data"])
+                except httpx.HTTPStatusError as e:
+                    return f"HTTP error updating post: {http_error_detail(e)}"
+            return None
+        
+        errors = await asyncio.gather(*(diff(op) for _, op in requested))
+        operations = []
+        for (index, op), error in zip(requested, errors):
+            if error is not None:
+                unsent[index] = to_error(op, error)
+            elif not op["data"]:
+                unsent[index] = self._skipped_update(op["post_id"], op["bytes_saved"])
+            else:
+                operations.append(op)
+        
+        results = await self._run_bulk(operations, to_request, to_result, to_error, fallback)
+        if self.mirror is not None and mirrored:
+            await self.mirror.upsert(mirrored)
+        updated_ids = {result["post_id"] for result in results if result["success"]}
+        if updated_ids:
+            await self.invalidate_posts_cache(updated_ids)
+            self.forget_posts(updated_ids)
+        return self._bulk_summary(self._merge_invalid(results, unsent), "updated")
+    
+    async def delete_posts(self, post_ids: List[int]) -> Dict[str, Any]:
+        """
+        Delete multiple WordPress posts
+        
+        Args:
+            post_ids: List of post IDs to delete
+            
+        Returns:
+            Dict with success, results (one per post, same shape as delete_post),
+            succeeded, failed, message
+        """
+        logger.info(f"Deleting {len(post_ids)} posts")
+        
+        def to_request(op: Dict[str, Any]) -> Dict[str, Any]:
+            return {"method": "DELETE", "path": f"/wp/v2/posts/{op['post_id']}"}
+        
+        unmirrored: List[int] = []  # Removed from the mirror in one go afterwards
+        
+        def to_result(op: Dict[str, Any], status: int, body: Any) -> Dict[str, Any]:
+            if status >= 400:
+                return to_error(op, self._item_error_message("deleting", status, body))
+            unmirrored.append(op["post_id"])
+            return {
+                "success": True,
+                "post_id": op["post_id"],
+                "message": f"Post ID {op['post_id']} deleted successfully!"
+            }
+        
+        def to_error(op: Dict[str, Any], message: str) -> Dict[str, Any]:
+            return {
+                "success": False,
+                "post_id": op["post_id"],
+                "message": message
+            }
+        
+        async def fallback(op: Dict[str, Any]) -> Dict[str, Any]:
+            return await self.delete_post(op["post_id"])
+        
+        operations = [{"post_id": post_id} for post_id in post_ids]
+        
+        results = await self._run_bulk(operations, to_request, to_result, to_error, fallback)
+        if self.mirror is not None and unmirrored:
+            await self.mirror.delete(unmirrored)
+        if any(result["success"] for result in results):
+            await self.invalidate_posts_cache()
+            self.forget_posts({result["post_id"] for result in results if result["success"]})
+        return self._bulk_summary(results, "deleted")
+    
+    @staticmethod
+    def _merge_invalid(
+        results: List[Dict[str, Any]],
+        invalid: Dict[int, Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Re-insert results of items settled before sending (rejected or skipped), keeping input order"""
+        if not invalid:
+            return results
+        
+        merged = []
+        remaining = iter(results)
+        for index in range(len(results) + len(invalid)):
+            merged.append(invalid[index] if index in invalid else next(remaining))
+        return merged
+    
+    # ------------------------------------------------------------------------
+    # Media uploads
+    # ------------------------------------------------------------------------
+    
+    async def upload_media(self, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Upload files from MEDIA_LOCAL_ROOT or http(s) URLs to the media library
+        
+        Files are streamed in MEDIA_CHUNK_SIZE chunks (URL sources through a
+        temporary file), at most MEDIA_UPLOAD_CONCURRENCY at a time. Files of
+        MEDIA_DEDUPE_MIN_BYTES or more are identified by SHA-256, and a file
+        uploaded before is returned from the media index instead.
+        
+        Args:
+            files: List of dicts with source and optional filename, title,
+                alt_text, caption
+            
+        Returns:
+            Dict with success, results (media_id, url, ... per file),
+            succeeded, failed, message
+        """
+        logger.info(f"Uploading {len(files)} media files")
+        
+        semaphore = asyncio.Semaphore(MEDIA_UPLOAD_CONCURRENCY)
+        done = 0
+        
+        async def run(item: Dict[str, Any]) -> Dict[str, Any]:
+            nonlocal done
+            async with semaphore:
+                result = await self._upload_one(item)
+            done += 1
+            report_progress(done, len(files))
+            return result
+        
+        results = list(await asyncio.gather(*(run(item) for item in files)))
+        summary = self._bulk_summary(results, "uploaded")
+        summary["message"] = f"{summary['succeeded']} of {len(results)} files uploaded successfully"
+        return summary
+    
+    async def _upload_one(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Upload a single file (see upload_media)"""
+        source = item.get("source", "")
+        temp_path = None
+        try:
+            if source.startswith(("http://", "https://")):
+                temp_path, sha256, size, mime_type = await self._download_media(source)
+                path = temp_path
+                filename = item.get("filename") or os.path.basename(urlparse(source).path) or "upload"
+            else:
+                path = self._local_media_path(source)
+                size = os.path.getsize(path)
+                if size > MEDIA_MAX_BYTES:
+                    raise ValueError(f"{source} is larger than MEDIA_MAX_BYTES ({MEDIA_MAX_BYTES} bytes)")
+                sha256 = await hash_file(path) if size >= MEDIA_DEDUPE_MIN_BYTES else None
+                mime_type = None
+                filename = item.get("filename") or os.path.basename(path)
+            
+            if size < MEDIA_DEDUPE_MIN_BYTES:
+                sha256 = None
+            mime_type = mimetypes.guess_type(filename)[0] or mime_type or "application/octet-stream"
+            
+            if sha256 and self.media_index is not None:
+                known = await self.media_index.get(sha256)
+                if known is not None:
+                    check = await self._request(
+                        "GET",
+                        f"{self.url}/media/{known['media_id']}",
+                        params={"_fields": "id,source_url"}
+                    )
+                    if check.status_code == 200:
+                        logger.info(f"Media already uploaded: {filename} is media ID {known['media_id']}")
+                        return {
+                            "success": True,
+                            "source": source,
+                            "media_id": known["media_id"],
+                            "url": check.json().get("source_url", known["url"]),
+                            "mime_type": known["mime_type"],
+                            "bytes": size,
+                            "sha256": sha256,
+                            "deduplicated": True,
+                            "message": f"{filename} was already uploaded as media ID {known['media_id']}"
+                        }
+                    await self.media_index.forget(sha256)  # deleted from the library since
+            
+            logger.info(f"Uploading media: {filename} ({size} bytes, {mime_type})")
+            response = await self._request(
+                "POST",
+                f"{self.url}/media",
+                content=FileChunks(path),
+                params={field: item[field] for field in ("title", "alt_text", "caption") if item.get(field)},
+                headers={
+                    "Content-Type": mime_type,
+                    "Content-Disposition": content_disposition(filename),
+                    "Content-Length": str(size)
+                }
+            )
+            response.raise_for_status()
+            
+            media = response.json()
+            media_id = media.get("id")
+            media_url = media.get("source_url")
+            if sha256 and self.media_index is not None:
+                await self.media_index.set(sha256, media_id, media_url, mime_type, size)
+            
+            logger.info(f"Media uploaded successfully: ID={media_id}, URL={media_url}")
+            
+            return {
+                "success": True,
+                "source": source,
+                "media_id": media_id,
+                "url": media_url,
+                "mime_type": mime_type,
+                "bytes": size,
+                "sha256": sha256,
+                "deduplicated": False,
+                "message": f"{filename} uploaded as media ID {media_id}"
+            }
+            
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP error uploading media: {http_error_detail(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "source": source,
+                "media_id": None,
+                "url": None,
+                "message": error_msg
             }
-            
-        except httpx.HTTPStatusError as e:
-            error_msg = f"HTTP error getting posts: {e.response.status_code} - {e.response.text}"
+        except Exception as e:
+            error_msg = f"Error uploading media: {str(e)}"
             logger.error(error_msg)
             return {
                 "success": False,
-                "posts": [],
-                "count": 0,
+                "source": source,
+                "media_id": None,
+                "url": None,
                 "message": error_msg
             }
-        except Exception as e:
-            error_msg = f"Error getting posts: {str(e)}"
-            logger.error(error_msg)
-            return {
-                "success": False,
-                "posts": [],
-                "count": 0,
-                "message": error_msg
+        finally:
+            if temp_path is not None:
+                os.unlink(temp_path)
+    
+    @staticmethod
+    def _local_media_path(source: str) -> str:
+        """
+        Resolve a local upload source inside MEDIA_LOCAL_ROOT
+        
+        Raises:
+            ValueError: Local uploads are disabled or the file is outside the root
+        """
+        if not MEDIA_LOCAL_ROOT:
+            raise ValueError("Uploading local files is disabled (set MEDIA_LOCAL_ROOT)")
+        root = os.path.realpath(MEDIA_LOCAL_ROOT)
+        path = os.path.realpath(os.path.join(root, source))
+        if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+            raise ValueError(f"File not found in MEDIA_LOCAL_ROOT: {source}")
+        return path
+    
+    async def _download_media(self, url: str) -> Tuple[str, str, int, Optional[str]]:
+        """
+        Stream a URL to a temporary file, hashing it on the way
+        
+        Returns:
+            (temporary file path, SHA-256, size in bytes, Content-Type)
+        
+        Raises:
+            ValueError: URL uploads are disabled, host not allowed, download failed or file too large
+        """
+        if not MEDIA_ALLOW_URLS:
+            raise ValueError("Uploading from URLs is disabled (MEDIA_ALLOW_URLS)")
+        if self._source_client is None:
+            # Separate client: WordPress credentials must never go to other hosts.
+            # Redirects are followed by hand so every hop goes through pin_media_url.
+            self._source_client = httpx.AsyncClient(
+                follow_redirects=False,
+                trust_env=False,
+                timeout=httpx.Timeout(
+                    connect=HTTP_CONNECT_TIMEOUT,
+                    read=HTTP_READ_TIMEOUT,
+                    write=HTTP_WRITE_TIMEOUT,
+                    pool=HTTP_POOL_TIMEOUT
+                )
+            )
+        
+        loop = asyncio.get_running_loop()
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(prefix="wordpress-mcp-media-")
+        response = None
+        try:
+            with os.fdopen(fd, "wb") as file:
+                target = httpx.URL(url)
+                for _ in range(MEDIA_URL_MAX_REDIRECTS + 1):
+                    pinned, headers, extensions = await pin_media_url(target)
+                    request = self._source_client.build_request("GET", pinned, headers=headers, extensions=extensions)
+                    response = await self._source_client.send(request, stream=True)
+                    if not response.is_redirect:
+                        break
+                    target = target.join(response.headers["Location"])
+                    await response.aclose()
+                else:
+                    raise ValueError(f"Couldn't download {url}: more than {MEDIA_URL_MAX_REDIRECTS} redirects")
+                
+                if response.status_code >= 400:
+                    raise ValueError(f"Couldn't download {url}: HTTP {response.status_code}")
+                mime_type = response.headers.get("Content-Type", "").split(";")[0].strip() or None
+                async for chunk in response.aiter_bytes(MEDIA_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MEDIA_MAX_BYTES:
+                        raise ValueError(f"{url} is larger than MEDIA_MAX_BYTES ({MEDIA_MAX_BYTES} bytes)")
+                    digest.update(chunk)
+                    await loop.run_in_executor(None, file.write, chunk)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        finally:
+            if response is not None:
+                await response.aclose()
+        return temp_path, digest.hexdigest(), size, mime_type
+    
+    async def close(self):
+        """Close the HTTP clients"""
+        self.post_loader.close()
+        if self.token_auth is not None:
+            self.token_auth.close()
+        await self.client.aclose()
+        if self._source_client is not None:
+            await self._source_client.aclose()
+        logger.info(f"WordPress MCP client closed (site {self.site})")
+
+# ============================================================================
+# Post Mirror
+# ============================================================================
+
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+def html_to_text(value: str) -> str:
+    """Plain text of rendered HTML, for indexing and snippets"""
+    return " ".join(html.unescape(HTML_TAG_RE.sub(" ", value or "")).split())
+
+class PostMirror:
+    """
+    Local SQLite copy of the site's posts with an FTS5 full-text index
+    
+    Kept current incrementally: a periodic sync requests only posts with
+    modified_after the newest change already mirrored, our own writes are
+    applied from the WordPress responses, and a less frequent reconcile
+    pass (IDs only) drops posts deleted or trashed elsewhere. With several
+    workers one of them holds a sync lease; all of them read the file.
+    
+    search_posts and get_post are answered from here without WordPress.
+    Database calls (and the HTML to text conversion for the index) run in
+    a DatabaseThread.
+    """
+    
+    # Fields requested when mirroring posts
+    FIELDS = "id,title,excerpt,content,link,status,date,modified,slug"
+    
+    def __init__(self, path: str, wp: "WordPressMCP"):
+        self.path = path
+        self.wp = wp
+        self.node = str(os.getpid())
+        self.syncs = 0
+        self.errors = 0
+        self.searches = 0
+        self.last_sync_ms = 0.0
+        self._thread = DatabaseThread("post-mirror")
+        self._db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY, title TEXT, excerpt TEXT, content TEXT, text TEXT,
+                url TEXT, status TEXT, date TEXT, modified TEXT, slug TEXT
+            );
+            CREATE INDEX IF NOT EXISTS posts_modified ON posts (modified);
+            CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+                title, text, content='posts', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
+                INSERT INTO posts_fts (rowid, title, text) VALUES (new.id, new.title, new.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS posts_ad AFTER DELETE ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS posts_au AFTER UPDATE ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+                INSERT INTO posts_fts (rowid, title, text) VALUES (new.id, new.title, new.text);
+            END;
+            CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value);
+        """)
+    
+    # ------------------------------------------------------------------------
+    # Local reads and writes
+    # ------------------------------------------------------------------------
+    
+    async def upsert(self, posts: List[Dict[str, Any]]):
+        """Store WordPress post objects (as returned by the REST API)"""
+        await self._thread.run(self._upsert, posts)
+    
+    def _upsert(self, posts: List[Dict[str, Any]]):
+        rows = []
+        for post in posts:
+            if not isinstance(post, dict) or post.get("id") is None:
+                continue
+            if post.get("status") == "trash":
+                self._delete([post["id"]])
+                continue
+            title = html_to_text(post.get("title", {}).get("rendered", ""))
+            content = post.get("content", {}).get("rendered", "")
+            rows.append((
+                post["id"], title, post.get("excerpt", {}).get("rendered", ""), content,
+                html_to_text(content), post.get("link"), post.get("status"), post.get("date"),
+                post.get("modified"), post.get("slug")
+            ))
+        if not rows:
+            return
+        try:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                "title = excluded.title, excerpt = excluded.excerpt, content = excluded.content, "
+                "text = excluded.text, url = excluded.url, status = excluded.status, date = excluded.date, "
+                "modified = excluded.modified, slug = excluded.slug",
+                rows
+            )
+            self._db.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._db.execute("ROLLBACK")
+            self.errors += 1
+            logger.error(f"Mirror write failed: {e}")
+    
+    async def delete(self, post_ids: List[int]):
+        await self._thread.run(self._delete, post_ids)
+    
+    def _delete(self, post_ids: List[int]):
+        try:
+            self._db.executemany("DELETE FROM posts WHERE id = ?", [(post_id,) for post_id in post_ids])
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.error(f"Mirror delete failed: {e}")
+    
+    async def get(self, post_id: int) -> Optional[Dict[str, Any]]:
+        return await self._thread.run(self._get, post_id)
+    
+    def _get(self, post_id: int) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(
+            "SELECT id, title, excerpt, content, url, status, date, modified, slug FROM posts WHERE id = ?",
+            (post_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("id", "title", "excerpt", "content", "url", "status", "date", "modified", "slug"), row))
+    
+    async def search(self, query: str, limit: int = 10, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Full-text search over titles and content, best matches first
+        
+        Every word of the query must match (prefix matching with a trailing *).
+        """
+        self.searches += 1
+        return await self._thread.run(self._search, query, limit, status)
+    
+    def _search(self, query: str, limit: int, status: Optional[str]) -> List[Dict[str, Any]]:
+        terms = []
+        for word in query.split():
+            prefix = word.endswith("*") and len(word) > 1
+            word = word.rstrip("*").replace('"', '""')
+            if word:
+                terms.append(f'"{word}"*' if prefix else f'"{word}"')
+        if not terms:
+            return []
+        
+        sql = (
+            "SELECT posts.id, posts.title, posts.url, posts.status, posts.date, "
+            "snippet(posts_fts, 1, '[', ']', '...', 16) "
+            "FROM posts_fts JOIN posts ON posts.id = posts_fts.rowid WHERE posts_fts MATCH ?"
+        )
+        params: List[Any] = [" ".join(terms)]
+        if status:
+            sql += " AND posts.status = ?"
+            params.append(status)
+        sql += " ORDER BY bm25(posts_fts, 5.0, 1.0) LIMIT ?"
+        params.append(limit)
+        
+        rows = self._db.execute(sql, params).fetchall()
+        return [
+            dict(zip(("id", "title", "url", "status", "date", "snippet"), row))
+            for row in rows
+        ]
+    
+    async def synced_within(self, max_age: float) -> bool:
+        """Whether the last completed sync (by any worker) is at most max_age seconds old"""
+        last_sync = await self._thread.run(self._state, "last_sync")
+        return last_sync is not None and time.time() - last_sync <= max_age
+    
+    def _state(self, key: str) -> Any:
+        row = self._db.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _set_state(self, key: str, value: Any):
+        self._db.execute("INSERT OR REPLACE INTO state VALUES (?, ?)", (key, value))
+    
+    # ------------------------------------------------------------------------
+    # Synchronization with WordPress
+    # ------------------------------------------------------------------------
+    
+    def _acquire_lease(self) -> bool:
+        """Let one worker process sync at a time (the lease outlives a sync interval)"""
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            owner, expires_at = (self._state("lease_owner"), self._state("lease_expires_at") or 0)
+            if owner not in (None, self.node) and expires_at > now:
+                return False
+            self._set_state("lease_owner", self.node)
+            self._set_state("lease_expires_at", now + MIRROR_SYNC_INTERVAL * 2)
+            return True
+        finally:
+            self._db.execute("COMMIT")
+    
+    async def _pages(self, params: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield every page of a post listing"""
+        page = 1
+        while True:
+            response = await self.wp._request(
+                "GET",
+                f"{self.wp.url}/posts",
+                params={**params, "status": "any", "per_page": 100, "page": page}
+            )
+            response.raise_for_status()
+            yield response.json()
+            if page >= int(response.headers.get("X-WP-TotalPages", 1)):
+                return
+            page += 1
+    
+    async def sync(self):
+        """Fetch posts changed since the last sync and, when due, reconcile deletions"""
+        started = time.monotonic()
+        last_modified = await self._thread.run(self._state, "last_modified")
+        params: Dict[str, Any] = {"_fields": self.FIELDS, "orderby": "modified", "order": "asc"}
+        if last_modified:
+            # modified_after is exclusive and has one-second resolution: overlap by a second
+            overlap = datetime.fromisoformat(last_modified) - timedelta(seconds=1)
+            params["modified_after"] = overlap.isoformat()
+        
+        changed = 0
+        newest = last_modified
+        async for posts in self._pages(params):
+            await self.upsert(posts)
+            changed += len(posts)
+            newest = max([newest or ""] + [post.get("modified") or "" for post in posts]) or None
+        if newest:
+            await self._thread.run(self._set_state, "last_modified", newest)
+        
+        removed = 0
+        last_reconcile = await self._thread.run(self._state, "last_reconcile")
+        if not last_modified or time.time() - (last_reconcile or 0) >= MIRROR_RECONCILE_INTERVAL:
+            removed = await self.reconcile()
+        
+        self.syncs += 1
+        self.last_sync_ms = (time.monotonic() - started) * 1000
+        await self._thread.run(self._set_state, "last_sync", time.time())
+        logger.info(f"Mirror synced: {changed} changed, {removed} removed ({self.last_sync_ms:.0f} ms)")
+    
+    async def reconcile(self) -> int:
+        """Drop mirrored posts that no longer exist (or were trashed) on the site"""
+        live: Set[int] = set()
+        async for posts in self._pages({"_fields": "id"}):
+            live.update(post["id"] for post in posts)
+        
+        mirrored = await self._thread.run(lambda: {row[0] for row in self._db.execute("SELECT id FROM posts")})
+        removed = list(mirrored - live)
+        if removed:
+            await self.delete(removed)
+        await self._thread.run(self._set_state, "last_reconcile", time.time())
+        return len(removed)
+    
+    async def run(self):
+        """Sync on startup and then every MIRROR_SYNC_INTERVAL seconds"""
+        while True:
+            try:
+                if await self._thread.run(self._acquire_lease):
+                    await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Mirror sync failed: {e}")
+            await asyncio.sleep(MIRROR_SYNC_INTERVAL)
+    
+    async def close(self):
+        await self._thread.close(self._db.close)
+    
+    async def stats(self) -> Dict[str, Any]:
+        posts, last_sync, last_modified = await self._thread.run(
+            lambda: (
+                self._db.execute("SELECT COUNT(*) FROM posts").fetchone()[0],
+                self._state("last_sync"),
+                self._state("last_modified")
+            )
+        )
+        return {
+            "posts": posts,
+            "last_sync": last_sync,
+            "last_sync_ms": round(self.last_sync_ms, 1),
+            "last_modified": last_modified,
+            "syncs": self.syncs,
+            "searches": self.searches,
+            "errors": self.errors
+        }
+
+# ============================================================================
+# Sites
+# ============================================================================
+
+SITE_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+# Keys accepted in a SITES entry
+SITE_OPTIONS = ("url", "username", "password", "auth", "max_connections", "rate_limit", "cache_ttl", "mirror")
+
+def load_sites() -> Dict[str, Dict[str, Any]]:
+    """
+    Site registry from SITES (a dict, or a JSON object in WPMCP_SITES)
+    
+    Without SITES the registry holds one site, "default", built from
+    WORDPRESS_URL, WORDPRESS_USERNAME and WORDPRESS_PASSWORD.
+    
+    Raises:
+        ValueError: A malformed registry or site entry
+    """
+    if str(WORDPRESS_AUTH).lower() not in UPSTREAM_AUTH_MODES:
+        raise ValueError(f"WORDPRESS_AUTH must be one of {', '.join(UPSTREAM_AUTH_MODES)}, got {WORDPRESS_AUTH!r}")
+    configured = SITES
+    if isinstance(configured, str):
+        try:
+            configured = json.loads(configured) if configured.strip() else {}
+        except ValueError:
+            raise ValueError("SITES must be a JSON object") from None
+    if not isinstance(configured, dict):
+        raise ValueError("SITES must map site names to site settings")
+    if not configured:
+        return {"default": {"url": WORDPRESS_URL, "username": WORDPRESS_USERNAME, "password": WORDPRESS_PASSWORD}}
+    
+    for name, options in configured.items():
+        if not SITE_NAME_RE.match(str(name)):
+            raise ValueError(f"Site name {name!r} may only contain letters, digits, '_' and '-'")
+        if not isinstance(options, dict) or not options.get("url"):
+            raise ValueError(f"Site {name!r} needs a url")
+        unknown = set(options) - set(SITE_OPTIONS)
+        if unknown:
+            raise ValueError(f"Site {name!r} has unknown settings: {', '.join(sorted(unknown))}")
+        if str(options.get("auth", WORDPRESS_AUTH)).lower() not in UPSTREAM_AUTH_MODES:
+            raise ValueError(f"Site {name!r} has auth {options['auth']!r}, expected one of {', '.join(UPSTREAM_AUTH_MODES)}")
+    return configured
+
+class SiteRegistry:
+    """
+    Configured WordPress sites and their lazily created clients
+    
+    Each site gets its own WordPressMCP - connection pool, concurrency and
+    rate limits, caches, media index and (optionally) mirror - on first use.
+    Clients unused for SITE_IDLE_TIMEOUT are closed and at most
+    SITE_MAX_CLIENTS stay open, least recently used first. A client is never
+    closed while a tool call or job holds it, and sites with a mirror stay
+    open so the mirror keeps syncing.
+    """
+    
+    def __init__(self, sites: Dict[str, Dict[str, Any]], default: str, idle_timeout: float, max_clients: int):
+        self.sites = sites
+        self.default = default or next(iter(sites))
+        if self.default not in sites:
+            raise ValueError(f"DEFAULT_SITE {default!r} is not one of SITES ({', '.join(sites)})")
+        self.idle_timeout = idle_timeout
+        self.max_clients = max_clients
+        self.started = False
+        self.shared_dir: Optional[str] = None  # Set when workers share caches (WORKERS > 1)
+        self.created = 0
+        self.evicted = 0
+        self._clients: "OrderedDict[str, WordPressMCP]" = OrderedDict()
+        self._leases: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+        self._mirror_tasks: Dict[str, asyncio.Task] = {}
+        self._closing: Set[asyncio.Task] = set()
+    
+    def __contains__(self, name: Any) -> bool:
+        return name in self.sites
+    
+    @property
+    def multiple(self) -> bool:
+        return len(self.sites) > 1
+    
+    def file_path(self, path: str, name: str) -> str:
+        """Per-site variant of a state file: mirror.sqlite3 -> mirror-<site>.sqlite3 (unchanged without SITES)"""
+        if not SITES:
+            return path
+        root, ext = os.path.splitext(path)
+        return f"{root}-{name}{ext}"
+    
+    def resolve(self, requested: Any) -> str:
+        """
+        Site a call targets: its site argument, else the site of the endpoint, else the default
+        
+        Raises:
+            ToolArgumentError: Unknown site, or a site other than the endpoint's
+        """
+        scoped = current_site.get()
+        if requested is None:
+            return scoped or self.default
+        if not isinstance(requested, str) or requested not in self.sites:
+            raise ToolArgumentError(f"Unknown site: {requested}")
+        if scoped is not None and requested != scoped:
+            raise ToolArgumentError(f"arguments.site is {requested!r} but this endpoint serves {scoped!r}")
+        return requested
+    
+    def get(self, name: str) -> WordPressMCP:
+        """
+        The site's client, opened on first use
+        
+        Raises:
+            ToolArgumentError: Unknown site
+        """
+        wp = self._clients.get(name)
+        if wp is None:
+            wp = self._open(name)
+        else:
+            self._clients.move_to_end(name)
+        self._last_used[name] = time.monotonic()
+        return wp
+    
+    @asynccontextmanager
+    async def client(self, name: str) -> AsyncIterator[WordPressMCP]:
+        """Hold a site's client for the duration of a call, so it isn't closed under it"""
+        wp = self.get(name)
+        self._leases[name] = self._leases.get(name, 0) + 1
+        try:
+            yield wp
+        finally:
+            self._leases[name] -= 1
+            self._last_used[name] = time.monotonic()
+    
+    def active(self) -> List[WordPressMCP]:
+        """Clients currently open"""
+        return list(self._clients.values())
+    
+    def _open(self, name: str) -> WordPressMCP:
+        if name not in self.sites:
+            raise ToolArgumentError(f"Unknown site: {name}")
+        options = self.sites[name]
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        cache_ttl = options.get("cache_ttl", POSTS_CACHE_TTL)
+        shared = None
+        if self.shared_dir:
+            shared = SharedCache(os.path.join(self.shared_dir, self.file_path("cache.sqlite3", name)), cache_ttl)
+        
+        wp = WordPressMCP(
+            options["url"],
+            options.get("username", ""),
+            options.get("password", ""),
+            shared,
+            site=name,
+            max_connections=options.get("max_connections", HTTP_MAX_CONNECTIONS),
+            rate_limit=options.get("rate_limit", SITE_RATE_LIMIT),
+            cache_ttl=cache_ttl,
+            auth=options.get("auth", WORDPRESS_AUTH)
+        )
+        wp.media_index = MediaIndex(os.path.join(base_dir, self.file_path(MEDIA_INDEX_PATH, name)))
+        if options.get("mirror", MIRROR_ENABLED):
+            wp.mirror = PostMirror(os.path.join(base_dir, self.file_path(MIRROR_PATH, name)), wp)
+            self._mirror_tasks[name] = asyncio.create_task(wp.mirror.run())
+        
+        self._clients[name] = wp
+        self.created += 1
+        for candidate in list(self._clients):
+            if len(self._clients) <= self.max_clients:
+                break
+            if candidate != name and self._evictable(candidate):
+                self._evict(candidate, "too many open sites")
+        return wp
+    
+    def _evictable(self, name: str) -> bool:
+        return not self._leases.get(name) and name not in self._mirror_tasks
+    
+    def _evict(self, name: str, reason: str):
+        wp = self._clients.pop(name)
+        self._leases.pop(name, None)
+        self.evicted += 1
+        logger.info(f"Closing client for site {name} ({reason})")
+        task = asyncio.ensure_future(self._close_client(wp))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    @staticmethod
+    async def _close_client(wp: WordPressMCP):
+        await wp.close()
+        if wp.shared:
+            await wp.shared.close()
+        if wp.mirror:
+            await wp.mirror.close()
+        if wp.media_index:
+            await wp.media_index.close()
+    
+    async def start(self, shared_dir: Optional[str] = None):
+        """Open the default site (warming up its connections) and every site with a mirror"""
+        self.shared_dir = shared_dir
+        self.started = True
+        await self.get(self.default).warm_up()
+        for name, options in self.sites.items():
+            if options.get("mirror", MIRROR_ENABLED):
+                self.get(name)
+    
+    async def run(self):
+        """Close idle clients until cancelled"""
+        interval = min(max(self.idle_timeout / 2, 1.0), 60.0)
+        while True:
+            await asyncio.sleep(interval)
+            idle_since = time.monotonic() - self.idle_timeout
+            for name in list(self._clients):
+                if self._evictable(name) and self._last_used.get(name, 0.0) <= idle_since:
+                    self._evict(name, "idle")
+    
+    async def close(self):
+        for task in self._mirror_tasks.values():
+            task.cancel()
+        self._mirror_tasks.clear()
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*self._closing, return_exceptions=True)
+        for wp in clients:
+            await self._close_client(wp)
+    
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "configured": len(self.sites),
+            "default": self.default,
+            "open": len(self._clients),
+            "max_clients": self.max_clients,
+            "idle_timeout": self.idle_timeout,
+            "created": self.created,
+            "evicted": self.evicted,
+            "clients": {
+                name: {
+                    "url": wp.api_root[:-len("/wp-json")],
+                    "in_use": self._leases.get(name, 0),
+                    "idle_seconds": round(now - self._last_used.get(name, now), 1),
+                    "mirror": wp.mirror is not None,
+                    "concurrency_limit": wp.limiter.stats()["limit"],
+                    "rate_limit": wp.rate_limiter.rate,
+                    "cache_entries": wp.posts_cache.stats()["entries"]
+                }
+                for name, wp in self._clients.items()
+            }
+        }
+
+sites = SiteRegistry(load_sites(), DEFAULT_SITE, SITE_IDLE_TIMEOUT, SITE_MAX_CLIENTS)
+
+# Site bound to the endpoint the request came in on (/sites/<name>/...)
+current_site: ContextVar[Optional[str]] = ContextVar("current_site", default=None)
+
+# ============================================================================
+# Tool Registry
+# ============================================================================
+
+class ToolArgumentError(Exception):
+    """Raised when tool arguments don't match the tool's inputSchema"""
+
+JSON_SCHEMA_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+def compile_schema(schema: Dict[str, Any], path: str = "arguments") -> Callable[[Any], None]:
+    """
+    Compile a JSON Schema into a validator function
+    
+    Supports the subset used by our tool schemas: type, enum, minimum,
+    maximum, minItems, maxItems, uniqueItems, items, properties, required.
+    Sub-schemas are compiled once, so validating a call is a few closure
+    calls instead of a schema walk.
+    
+    Returns:
+        Function that raises ToolArgumentError for invalid values
+    """
+    checks: List[Callable[[Any], None]] = []
+    
+    expected = schema.get("type")
+    if expected is not None:
+        python_type = JSON_SCHEMA_TYPES[expected]
+        
+        def check_type(value: Any):
+            # bool is an int subclass but not a JSON Schema integer/number
+            if not isinstance(value, python_type) or (
+                isinstance(value, bool) and expected != "boolean"
+            ):
+                raise ToolArgumentError(f"{path} must be of type {expected}")
+        checks.append(check_type)
+    
+    if "enum" in schema:
+        allowed = schema["enum"]
+        
+        def check_enum(value: Any):
+            if value not in allowed:
+                raise ToolArgumentError(f"{path} must be one of {allowed}")
+        checks.append(check_enum)
+    
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+        
+        def check_minimum(value: Any):
+            if value < minimum:
+                raise ToolArgumentError(f"{path} must be >= {minimum}")
+        checks.append(check_minimum)
+    
+    if "maximum" in schema:
+        maximum = schema["maximum"]
+        
+        def check_maximum(value: Any):
+            if value > maximum:
+                raise ToolArgumentError(f"{path} must be <= {maximum}")
+        checks.append(check_maximum)
+    
+    if "minItems" in schema:
+        min_items = schema["minItems"]
+        
+        def check_min_items(value: Any):
+            if len(value) < min_items:
+                raise ToolArgumentError(f"{path} must contain at least {min_items} items")
+        checks.append(check_min_items)
+    
+    if "maxItems" in schema:
+        max_items = schema["maxItems"]
+        
+        def check_max_items(value: Any):
+            if len(value) > max_items:
+                raise ToolArgumentError(f"{path} must contain at most {max_items} items")
+        checks.append(check_max_items)
+    
+    if schema.get("uniqueItems"):
+        def check_unique(value: Any):
+            if len({json.dumps(item, sort_keys=True) for item in value}) != len(value):
+                raise ToolArgumentError(f"{path} must contain unique items")
+        checks.append(check_unique)
+    
+    if "items" in schema:
+        validate_item = compile_schema(schema["items"], f"{path}[]")
+        
+        def check_items(value: Any):
+            for item in value:
+                validate_item(item)
+        checks.append(check_items)
+    
+    required = schema.get("required", [])
+    if required:
+        def check_required(value: Any):
+            missing = [name for name in required if name not in value]
+            if missing:
+                raise ToolArgumentError(f"{path} missing required field(s): {', '.join(missing)}")
+        checks.append(check_required)
+    
+    properties = {
+        name: compile_schema(subschema, f"{path}.{name}")
+        for name, subschema in schema.get("properties", {}).items()
+    }
+    if properties:
+        def check_properties(value: Any):
+            for name, validate_property in properties.items():
+                if name in value:
+                    validate_property(value[name])
+        checks.append(check_properties)
+    
+    def validate(value: Any):
+        for check in checks:
+            check(value)
+    
+    return validate
+
+class RegisteredTool:
+    """A tool definition with its handler and compiled argument validator"""
+    
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        input_schema: Dict[str, Any],
+        handler: Callable[["WordPressMCP", Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        background: bool = False,
+        resumable: bool = False,
+        uses_site: bool = True,
+        lane: Optional[str] = "read"
+    ):
+        if background:
+            input_schema = {
+                **input_schema,
+                "properties": {**input_schema.get("properties", {}), "async": ASYNC_ARGUMENT_SCHEMA}
+            }
+        if uses_site and sites.multiple:
+            input_schema = {
+                **input_schema,
+                "properties": {**input_schema.get("properties", {}), "site": site_argument_schema()}
+            }
+        self.name = name
+        self.description = description
+        self.input_schema = input_schema
+        self.handler = handler
+        self.background = background  # Accepts "async": true (runs as a background job)
+        self.resumable = resumable  # Safe to run again after a restart interrupted it
+        self.lane = lane  # Admission lane ("read", "write" or "scan"); None = only the client rate limit applies
+        self.validate = compile_schema(input_schema)
+        self.tool = Tool(name=name, description=description, inputSchema=input_schema)
+
+class ToolRegistry:
+    """
+    Tools built once at import time
+    
+    Holds the name -> handler dispatch table, compiled argument validators
+    and pre-encoded tools/list and initialize results (with an ETag).
+    """
+    
+    def __init__(self):
+        self._tools: Dict[str, RegisteredTool] = {}
+        self._encoded: Dict[str, Tuple[Dict[str, Any], bytes, str]] = {}
+    
+    def register(
+        self,
+        name: str,
+        description: str,
+        input_schema: Dict[str, Any],
+        background: bool = False,
+        resumable: bool = False,
+        uses_site: bool = True,
+        lane: Optional[str] = "read"
+    ) -> Callable:
+        """
+        Decorator registering an async handler(wp, arguments) as a tool
+        
+        Args:
+            background: The tool may be long-running and accepts "async": true
+            resumable: A background run interrupted by a restart may be repeated
+            uses_site: The tool works on a WordPress site (gets a "site" argument when SITES has several)
+            lane: Admission lane the call waits in: "read", "write", "scan", or None for cheap calls
+        """
+        def decorator(handler):
+            self._tools[name] = RegisteredTool(name, description, input_schema, handler, background, resumable, uses_site, lane)
+            self._encoded.clear()
+            return handler
+        return decorator
+    
+    def get(self, name: str) -> Optional[RegisteredTool]:
+        return self._tools.get(name)
+    
+    def validate(self, name: str, arguments: Any) -> RegisteredTool:
+        """
+        Look up a tool and validate its arguments
+        
+        Raises:
+            ToolArgumentError: Unknown tool or invalid arguments
+        """
+        tool = self._tools.get(name)
+        if tool is None:
+            raise ToolArgumentError(f"Unknown tool: {name}")
+        tool.validate(arguments)
+        return tool
+    
+    @property
+    def tools(self) -> List[Tool]:
+        return [tool.tool for tool in self._tools.values()]
+    
+    def result(self, method: str) -> Tuple[Dict[str, Any], bytes, str]:
+        """
+        Static result of tools/list or initialize
+        
+        Returns:
+            (result dict, pre-encoded result bytes, ETag)
+        """
+        if method not in self._encoded:
+            if method == "tools/list":
+                result = {
+                    "tools": [
+                        {
+                            "name": tool.name,
+                            "description": tool.description,
+                            "inputSchema": tool.input_schema
+                        }
+                        for tool in self._tools.values()
+                    ]
+                }
+            else:
+                result = {
+                    "protocolVersion": "2024-11-05",
+                    "capabilities": {
+                        "tools": {}
+                    },
+                    "serverInfo": {
+                        "name": "wordpress-mcp-server",
+                        "version": "1.0.0"
+                    }
+                }
+            encoded = dump_json(result).encode("utf-8")
+            etag = '"' + hashlib.sha256(encoded).hexdigest()[:32] + '"'
+            self._encoded[method] = (result, encoded, etag)
+        return self._encoded[method]
+
+# Added to the input schema of tools registered with background=True
+ASYNC_ARGUMENT_SCHEMA = {
+    "type": "boolean",
+    "description": (
+        "Run as a background job: return a job_id immediately, stream progress "
+        "over the SSE session and check the result with job_status"
+    ),
+    "default": False
+}
+
+def site_argument_schema() -> Dict[str, Any]:
+    """Schema of the "site" argument added to tools when several sites are configured"""
+    return {
+        "type": "string",
+        "enum": list(sites.sites),
+        "description": f"WordPress site to work on (default: {sites.default})",
+        "default": sites.default
+    }
+
+# JSON-RPC methods whose results never change and are served pre-encoded
+STATIC_METHODS = ("initialize", "tools/list")
+
+tools = ToolRegistry()
+
+# Extra post fields selectable in listing tools
+POST_FIELDS_SCHEMA = {
+    "type": "array",
+    "description": "Extra post fields to include (title, excerpt, url, status and date are always returned)",
+    "items": {
+        "type": "string",
+        "enum": list(WordPressMCP.EXTRA_FIELDS)
+    },
+    "uniqueItems": True
+}
+
+@tools.register(
+    name="create_post",
+    description="Create a new WordPress post on your site",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "title": {
+                "type": "string",
+                "description": "Post title"
+            },
+            "content": {
+                "type": "string",
+                "description": "Post content in HTML"
+            },
+            "excerpt": {
+                "type": "string",
+                "description": "Post excerpt (optional)",
+                "default": ""
+            },
+            "status": {
+                "type": "string",
+                "enum": ["publish", "draft", "private"],
+                "description": "Post status",
+                "default": "publish"
+            }
+        },
+        "required": ["title", "content"]
+    },
+    lane="write"
+)
+async def create_post_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the create_post tool"""
+    return await wp.create_post(
+        title=arguments["title"],
+        content=arguments["content"],
+        excerpt=arguments.get("excerpt", ""),
+        status=arguments.get("status", "publish")
+    )
+
+@tools.register(
+    name="update_post",
+    description="Update an existing WordPress post",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "post_id": {
+                "type": "integer",
+                "description": "Post ID to update"
+            },
+            "title": {
+                "type": "string",
+                "description": "New post title (optional)"
+            },
+            "content": {
+                "type": "string",
+                "description": "New post content in HTML (optional)"
+            },
+            "excerpt": {
+                "type": "string",
+                "description": "New post excerpt (optional)"
+            }
+        },
+        "required": ["post_id"]
+    },
+    lane="write"
+)
+async def update_post_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the update_post tool"""
+    return await wp.update_post(
+        post_id=arguments["post_id"],
+        title=arguments.get("title"),
+        content=arguments.get("content"),
+        excerpt=arguments.get("excerpt")
+    )
+
+@tools.register(
+    name="get_posts",
+    description="Get list of WordPress posts",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "per_page": {
+                "type": "integer",
+                "description": "Number of posts per page (1-100)",
+                "default": 10,
+                "minimum": 1,
+                "maximum": 100
+            },
+            "page": {
+                "type": "integer",
+                "description": "Page number",
+                "default": 1,
+                "minimum": 1
+            },
+            "fields": POST_FIELDS_SCHEMA
+        }
+    }
+)
+async def get_posts_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the get_posts tool"""
+    return await wp.get_posts(
+        per_page=arguments.get("per_page", 10),
+        page=arguments.get("page", 1),
+        fields=arguments.get("fields")
+    )
+
+POST_DETAIL_FIELDS_SCHEMA = {
+    **POST_FIELDS_SCHEMA,
+    "description": (
+        "Extra post fields to include (title, excerpt, url, status and date are "
+        "always returned; default: content, modified, slug)"
+    )
+}
+
+@tools.register(
+    name="get_post",
+    description="Get a single post by ID with its full content",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "post_id": {
+                "type": "integer",
+                "description": "Post ID"
+            },
+            "fields": POST_DETAIL_FIELDS_SCHEMA
+        },
+        "required": ["post_id"]
+    }
+)
+async def get_post_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the get_post tool"""
+    return await wp.get_post(
+        post_id=arguments["post_id"],
+        fields=arguments.get("fields")
+    )
+
+@tools.register(
+    name="get_posts_by_ids",
+    description="Get several posts by ID in one call; IDs that don't exist are listed in missing",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "post_ids": {
+                "type": "array",
+                "description": "Post IDs (posts are returned in this order)",
+                "items": {"type": "integer"},
+                "minItems": 1,
+                "maxItems": 100
+            },
+            "fields": POST_DETAIL_FIELDS_SCHEMA
+        },
+        "required": ["post_ids"]
+    }
+)
+async def get_posts_by_ids_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the get_posts_by_ids tool"""
+    return await wp.get_posts_by_ids(
+        post_ids=arguments["post_ids"],
+        fields=arguments.get("fields")
+    )
+
+@tools.register(
+    name="delete_post",
+    description="Delete a WordPress post",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "post_id": {
+                "type": "integer",
+                "description": "Post ID to delete"
+            }
+        },
+        "required": ["post_id"]
+    },
+    lane="write"
+)
+async def delete_post_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the delete_post tool"""
+    return await wp.delete_post(
+        post_id=arguments["post_id"]
+    )
+
+@tools.register(
+    name="iter_posts",
+    description=(
+        "Iterate over all posts on the site. When the client accepts "
+        "text/event-stream, posts are streamed page by page as progress "
+        "notifications; otherwise up to max_posts posts are returned"
+    ),
+    input_schema={
+        "type": "object",
+        "properties": {
+            "max_posts": {
+                "type": "integer",
+                "description": "Maximum posts to return when not streaming",
+                "default": ITER_POSTS_MAX_BUFFERED,
+                "minimum": 1,
+                "maximum": ITER_POSTS_MAX_BUFFERED
+            },
+            "fields": POST_FIELDS_SCHEMA
+        }
+    },
+    background=True,
+    resumable=True,
+    lane="scan"
+)
+async def iter_posts_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the iter_posts tool"""
+    return await wp.collect_posts(
+        max_posts=arguments.get("max_posts", ITER_POSTS_MAX_BUFFERED),
+        fields=arguments.get("fields")
+    )
+
+@tools.register(
+    name="create_posts",
+    description="Create multiple WordPress posts in one call (uses the WordPress batch API when available)",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "posts": {
+                "type": "array",
+                "description": "Posts to create",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {
+                            "type": "string",
+                            "description": "Post title"
+                        },
+                        "content": {
+                            "type": "string",
+                            "description": "Post content in HTML"
+                        },
+                        "excerpt": {
+                            "type": "string",
+                            "description": "Post excerpt (optional)",
+                            "default": ""
+                        },
+                        "status": {
+                            "type": "string",
+                            "enum": ["publish", "draft", "private"],
+                            "description": "Post status",
+                            "default": "publish"
+                        }
+                    },
+                    "required": ["title", "content"]
+                }
+            }
+        },
+        "required": ["posts"]
+    },
+    background=True,
+    lane="write"
+)
+async def create_posts_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the create_posts tool"""
+    return await wp.create_posts(
+        posts=arguments["posts"]
+    )
+
+@tools.register(
+    name="update_posts",
+    description="Update multiple WordPress posts in one call (uses the WordPress batch API when available)",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "posts": {
+                "type": "array",
+                "description": "Posts to update",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "post_id": {
+                            "type": "integer",
+                            "description": "Post ID to update"
+                        },
+                        "title": {
+                            "type": "string",
+                            "description": "New post title (optional)"
+                        },
+                        "content": {
+                            "type": "string",
+                            "description": "New post content in HTML (optional)"
+                        },
+                        "excerpt": {
+                            "type": "string",
+                            "description": "New post excerpt (optional)"
+                        }
+                    },
+                    "required": ["post_id"]
+                }
+            }
+        },
+        "required": ["posts"]
+    },
+    background=True,
+    resumable=True,
+    lane="write"
+)
+async def update_posts_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the update_posts tool"""
+    return await wp.update_posts(
+        posts=arguments["posts"]
+    )
+
+@tools.register(
+    name="delete_posts",
+    description="Delete multiple WordPress posts in one call (uses the WordPress batch API when available)",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "post_ids": {
+                "type": "array",
+                "description": "Post IDs to delete",
+                "minItems": 1,
+                "items": {
+                    "type": "integer"
+                }
+            }
+        },
+        "required": ["post_ids"]
+    },
+    background=True,
+    resumable=True,
+    lane="write"
+)
+async def delete_posts_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the delete_posts tool"""
+    return await wp.delete_posts(
+        post_ids=arguments["post_ids"]
+    )
+
+@tools.register(
+    name="upload_media",
+    description=(
+        "Upload images or other files to the WordPress media library from URLs "
+        "(or from the server's media directory). Returns media IDs and URLs to "
+        "use in post content instead of inlining file data"
+    ),
+    input_schema={
+        "type": "object",
+        "properties": {
+            "files": {
+                "type": "array",
+                "description": "Files to upload",
+                "minItems": 1,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "source": {
+                            "type": "string",
+                            "description": "http(s) URL, or a path inside the server's media directory"
+                        },
+                        "filename": {
+                            "type": "string",
+                            "description": "File name in the media library (optional)"
+                        },
+                        "title": {
+                            "type": "string",
+                            "description": "Media title (optional)"
+                        },
+                        "alt_text": {
+                            "type": "string",
+                            "description": "Alternative text for images (optional)"
+                        },
+                        "caption": {
+                            "type": "string",
+                            "description": "Caption (optional)"
+                        }
+                    },
+                    "required": ["source"]
+                }
+            }
+        },
+        "required": ["files"]
+    },
+    background=True,
+    lane="write"
+)
+async def upload_media_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the upload_media tool"""
+    return await wp.upload_media(
+        files=arguments["files"]
+    )
+
+@tools.register(
+    name="search_posts",
+    description=(
+        "Full-text search over post titles and content (answered from the local "
+        "mirror, every word must match, end a word with * for prefix search)"
+    ),
+    input_schema={
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Words to search for"
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of results (1-100)",
+                "default": 10,
+                "minimum": 1,
+                "maximum": 100
+            },
+            "status": {
+                "type": "string",
+                "enum": ["publish", "draft", "private", "pending", "future"],
+                "description": "Only return posts with this status (optional)"
+            }
+        },
+        "required": ["query"]
+    }
+)
+async def search_posts_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the search_posts tool"""
+    if wp.mirror is None:
+        return {
+            "success": False,
+            "posts": [],
+            "count": 0,
+            "message": "Post mirror is disabled (set MIRROR_ENABLED)"
+        }
+    
+    posts = await wp.mirror.search(arguments["query"], arguments.get("limit", 10), arguments.get("status"))
+    return {
+        "success": True,
+        "posts": posts,
+        "count": len(posts),
+        "message": f"Found {len(posts)} posts matching '{arguments['query']}'"
+    }
+
+@tools.register(
+    name="job_status",
+    description="Get the status, progress and (when finished) the result of a background job",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "job_id": {
+                "type": "string",
+                "description": "Job ID returned by a call with async: true"
+            }
+        },
+        "required": ["job_id"]
+    },
+    uses_site=False,
+    lane=None
+)
+async def job_status_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the job_status tool"""
+    job = await jobs.status(arguments["job_id"])
+    if job is None:
+        return {
+            "success": False,
+            "message": f"Unknown job: {arguments['job_id']}"
+        }
+    
+    progress = f"{job['progress']}/{job['total']}" if job["total"] is not None else str(job["progress"])
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "tool": job["tool"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "total": job["total"],
+        "result": json.loads(job["result"]) if job["result"] else None,
+        "error": job["error"],
+        "message": f"Job {job['id']} is {job['status']} ({progress})"
+    }
+
+@tools.register(
+    name="job_cancel",
+    description="Cancel a queued or running background job",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "job_id": {
+                "type": "string",
+                "description": "Job ID returned by a call with async: true"
             }
+        },
+        "required": ["job_id"]
+    },
+    uses_site=False,
+    lane=None
+)
+async def job_cancel_tool(wp: WordPressMCP, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle the job_cancel tool"""
+    status = await jobs.cancel(arguments["job_id"])
+    if status is None:
+        return {
+            "success": False,
+            "message": f"Unknown job: {arguments['job_id']}"
+        }
+    return {
+        "success": True,
+        "job_id": arguments["job_id"],
+        "status": status,
+        "message": f"Job {arguments['job_id']} is {status}"
+    }
+
+# ============================================================================
+# Admission Control
+# ============================================================================
+
+class Overloaded(Exception):
+    """A tool call refused by admission control before it ran"""
+    
+    def __init__(self, message: str, reason: str, retry_after: float):
+        super().__init__(message)
+        self.reason = reason  # rate_limited, queue_full or deadline
+        self.retry_after = retry_after  # Suggested seconds before trying again
+    
+    def data(self) -> Dict[str, Any]:
+        """JSON-RPC error data"""
+        return {"reason": self.reason, "retry_after": round(self.retry_after, 2)}
+
+class FairLane:
+    """
+    Concurrency slots for one class of tool calls, shared fairly between clients
+    
+    A call takes a free slot, or waits in its client's queue. Freed slots go
+    to the clients round-robin, so one client with a hundred queued calls
+    delays another client's single call by at most one turn. A call is
+    refused straight away when the lane already holds max_queue waiting
+    calls or when the expected wait (queue length x average slot time)
+    exceeds max_wait, and refused after waiting max_wait without a slot.
+    """
+    
+    def __init__(self, name: str, concurrency: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.concurrency = max(concurrency, 1)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_use = 0
+        self.queued = 0
+        self.service_time = 0.0  # Moving average of seconds a call holds a slot
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future[None]]]" = OrderedDict()
+        self.admitted = 0
+        self.shed = 0
+    
+    def expected_wait(self, client: Optional[str] = None) -> float:
+        """Seconds a call from client arriving now would likely wait for a slot"""
+        if self.in_use < self.concurrency:
+            return 0.0
+        # Round-robin: each other client gets at most as many turns as this call's place in its own queue
+        turn = len(self._waiting.get(client, ())) + 1
+        ahead = turn - 1 + sum(min(len(queue), turn) for name, queue in self._waiting.items() if name != client)
+        return (ahead + 1) / self.concurrency * self.service_time
+    
+    async def acquire(self, client: str):
+        """
+        Take a slot, waiting for one in the client's queue if needed
+        
+        Raises:
+            Overloaded: Queue full, expected wait too long, or max_wait passed
+        """
+        if self.in_use < self.concurrency and not self.queued:
+            self.in_use += 1
+            self.admitted += 1
+            return
+        
+        if self.queued >= self.max_queue:
+            self.shed += 1
+            raise Overloaded(
+                f"Server busy: {self.queued} {self.name} calls queued",
+                "queue_full", max(self.expected_wait(), 1.0)
+            )
+        expected = self.expected_wait(client)
+        if expected > self.max_wait:
+            self.shed += 1
+            raise Overloaded(
+                f"Server busy: expected wait for a {self.name} slot is {expected:.1f}s",
+                "deadline", expected
+            )
+        
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        queue = self._waiting.get(client)
+        if queue is None:
+            queue = self._waiting[client] = deque()
+        queue.append(future)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except asyncio.TimeoutError:
+            if not future.done() or future.cancelled():
+                self._forget(client, future)
+                self.shed += 1
+                raise Overloaded(
+                    f"Server busy: no {self.name} slot within {self.max_wait:.1f}s",
+                    "deadline", max(self.expected_wait(client), 1.0)
+                ) from None
+        except BaseException:
+            if future.done() and not future.cancelled():
+                self.release(None)  # the slot was handed over as we were cancelled
+            else:
+                self._forget(client, future)
+            raise
+        self.admitted += 1
+    
+    def _forget(self, client: str, future: "asyncio.Future[None]"):
+        """Drop a waiter that gave up, so expected_wait only counts live calls"""
+        self.queued -= 1
+        queue = self._waiting.get(client)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiting[client]
+    
+    def release(self, held: Optional[float]):
+        """Give the slot to the next client in turn; held = seconds the call had it"""
+        if held is not None:
+            self.service_time = held if not self.service_time else 0.8 * self.service_time + 0.2 * held
+        while self._waiting:
+            client, queue = next(iter(self._waiting.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(client)
+            else:
+                del self._waiting[client]
+            if not future.done():
+                self.queued -= 1
+                future.set_result(None)
+                return  # the slot passes to the waiter
+        self.in_use -= 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "in_use": self.in_use,
+            "queued": self.queued,
+            "clients_waiting": len(self._waiting),
+            "avg_call_ms": round(self.service_time * 1000, 1),
+            "admitted": self.admitted,
+            "shed": self.shed
+        }
+
+class AdmissionController:
+    """
+    Admission of tool calls: a token bucket per client, then a slot in the tool's lane
+    
+    Reads and writes have separate lanes (ADMISSION_READ_CONCURRENCY,
+    ADMISSION_WRITE_CONCURRENCY), so a bulk writer can't occupy the slots
+    interactive reads need, and reads give up sooner (ADMISSION_READ_MAX_WAIT)
+    to keep their tail latency bounded. Calls over a limit are refused
+    early with an Overloaded carrying a retry hint, instead of queueing
+    without bound. Limits are per worker process.
+    """
+    
+    MAX_TRACKED_CLIENTS = 10000  # Token buckets kept; the least recently active are dropped
+    
+    def __init__(self, enabled: bool, client_rate: float, client_burst: float, lanes: List[FairLane]):
+        self.enabled = enabled
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.lanes = {lane.name: lane for lane in lanes}
+        self._buckets: "OrderedDict[str, RateLimiter]" = OrderedDict()
+        self.rate_limited = 0
+    
+    def check_rate(self, client: str):
+        """
+        Take one call from the client's token bucket
+        
+        Raises:
+            Overloaded: The client is over ADMISSION_CLIENT_RATE
+        """
+        if not self.enabled or self.client_rate <= 0:
+            return
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = RateLimiter(self.client_rate, self.client_burst)
+            while len(self._buckets) > self.MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        wait = bucket.try_acquire()
+        if wait > 0:
+            self.rate_limited += 1
+            admission_shed.inc("rate", "rate_limited")
+            raise Overloaded(f"Too many tool calls, limit is {self.client_rate:g} per second", "rate_limited", wait)
+    
+    @asynccontextmanager
+    async def admit(self, client: str, lane: Optional[str]) -> AsyncIterator[None]:
+        """
+        Hold an admission for the duration of a tool call
+        
+        Raises:
+            Overloaded: The call is refused (before the body runs)
+        """
+        if not self.enabled:
+            yield
+            return
+        self.check_rate(client)
+        async with self.hold(client, lane):
+            yield
+    
+    @asynccontextmanager
+    async def hold(self, client: str, lane: Optional[str]) -> AsyncIterator[None]:
+        """
+        Hold a slot in a lane, without taking from the client's rate
+        
+        Raises:
+            Overloaded: No slot (before the body runs)
+        """
+        if not self.enabled or lane is None:
+            yield
+            return
+        
+        fair_lane = self.lanes[lane]
+        queued = time.monotonic()
+        try:
+            with span("admission", lane=lane):
+                await fair_lane.acquire(client)
+        except Overloaded as e:
+            admission_shed.inc(lane, e.reason)
+            raise
+        started = time.monotonic()
+        admission_wait.observe(started - queued, lane)
+        try:
+            yield
+        finally:
+            fair_lane.release(time.monotonic() - started)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "client_rate": self.client_rate,
+            "client_burst": self.client_burst,
+            "clients": len(self._buckets),
+            "rate_limited": self.rate_limited,
+            "lanes": {name: lane.stats() for name, lane in self.lanes.items()}
+        }
+
+admission_shed = metrics.counter(
+    "wpmcp_admission_shed_total", "Tool calls refused by admission control, by lane (rate = client limit) and reason", ("lane", "reason")
+)
+admission_wait = metrics.histogram("wpmcp_admission_wait_seconds", "Time tool calls waited for a lane slot", ("lane",))
+
+admission = AdmissionController(
+    ADMISSION_ENABLED,
+    ADMISSION_CLIENT_RATE,
+    ADMISSION_CLIENT_BURST,
+    [
+        FairLane("read", ADMISSION_READ_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_READ_MAX_WAIT),
+        FairLane("write", ADMISSION_WRITE_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_WRITE_MAX_WAIT),
+        FairLane("scan", ADMISSION_SCAN_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_SCAN_MAX_WAIT)
+    ]
+)
+
+current_client: ContextVar[Optional[str]] = ContextVar("current_client", default=None)
+
+def admission_client() -> str:
+    """Who the current tool call is from: the address that opened its SSE session or sent the /mcp request"""
+    session = current_session.get()
+    if session is not None and session.client:
+        return session.client
+    return current_client.get() or "anonymous"
+
+def admission_lane(tool: RegisteredTool, arguments: Dict[str, Any]) -> Optional[str]:
+    """Lane a call waits in; submitting a background job only counts against the rate"""
+    return None if tool.background and arguments.get("async") else tool.lane
+
+# ============================================================================
+# MCP Server Setup
+# ============================================================================
+
+# Create MCP server
+mcp_server = Server("wordpress-mcp-server")
+
+@mcp_server.list_tools()
+async def list_tools() -> List[Tool]:
+    """List all available MCP tools"""
+    return tools.tools
+
+async def call_handler(tool: RegisteredTool, arguments: Dict[str, Any], site: str) -> Dict[str, Any]:
+    """Run a tool's handler with the site's client held for the duration of the call"""
+    async with sites.client(site) as wp:
+        return await tool.handler(wp, arguments)
+
+async def run_tool(tool: RegisteredTool, arguments: Dict[str, Any], site: str) -> List[TextContent]:
+    """Execute a validated tool call against a site (see SiteRegistry.resolve)"""
+    if not sites.started:
+        error_result = {
+            "success": False,
+            "message": "WordPress client not initialized"
+        }
+        return [TextContent(type="text", text=dump_json(error_result))]
+    
+    try:
+        if tool.background and arguments.get("async"):
+            job_arguments = {key: value for key, value in arguments.items() if key != "async"}
+            job_arguments["site"] = site  # journaled, so a resumed job goes to the same site
+            result = await submit_job(tool, job_arguments)
+        else:
+            started = time.monotonic()
+            try:
+                with span("tool", tool=tool.name, site=site):
+                    result = await call_handler(tool, arguments, site)
+            except Exception:
+                observe_tool(tool.name, started, "error")
+                raise
+            observe_tool(tool.name, started, tool_outcome(result))
+        with span("serialize"):
+            text = dump_json(result)
+        return [TextContent(type="text", text=text)]
+        
+    except Exception as e:
+        error_result = {
+            "success": False,
+            "message": f"Error executing tool: {str(e)}"
+        }
+        logger.error(f"Tool execution error: {e}")
+        return [TextContent(type="text", text=dump_json(error_result))]
+
+def tool_outcome(result: Any) -> str:
+    """Metrics outcome of a tool result: "failure" when it reports success: false"""
+    return "failure" if isinstance(result, dict) and result.get("success") is False else "success"
+
+def observe_tool(name: str, started: float, outcome: str):
+    """Record one tool execution in the tool metrics"""
+    tool_calls.inc(name, outcome)
+    tool_duration.observe(time.monotonic() - started, name)
+
+async def submit_job(tool: RegisteredTool, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Start a tool call as a background job and describe it to the caller"""
+    job = await jobs.submit(tool, arguments)
+    if job is None:
+        return {
+            "success": False,
+            "message": f"Too many background jobs queued ({JOB_MAX_QUEUED}), try again later"
+        }
+    message = f"Job {job.id} started; check it with job_status"
+    if job.session_id:
+        message += ", progress is streamed over the SSE session"
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "message": message
+    }
+
+@mcp_server.call_tool()
+async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
+    """Handle MCP tool calls"""
+    try:
+        tool = tools.validate(name, arguments)
+        site = sites.resolve(arguments.get("site"))
+    except ToolArgumentError as e:
+        log_event(logging.INFO, "tool.call.rejected", f"Tool call rejected: {e}", tool=name)
+        error_result = {
+            "success": False,
+            "message": str(e)
+        }
+        return [TextContent(type="text", text=dump_json(error_result))]
+    
+    # Event names only ever carry registered tool names (they key sampling and metric labels)
+    log_event(logging.INFO, f"tool.call.{tool.name}", f"Tool called: {tool.name}", tool=tool.name, arguments=arguments)
+    try:
+        async with admission.admit(admission_client(), admission_lane(tool, arguments)):
+            return await run_tool(tool, arguments, site)
+    except Overloaded as e:
+        error_result = {
+            "success": False,
+            "message": str(e),
+            **e.data()
+        }
+        return [TextContent(type="text", text=dump_json(error_result))]
+
+# ============================================================================
+# SSE Sessions
+# ============================================================================
+
+def encode_sse(event: str, data: str) -> bytes:
+    """Encode one Server-Sent Event frame"""
+    lines = "".join(f"data: {line}\r\n" for line in data.splitlines() or [""])
+    return f"event: {event}\r\n{lines}\r\n".encode("utf-8")
+
+# Identical for every session, so encoded once
+HEARTBEAT_FRAME = encode_sse("heartbeat", json.dumps({"status": "alive"}))
+
+class SSESession:
+    """
+    One open /sse stream with a bounded outbound queue of encoded frames
+    
+    Responses and streamed tool output use send(), which waits for queue
+    space and disconnects the client if it doesn't keep up. Best-effort
+    events (heartbeats) use offer(), which drops them when the queue is full.
+    """
+    
+    def __init__(self, session_id: str, queue_size: int):
+        self.id = session_id
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(queue_size)
+        self.created_at = time.monotonic()
+        self.last_sent = self.created_at
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.site: Optional[str] = None  # Set for sessions opened on /sites/<name>/sse
+        self.client: Optional[str] = None  # Admission client (address) that opened the stream
+        self._tasks: Set[asyncio.Task] = set()
+    
+    def offer(self, event: str, data: str) -> bool:
+        """Queue a best-effort event, dropping it if the client is behind"""
+        return self.offer_frame(encode_sse(event, data))
+    
+    def offer_frame(self, frame: bytes) -> bool:
+        """Queue a pre-encoded best-effort frame"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.sent += 1
+        self.last_sent = time.monotonic()
+        return True
+    
+    async def send(self, event: str, data: str, timeout: float = SSE_SEND_TIMEOUT) -> bool:
+        """Queue an event that must not be lost; disconnect slow consumers"""
+        if self.closed:
+            return False
+        try:
+            await asyncio.wait_for(self.queue.put(encode_sse(event, data)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"SSE session {self.id} is not reading its stream, disconnecting")
+            self.close()
+            return False
+        self.sent += 1
+        self.last_sent = time.monotonic()
+        return True
+    
+    def spawn(self, coro: Awaitable[Any]):
+        """Run work whose output goes to this session; cancelled on close"""
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    def close(self):
+        """Stop the stream: drop queued events and wake up the writer"""
+        if self.closed:
+            return
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+        for task in list(self._tasks):
+            task.cancel()
+
+class HeartbeatWheel:
+    """
+    Central heartbeat scheduler for all SSE sessions (timer wheel)
+    
+    Sessions are spread over `slots` buckets and one bucket is visited every
+    interval / slots seconds, so each idle session gets HEARTBEAT_FRAME once
+    per interval and the fan-out work is spread evenly instead of arriving
+    in one burst. Sessions that sent anything during the last interval are
+    skipped. There are no per-connection timers.
+    """
+    
+    def __init__(self, interval: float, slots: int):
+        self.interval = interval
+        self._slots: List[Set[SSESession]] = [set() for _ in range(max(slots, 1))]
+        self._slot_of: Dict[str, int] = {}
+        self._cursor = 0
+        self._next_slot = 0
+        self.ticks = 0
+        self.heartbeats_sent = 0
+        self.heartbeats_skipped = 0
+        self.heartbeats_dropped = 0  # Due but not queued: queue full or session closed
+        self.last_fanout_ms = 0.0
+        self.max_fanout_ms = 0.0
+        self.max_tick_lag_ms = 0.0
+    
+    def add(self, session: SSESession):
+        # Round-robin keeps slots even when many clients connect at once;
+        # a session's first heartbeat may therefore come up to 2x interval late
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % len(self._slots)
+        self._slots[slot].add(session)
+        self._slot_of[session.id] = slot
+    
+    def discard(self, session: SSESession):
+        slot = self._slot_of.pop(session.id, None)
+        if slot is not None:
+            self._slots[slot].discard(session)
+    
+    def tick(self):
+        """Send heartbeats to the idle sessions of the current slot"""
+        started = time.monotonic()
+        idle_since = started - self.interval
+        sent = dropped = 0
+        slot = self._slots[self._cursor]
+        for session in slot:
+            if session.last_sent <= idle_since:
+                if session.offer_frame(HEARTBEAT_FRAME):
+                    sent += 1
+                else:
+                    dropped += 1
+        self.heartbeats_sent += sent
+        self.heartbeats_dropped += dropped
+        self.heartbeats_skipped += len(slot) - sent - dropped
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        self.ticks += 1
+        
+        self.last_fanout_ms = (time.monotonic() - started) * 1000
+        self.max_fanout_ms = max(self.max_fanout_ms, self.last_fanout_ms)
+        if slot:
+            log_event(
+                logging.INFO, "sse.heartbeat", "Heartbeat tick",
+                sessions=len(slot), sent=sent, dropped=dropped, fanout_ms=round(self.last_fanout_ms, 3)
+            )
+    
+    async def run(self):
+        """Drive the wheel until cancelled"""
+        tick_interval = self.interval / len(self._slots)
+        next_tick = time.monotonic()
+        while True:
+            next_tick += tick_interval
+            await asyncio.sleep(max(next_tick - time.monotonic(), 0))
+            lag_ms = (time.monotonic() - next_tick) * 1000
+            self.max_tick_lag_ms = max(self.max_tick_lag_ms, lag_ms)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Heartbeat tick error: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "slots": len(self._slots),
+            "ticks": self.ticks,
+            "heartbeats_sent": self.heartbeats_sent,
+            "heartbeats_skipped": self.heartbeats_skipped,
+            "heartbeats_dropped": self.heartbeats_dropped,
+            "last_fanout_ms": round(self.last_fanout_ms, 3),
+            "max_fanout_ms": round(self.max_fanout_ms, 3),
+            "max_tick_lag_ms": round(self.max_tick_lag_ms, 3)
+        }
+
+class SSESessionResponse(Response):
+    """
+    Stream an SSE session's queued frames to the client
+    
+    Each connection costs one writer coroutine waiting on the session queue
+    and one task reading the ASGI receive channel. An http.disconnect closes
+    the session, which wakes the writer; nothing polls.
+    
+    The session is already registered when the response is built. If the
+    response is never run (the client went away before it started), a timer
+    closes the session after SSE_SEND_TIMEOUT seconds so its slot is freed.
+    """
+    
+    media_type = "text/event-stream"
+    
+    def __init__(
+        self,
+        session: SSESession,
+        on_close: Callable[[SSESession], None],
+        headers: Optional[Dict[str, str]] = None
+    ):
+        self.session = session
+        self.on_close = on_close
+        self.status_code = 200
+        self.background = None
+        self.init_headers(headers)
+        self._finished = False
+        self._start_timer = asyncio.get_running_loop().call_later(SSE_SEND_TIMEOUT, self._finish)
+    
+    def _finish(self):
+        """Close the session and run on_close once, whether or not the stream started"""
+        self._start_timer.cancel()
+        if self._finished:
+            return
+        self._finished = True
+        self.session.close()
+        self.on_close(self.session)
+    
+    async def __call__(self, scope, receive, send):
+        self._start_timer.cancel()
+        if self._finished:
+            return  # Given up on before it started; the session is gone
+        
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    self.session.close()
+                    return
+        
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers
+            })
+            while True:
+                frame = await self.session.queue.get()
+                if frame is None:
+                    break
+                await send({"type": "http.response.body", "body": frame, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        except OSError:
+            pass  # client went away mid-write
+        finally:
+            watcher.cancel()
+            self._finish()
+
+class SessionManager:
+    """Registry of open SSE sessions"""
+    
+    def __init__(self, max_sessions: int, queue_size: int):
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self._sessions: Dict[str, SSESession] = {}
+        self.heartbeats = HeartbeatWheel(SSE_HEARTBEAT_INTERVAL, SSE_HEARTBEAT_SLOTS)
+        self.node: Optional[str] = None  # Worker id prefixed to session IDs (multi-worker)
+        self.opened = 0
+        self.rejected = 0
+    
+    def create(self) -> Optional[SSESession]:
+        """Open a new session, or None when at capacity"""
+        if len(self._sessions) >= self.max_sessions:
+            self.rejected += 1
+            return None
+        session_id = uuid.uuid4().hex
+        if self.node is not None:
+            session_id = f"{self.node}.{session_id}"
+        session = SSESession(session_id, self.queue_size)
+        self._sessions[session.id] = session
+        self.heartbeats.add(session)
+        self.opened += 1
+        return session
+    
+    def get(self, session_id: str) -> Optional[SSESession]:
+        return self._sessions.get(session_id)
+    
+    def remove(self, session: SSESession):
+        session.close()
+        self.heartbeats.discard(session)
+        self._sessions.pop(session.id, None)
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "dropped_events": sum(session.dropped for session in self._sessions.values()),
+            "heartbeat": self.heartbeats.stats()
+        }
+
+sessions = SessionManager(SSE_MAX_SESSIONS, SSE_QUEUE_SIZE)
+
+class SessionRouter:
+    """
+    Deliver /mcp messages to the worker process that owns their SSE session
+    
+    With several workers a session's POST can land on a different process
+    than the one holding its stream. Session IDs start with the owner's node
+    id, and every worker listens on a unix socket in SHARED_STATE_DIR; a
+    message for a foreign session is forwarded there and the owner replies
+    with the HTTP status to return (202 or 404).
+    
+    Wire format: "<length>\\n" followed by a JSON {"session_id", "body"}
+    payload; the reply is "<status>\\n".
+    """
+    
+    def __init__(self, directory: str, node: str, manager: SessionManager):
+        self.directory = directory
+        self.node = node
+        self.manager = manager
+        self.forwarded = 0
+        self.received = 0
+        self.failed = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    def socket_path(self, node: str) -> str:
+        return os.path.join(self.directory, f"worker-{node}.sock")
+    
+    @staticmethod
+    def owner(session_id: str) -> Optional[str]:
+        node, separator, _ = session_id.partition(".")
+        return node if separator else None
+    
+    async def start(self):
+        path = self.socket_path(self.node)
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(self._handle, path=path)
+        logger.info(f"Session router listening on {path}")
+    
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        try:
+            os.unlink(self.socket_path(self.node))
+        except FileNotFoundError:
+            pass
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            length = int(await reader.readline())
+            message = json.loads(await reader.readexactly(length))
+            session = self.manager.get(message["session_id"])
+            if session is None:
+                status = 404
+            else:
+                session.spawn(dispatch_to_session(session, message["body"]))
+                status = 202
+            self.received += 1
+            writer.write(f"{status}\n".encode())
+            await writer.drain()
+        except Exception as e:
+            logger.error(f"Session router error: {e}")
+        finally:
+            writer.close()
+    
+    async def forward(self, session_id: str, body: Any) -> int:
+        """
+        Hand a message to the worker owning session_id
+        
+        Returns:
+            HTTP status for the client: 202 if delivered, 404 if the session
+            (or its worker) no longer exists, 502 if the owner didn't answer
+        """
+        owner = self.owner(session_id)
+        if owner is None or owner == self.node:
+            return 404
+        
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_unix_connection(self.socket_path(owner)),
+                SESSION_FORWARD_TIMEOUT
+            )
+        except (OSError, asyncio.TimeoutError):
+            return 404
+        
+        try:
+            payload = json.dumps({"session_id": session_id, "body": body}, separators=(",", ":")).encode()
+            writer.write(f"{len(payload)}\n".encode() + payload)
+            await writer.drain()
+            reply = await asyncio.wait_for(reader.readline(), SESSION_FORWARD_TIMEOUT)
+            self.forwarded += 1
+            return int(reply)
+        except (OSError, ValueError, asyncio.TimeoutError) as e:
+            self.failed += 1
+            logger.error(f"Forwarding message for SSE session {session_id} to worker {owner} failed: {e}")
+            return 502
+        finally:
+            writer.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "node": self.node,
+            "forwarded": self.forwarded,
+            "received": self.received,
+            "failed": self.failed
+        }
+
+# Set up at startup when running with several workers
+session_router: Optional[SessionRouter] = None
+
+# ============================================================================
+# Background Jobs
+# ============================================================================
+
+# Job whose handler is running in the current task (set by the job workers)
+current_job: ContextVar[Optional["Job"]] = ContextVar("current_job", default=None)
+# SSE session the message being handled arrived on
+current_session: ContextVar[Optional[SSESession]] = ContextVar("current_session", default=None)
+
+def report_progress(done: int, total: Optional[int] = None):
+    """Report progress of the running background job (no-op outside jobs)"""
+    job = current_job.get()
+    if job is not None:
+        job.report(done, total)
+
+class JobJournal:
+    """
+    SQLite record of background jobs
+    
+    Survives restarts: queued and running jobs found at startup are resumed
+    (or marked interrupted), and finished jobs stay queryable through
+    job_status for JOB_RETENTION seconds. Shared by all worker processes.
+    Database calls run in a DatabaseThread.
+    """
+    
+    COLUMNS = (
+        "id", "tool", "arguments", "status", "owner", "session_id", "progress",
+        "total", "result", "error", "cancel_requested", "created_at", "updated_at"
+    )
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._thread = DatabaseThread("job-journal")
+        self._db = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, tool TEXT, arguments TEXT, status TEXT, owner TEXT, "
+            "session_id TEXT, progress INTEGER, total INTEGER, result TEXT, error TEXT, "
+            "cancel_requested INTEGER DEFAULT 0, created_at REAL, updated_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+    
+    async def _execute(self, sql: str, parameters: Tuple[Any, ...] = (), fetch: Optional[str] = None) -> Any:
+        """Run one statement in the database thread; fetch = "one", "all" or None (row count)"""
+        def execute() -> Any:
+            cursor = self._db.execute(sql, parameters)
+            if fetch == "one":
+                return cursor.fetchone()
+            if fetch == "all":
+                return cursor.fetchall()
+            return cursor.rowcount
+        return await self._thread.run(execute)
+    
+    async def insert(self, job: "Job"):
+        now = time.time()
+        await self._execute(
+            "INSERT INTO jobs (id, tool, arguments, status, owner, session_id, progress, "
+            "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)",
+            (job.id, job.tool.name, dump_json(job.arguments), job.status, job.owner,
+             job.session_id, now, now)
+        )
+    
+    async def update(self, job_id: str, **fields: Any):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        await self._execute(
+            f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ?",
+            (*fields.values(), time.time(), job_id)
+        )
+    
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = await self._execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,), fetch="one"
+        )
+        return dict(zip(self.COLUMNS, row)) if row else None
+    
+    async def cancel_requested(self, job_id: str) -> bool:
+        row = await self._execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,), fetch="one")
+        return bool(row and row[0])
+    
+    async def unfinished(self) -> List[Dict[str, Any]]:
+        rows = await self._execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM jobs "
+            "WHERE status IN ('queued', 'running') ORDER BY created_at",
+            fetch="all"
+        )
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+    
+    async def claim(self, job_id: str, previous_owner: str, owner: str) -> bool:
+        """Take over a job from a dead process; False if another process was faster"""
+        updated = await self._execute(
+            "UPDATE jobs SET owner = ?, updated_at = ? WHERE id = ? AND owner = ?",
+            (owner, time.time(), job_id, previous_owner)
+        )
+        return updated == 1
+    
+    async def prune(self, retention: float) -> int:
+        return await self._execute(
+            "DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND updated_at < ?",
+            (time.time() - retention,)
+        )
+    
+    async def close(self):
+        await self._thread.close(self._db.close)
+
+class Job:
+    """One background tool call"""
+    
+    def __init__(
+        self,
+        job_id: str,
+        tool: RegisteredTool,
+        arguments: Dict[str, Any],
+        owner: str,
+        session_id: Optional[str],
+        manager: "JobManager"
+    ):
+        self.id = job_id
+        self.tool = tool
+        self.arguments = arguments
+        self.owner = owner
+        self.session_id = session_id
+        self.manager = manager
+        self.status = "queued"
+        self.done = 0
+        self.total: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+        self.cancelled = False
+        self._last_flush = 0.0
+        self._flush_task: Optional["asyncio.Future[None]"] = None
+    
+    def report(self, done: int, total: Optional[int]):
+        """Record progress, stream it to the session and check for remote cancels"""
+        self.done = done
+        self.total = total
+        
+        params: Dict[str, Any] = {"progressToken": self.id, "progress": done}
+        if total is not None:
+            params["total"] = total
+        self.manager.notify(self, {"jsonrpc": "2.0", "method": "notifications/progress", "params": params})
+        
+        now = time.monotonic()
+        if now - self._last_flush >= JOB_PROGRESS_INTERVAL and (self._flush_task is None or self._flush_task.done()):
+            self._last_flush = now
+            self._flush_task = asyncio.ensure_future(self._flush(done, total))
+    
+    async def _flush(self, done: int, total: Optional[int]):
+        """Write progress to the journal and pick up a job_cancel from another worker process"""
+        try:
+            await self.manager.journal.update(self.id, progress=done, total=total)
+            cancel_requested = await self.manager.journal.cancel_requested(self.id)
+        except (sqlite3.Error, RuntimeError) as e:  # RuntimeError: journal closed at shutdown
+            logger.warning(f"Job {self.id}: progress not saved: {e}")
+            return
+        if cancel_requested:
+            self.cancel()
+    
+    def cancel(self):
+        self.cancelled = True
+        if self.task is not None:
+            self.task.cancel()
+
+class JobManager:
+    """
+    Bounded pool of workers running tool calls in the background
+    
+    Jobs are submitted with run_tool(..., "async": true), journaled to
+    SQLite and executed by JOB_WORKERS tasks. Progress and the final
+    result go to the SSE session the call came from (if any) as
+    notifications/progress and notifications/message; job_status and
+    job_cancel work from any session or worker.
+    """
+    
+    # Final job states
+    FINISHED = ("completed", "failed", "cancelled", "interrupted")
+    
+    def __init__(self, workers: int, max_queued: int):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.journal: Optional[JobJournal] = None
+        self.node = ""
+        self._queue: Optional["asyncio.Queue[Job]"] = None
+        self._jobs: Dict[str, Job] = {}
+        self._workers: List[asyncio.Task] = []
+        self.submitted = 0
+        self.rejected = 0
+        self.recovered = 0
+        self.finished: Dict[str, int] = {status: 0 for status in self.FINISHED}
+    
+    async def start(self, journal: JobJournal):
+        self.journal = journal
+        self.node = str(os.getpid())
+        self._queue = asyncio.Queue()
+        pruned = await journal.prune(JOB_RETENTION)
+        if pruned:
+            logger.info(f"Pruned {pruned} finished jobs from the journal")
+        await self._recover()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    async def stop(self):
+        """Stop the workers; unfinished jobs stay journaled for the next start"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self.journal is not None:
+            await self.journal.close()
+    
+    async def _recover(self):
+        for row in await self.journal.unfinished():
+            if self._owner_alive(row["owner"]):
+                continue
+            if not await self.journal.claim(row["id"], row["owner"], self.node):
+                continue
+            tool = tools.get(row["tool"])
+            if tool is None or not tool.resumable:
+                await self.journal.update(
+                    row["id"],
+                    status="interrupted",
+                    error=f"Server restarted while the job was {row['status']}; "
+                          f"{row['tool']} is not safe to repeat, so it was not resumed"
+                )
+                self.finished["interrupted"] += 1
+                continue
+            
+            job = Job(row["id"], tool, json.loads(row["arguments"]), self.node, None, self)
+            await self.journal.update(job.id, status="queued")
+            self._jobs[job.id] = job
+            self._queue.put_nowait(job)
+            self.recovered += 1
+            logger.info(f"Resuming job {job.id} ({tool.name}) after restart")
+    
+    def _owner_alive(self, owner: Optional[str]) -> bool:
+        if not owner or owner == self.node:
+            return False
+        try:
+            os.kill(int(owner), 0)
+        except (ValueError, ProcessLookupError):
+            return False
+        except PermissionError:
+            pass
+        return True
+    
+    async def submit(self, tool: RegisteredTool, arguments: Dict[str, Any]) -> Optional[Job]:
+        """Queue a tool call; None when the queue is full"""
+        if self._queue is None or self._queue.qsize() >= self.max_queued:
+            self.rejected += 1
+            return None
+        
+        session = current_session.get()
+        job = Job(uuid.uuid4().hex, tool, arguments, self.node, session.id if session else None, self)
+        await self.journal.insert(job)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        self.submitted += 1
+        logger.info(f"Job {job.id} queued: {tool.name}")
+        return job
     
-    async def delete_post(self, post_id: int) -> Dict[str, Any]:
+    async def cancel(self, job_id: str) -> Optional[str]:
         """
-        Delete a WordPress post
+        Cancel a queued or running job
         
-        Args:
-            post_id: Post ID to delete
-            
         Returns:
-            Dict with success, post_id, message
+            Job status after the request, or None for an unknown job
         """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+            if job.status == "queued":
+                await self._finish(job, "cancelled", error="Cancelled before it started")
+            return job.status if job.status in self.FINISHED else "cancelling"
+        
+        row = await self.journal.get(job_id)
+        if row is None:
+            return None
+        if row["status"] in self.FINISHED:
+            return row["status"]
+        # Running in another worker process: it picks the flag up on its next progress report
+        await self.journal.update(job_id, cancel_requested=1)
+        return "cancelling"
+    
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = await self.journal.get(job_id)
+        if row is None:
+            return None
+        job = self._jobs.get(job_id)
+        if job is not None and job.status == "running":
+            # Progress is only flushed to the journal every JOB_PROGRESS_INTERVAL
+            row["progress"], row["total"] = job.done, job.total
+        return row
+    
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.status != "queued":
+                continue  # cancelled while waiting
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Never let one job take a worker down: the pool would shrink for good
+                logger.error(f"Job {job.id} worker error: {e}")
+                if job.status not in self.FINISHED:
+                    await self._finish(job, "failed", error=f"Internal error: {e}")
+    
+    async def _run(self, job: Job):
+        job.status = "running"
+        await self.journal.update(job.id, status="running")
+        logger.info(f"Job {job.id} started: {job.tool.name}")
+        
+        current_job.set(job)
+        started = time.monotonic()
+        job.task = asyncio.ensure_future(call_handler(job.tool, job.arguments, job.arguments.get("site", sites.default)))
         try:
-            logger.info(f"Deleting post ID: {post_id}")
-            
-            response = await self.client.delete(f"{self.url}/posts/{post_id}")
-            response.raise_for_status()
-            
-            logger.info(f"Post deleted successfully: ID={post_id}")
-            
-            return {
-                "success": True,
-                "post_id": post_id,
-                "message": f"Post ID {post_id} deleted successfully!"
-            }
-            
-        except httpx.HTTPStatusError as e:
-            error_msg = f"HTTP error deleting post: {e.response.status_code} - {e.response.text}"
-            logger.error(error_msg)
-            return {
-                "success": False,
-                "post_id": post_id,
-                "message": error_msg
-            }
+            result = await asyncio.shield(job.task)
+        except asyncio.CancelledError:
+            if not job.cancelled:
+                job.task.cancel()
+                raise  # shutting down: leave the job journaled as running
+            observe_tool(job.tool.name, started, "cancelled")
+            await self._finish(job, "cancelled", error="Cancelled")
+            return
         except Exception as e:
-            error_msg = f"Error deleting post: {str(e)}"
-            logger.error(error_msg)
-            return {
-                "success": False,
-                "post_id": post_id,
-                "message": error_msg
-            }
+            logger.error(f"Job {job.id} failed: {e}")
+            observe_tool(job.tool.name, started, "error")
+            await self._finish(job, "failed", error=str(e))
+            return
+        finally:
+            current_job.set(None)
+        
+        observe_tool(job.tool.name, started, tool_outcome(result))
+        await self._finish(job, "completed", result=result)
     
-    async def close(self):
-        """Close the HTTP client"""
-        await self.client.aclose()
-        logger.info("WordPress MCP client closed")
+    async def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None):
+        """Record a job's final state; never raises, a journal failure is only logged"""
+        job.status = status
+        self._jobs.pop(job.id, None)
+        try:
+            encoded = dump_json(result) if result is not None else None
+        except (TypeError, ValueError) as e:
+            status = job.status = "failed"
+            result, encoded, error = None, None, f"Result could not be stored: {e}"
+        self.finished[status] += 1
+        try:
+            await self.journal.update(
+                job.id,
+                status=status,
+                progress=job.done,
+                total=job.total,
+                result=encoded,
+                error=error
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Job {job.id} {status}, but the journal couldn't be updated: {e}")
+        logger.info(f"Job {job.id} {status}")
+        
+        data: Dict[str, Any] = {"job_id": job.id, "tool": job.tool.name, "status": status}
+        if result is not None:
+            data["result"] = result
+        if error is not None:
+            data["error"] = error
+        self.notify(job, {
+            "jsonrpc": "2.0",
+            "method": "notifications/message",
+            "params": {"level": "info" if status == "completed" else "error", "logger": "jobs", "data": data}
+        }, reliable=True)
+    
+    def notify(self, job: Job, message: Dict[str, Any], reliable: bool = False):
+        """Push a notification to the job's SSE session, if it is still open here"""
+        session = sessions.get(job.session_id) if job.session_id else None
+        if session is None:
+            return
+        if reliable:
+            session.spawn(session.send("message", dump_json(message)))
+        else:
+            session.offer("message", dump_json(message))
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": sum(1 for job in self._jobs.values() if job.status == "queued"),
+            "running": sum(1 for job in self._jobs.values() if job.status == "running"),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "recovered": self.recovered,
+            **self.finished
+        }
+
+jobs = JobManager(JOB_WORKERS, JOB_MAX_QUEUED)
 
 # ============================================================================
-# MCP Server Setup
+# Streaming Tool Calls
 # ============================================================================
 
-# Global WordPress client instance
-wp_client: Optional[WordPressMCP] = None
-
-# Create MCP server
-mcp_server = Server("wordpress-mcp-server")
-
-@mcp_server.list_tools()
-async def list_tools() -> List[Tool]:
-    """List all available MCP tools"""
-    return [
-        Tool(
-            name="create_post",
-            description="Create a new WordPress post on your site",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Post title"
-                    },
-                    "content": {
-                        "type": "string",
-                        "description": "Post content in HTML"
-                    },
-                    "excerpt": {
-                        "type": "string",
-                        "description": "Post excerpt (optional)",
-                        "default": ""
-                    },
-                    "status": {
-                        "type": "string",
-                        "enum": ["publish", "draft", "private"],
-                        "description": "Post status",
-                        "default": "publish"
-                    }
-                },
-                "required": ["title", "content"]
-            }
-        ),
-        Tool(
-            name="update_post",
-            description="Update an existing WordPress post",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "post_id": {
-                        "type": "integer",
-                        "description": "Post ID to update"
-                    },
-                    "title": {
-                        "type": "string",
-                        "description": "New post title (optional)"
-                    },
-                    "content": {
-                        "type": "string",
-                        "description": "New post content in HTML (optional)"
-                    },
-                    "excerpt": {
-                        "type": "string",
-                        "description": "New post excerpt (optional)"
-                    }
-                },
-                "required": ["post_id"]
-            }
-        ),
-        Tool(
-            name="get_posts",
-            description="Get list of WordPress posts",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "per_page": {
-                        "type": "integer",
-                        "description": "Number of posts per page (1-100)",
-                        "default": 10,
-                        "minimum": 1,
-                        "maximum": 100
-                    },
-                    "page": {
-                        "type": "integer",
-                        "description": "Page number",
-                        "default": 1,
-                        "minimum": 1
-                    }
+async def stream_iter_posts(
+    request_id: Any,
+    arguments: Dict[str, Any],
+    progress_token: Any,
+    site: str
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream all posts as MCP progress notifications, then the final result
+    
+    Each upstream page becomes one notifications/progress message carrying
+    its posts, so memory stays flat regardless of site size.
+    """
+    streamed = 0
+    total = 0
+    try:
+        async with sites.client(site) as wp:
+            async for page in wp.iter_post_pages(fields=arguments.get("fields")):
+                streamed += len(page["posts"])
+                total = page["total"]
+                yield {
+                    "event": "message",
+                    "data": dump_json({
+                        "jsonrpc": "2.0",
+                        "method": "notifications/progress",
+                        "params": {
+                            "progressToken": progress_token,
+                            "progress": streamed,
+                            "total": total,
+                            "message": f"Page {page['page']} of {page['total_pages']}",
+                            "posts": page["posts"]
+                        }
+                    })
                 }
-            }
-        ),
-        Tool(
-            name="delete_post",
-            description="Delete a WordPress post",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "post_id": {
-                        "type": "integer",
-                        "description": "Post ID to delete"
+        
+        result = {
+            "success": True,
+            "count": streamed,
+            "total": total,
+            "message": f"Streamed {streamed} posts"
+        }
+        logger.info(f"Streamed {streamed} posts")
+        
+    except httpx.HTTPStatusError as e:
+        error_msg = f"HTTP error iterating posts: {http_error_detail(e)}"
+        logger.error(error_msg)
+        result = {"success": False, "count": streamed, "total": total, "message": error_msg}
+    except Exception as e:
+        error_msg = f"Error iterating posts: {str(e)}"
+        logger.error(error_msg)
+        result = {"success": False, "count": streamed, "total": total, "message": error_msg}
+    
+    yield {
+        "event": "message",
+        "data": dump_json({
+            "jsonrpc": "2.0",
+            "result": {
+                "content": [
+                    {
+                        "type": "text",
+                        "text": dump_json(result)
                     }
-                },
-                "required": ["post_id"]
-            }
-        )
-    ]
+                ]
+            },
+            "id": request_id
+        })
+    }
 
-@mcp_server.call_tool()
-async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
-    """Handle MCP tool calls"""
-    global wp_client
+# Tools that can stream their results when the client accepts text/event-stream
+STREAMING_TOOLS = {
+    "iter_posts": stream_iter_posts,
+}
+
+def get_streaming_call(message: Any) -> Optional[AsyncIterator[Dict[str, Any]]]:
+    """Return an event stream for a streamable tools/call, or None"""
+    if (
+        not sites.started
+        or not isinstance(message, dict)
+        or message.get("method") != "tools/call"
+    ):
+        return None
     
-    logger.info(f"Tool called: {name} with arguments: {arguments}")
+    params = message.get("params") or {}
+    handler = STREAMING_TOOLS.get(params.get("name"))
+    if handler is None or (params.get("arguments") or {}).get("async"):
+        return None
     
-    if wp_client is None:
-        error_result = {
-            "success": False,
-            "message": "WordPress client not initialized"
-        }
-        return [TextContent(type="text", text=json.dumps(error_result, indent=2))]
+    arguments = params.get("arguments", {})
+    try:
+        tools.validate(params.get("name"), arguments)
+        site = sites.resolve(arguments.get("site"))
+        admission.check_rate(admission_client())
+    except (ToolArgumentError, Overloaded):
+        return None  # answered with a regular JSON-RPC error
     
+    request_id = message.get("id")
+    progress_token = (params.get("_meta") or {}).get("progressToken", request_id)
+    logger.info(f"MCP streaming request: tool={params.get('name')}, id={request_id}, site={site}")
+    return admitted_stream(
+        handler(request_id, arguments, progress_token, site),
+        tools.get(params.get("name")).lane,
+        request_id
+    )
+
+async def admitted_stream(
+    stream: AsyncIterator[Dict[str, Any]],
+    lane: Optional[str],
+    request_id: Any
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run a tool stream while holding a slot in its admission lane, for as long as it streams"""
     try:
-        if name == "create_post":
-            result = await wp_client.create_post(
-                title=arguments["title"],
-                content=arguments["content"],
-                excerpt=arguments.get("excerpt", ""),
-                status=arguments.get("status", "publish")
-            )
-        elif name == "update_post":
-            result = await wp_client.update_post(
-                post_id=arguments["post_id"],
-                title=arguments.get("title"),
-                content=arguments.get("content"),
-                excerpt=arguments.get("excerpt")
-            )
-        elif name == "get_posts":
-            result = await wp_client.get_posts(
-                per_page=arguments.get("per_page", 10),
-                page=arguments.get("page", 1)
-            )
-        elif name == "delete_post":
-            result = await wp_client.delete_post(
-                post_id=arguments["post_id"]
-            )
-        else:
-            result = {
-                "success": False,
-                "message": f"Unknown tool: {name}"
-            }
-        
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
-        
-    except Exception as e:
-        error_result = {
-            "success": False,
-            "message": f"Error executing tool: {str(e)}"
-        }
-        logger.error(f"Tool execution error: {e}")
-        return [TextContent(type="text", text=json.dumps(error_result, indent=2))]
+        async with admission.hold(admission_client(), lane):
+            async for event in stream:
+                yield event
+    except Overloaded as e:
+        yield {"event": "message", "data": dump_json(jsonrpc_error(-32001, str(e), request_id, e.data()))}
+    finally:
+        await stream.aclose()
 
 # ============================================================================
 # FastAPI Application
 # ============================================================================
 
+async def publish_metrics():
+    """Share this worker's metrics with the others every METRICS_SNAPSHOT_INTERVAL seconds"""
+    while True:
+        try:
+            metrics.publish(SHARED_STATE_DIR, sessions.node)
+        except OSError as e:
+            logger.error(f"Publishing metrics failed: {e}")
+        await asyncio.sleep(METRICS_SNAPSHOT_INTERVAL)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
-    global wp_client
+    global session_router, trace_exporter
     
     # Startup
     logger.info("Starting WordPress MCP SSE Server...")
-    wp_client = WordPressMCP(WORDPRESS_URL, WORDPRESS_USERNAME, WORDPRESS_PASSWORD)
-    logger.info("WordPress client initialized")
+    if WORKERS > 1:
+        private_directory(SHARED_STATE_DIR)
+        sessions.node = str(os.getpid())
+        session_router = SessionRouter(SHARED_STATE_DIR, sessions.node, sessions)
+        await session_router.start()
+    await sites.start(SHARED_STATE_DIR if WORKERS > 1 else None)
+    logger.info(f"WordPress client initialized ({len(sites.sites)} site(s), default {sites.default})")
+    sites_task = asyncio.create_task(sites.run())
+    heartbeat_task = asyncio.create_task(sessions.heartbeats.run())
+    metrics_task = asyncio.create_task(publish_metrics()) if WORKERS > 1 else None
+    trace_task = None
+    if TRACE_EXPORT_PATH:
+        trace_exporter = TraceExporter(
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), TRACE_EXPORT_PATH),
+            TRACE_EXPORT_SAMPLE_RATE
+        )
+        trace_task = asyncio.create_task(trace_exporter.run())
+    await jobs.start(JobJournal(os.path.join(os.path.dirname(os.path.abspath(__file__)), JOB_JOURNAL_PATH)))
     
     yield
     
     # Shutdown
     logger.info("Shutting down WordPress MCP SSE Server...")
-    if wp_client:
-        await wp_client.close()
+    heartbeat_task.cancel()
+    sites_task.cancel()
+    if metrics_task:
+        metrics_task.cancel()
+    if trace_task:
+        trace_task.cancel()
+    await jobs.stop()
+    if session_router:
+        await session_router.close()
+    await sites.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -507,8 +6190,6 @@ app.add_middleware(
 @app.get("/")
 async def root():
     """Server information endpoint"""
-    tools = await list_tools()
-    
     return {
         "name": "WordPress MCP SSE Server",
         "version": "1.0.0",
@@ -516,104 +6197,409 @@ async def root():
         "description": "Manage WordPress posts through ChatGPT using Model Context Protocol",
         "endpoints": {
             "/": "Server information",
-            "/health": "Health check",
+            "/tools": "Tool list (tools/list result, supports If-None-Match)",
+            "/health": "Health check (503 while WordPress is unreachable)",
+            "/metrics": "Prometheus metrics",
+            "/admin/profile": "Sampling profiler (requires ADMIN_TOKEN)",
             "/sse": "SSE endpoint for ChatGPT",
-            "/mcp": "MCP JSON-RPC endpoint"
+            "/mcp": "MCP JSON-RPC endpoint",
+            "/sites/{site}/sse, /sites/{site}/mcp": "The same endpoints bound to one site"
         },
         "tools": [
             {
                 "name": tool.name,
                 "description": tool.description
             }
-            for tool in tools
+            for tool in tools.tools
         ],
-        "wordpress_url": WORDPRESS_URL
+        "wordpress_url": sites.sites[sites.default]["url"],
+        "sites": list(sites.sites),
+        "default_site": sites.default
     }
 
+@app.get("/tools")
+async def tools_endpoint(request: Request):
+    """
+    The tools/list result, with an ETag
+    
+    Clients that cache the tool list revalidate it here with If-None-Match
+    and get 304 Not Modified while the registry is unchanged.
+    """
+    _, encoded, etag = tools.result("tools/list")
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=encoded, media_type="application/json", headers={"ETag": etag})
+
 @app.get("/health")
 async def health():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "wordpress-mcp-sse-server"
-    }
+    """
+    Readiness check: 200 while WordPress is reachable, 503 otherwise
+    
+    The body carries the same diagnostics either way. Readiness and the
+    client details describe the default site; "sites" lists the open ones.
+    """
+    wp = sites.get(sites.default) if sites.started else None
+    upstream = await wp.check_upstream() if wp else None
+    ready = bool(upstream and upstream["reachable"])
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "healthy" if ready else "unhealthy",
+            "ready": ready,
+            "service": "wordpress-mcp-sse-server",
+            "wordpress": upstream,
+            "cache": wp.posts_cache.stats() if wp else None,
+            "pool": wp.pool_stats() if wp else None,
+            "upstream": wp.resilience_stats() if wp else None,
+            "coalescing": wp.reads.stats() if wp else None,
+            "post_cache": {
+                "posts": wp.post_cache.stats(),
+                "missing": wp.missing_posts.stats(),
+                "loader": wp.post_loader.stats()
+            } if wp else None,
+            "sse": sessions.stats(),
+            "jobs": jobs.stats(),
+            "mirror": await wp.mirror.stats() if wp and wp.mirror else None,
+            "tracing": {
+                "export": trace_exporter.stats() if trace_exporter else None,
+                "profiler": profiler.stats()
+            },
+            "logging": log_handler.stats(),
+            "admission": admission.stats(),
+            "sites": sites.stats(),
+            "updates": {
+                "skipped": wp.updates_skipped,
+                "bytes_saved": wp.update_bytes_saved
+            } if wp else None,
+            "workers": {
+                "count": WORKERS,
+                "pid": os.getpid(),
+                "shared_cache": wp.shared.stats() if wp and wp.shared else None,
+                "routing": session_router.stats() if session_router else None
+            }
+        }
+    )
+
+upstream_up = metrics.gauge("wpmcp_upstream_up", "1 if the last /health probe reached WordPress", ("site",))
+upstream_retries = metrics.counter("wpmcp_upstream_retries_total", "Upstream requests retried", ("site",))
+upstream_circuit_open = metrics.gauge("wpmcp_upstream_circuit_open", "1 while the circuit breaker is open", ("site",))
+upstream_tokens = metrics.counter(
+    "wpmcp_upstream_tokens_total", "Bearer token exchanges (issued, failed) and tokens refused by WordPress (rejected)", ("site", "result")
+)
+upstream_concurrency = metrics.gauge(
+    "wpmcp_upstream_concurrency", "Adaptive concurrency limiter: current limit, requests in use and waiting", ("site", "state")
+)
+pool_connections = metrics.gauge(
+    "wpmcp_http_pool_connections", "WordPress connection pool: configured maximum, open, idle and in-flight requests", ("site", "state")
+)
+sites_open = metrics.gauge("wpmcp_sites_open", "Site clients currently open")
+sites_evicted = metrics.counter("wpmcp_sites_evicted_total", "Site clients closed for being idle or over SITE_MAX_CLIENTS")
+sse_sessions_active = metrics.gauge("wpmcp_sse_sessions_active", "Open SSE sessions")
+sse_sessions = metrics.counter("wpmcp_sse_sessions_total", "SSE sessions opened or refused at capacity", ("result",))
+cache_lookups = metrics.counter("wpmcp_cache_lookups_total", "Cache lookups by site, cache and result", ("site", "cache", "result"))
+coalesced_reads = metrics.counter(
+    "wpmcp_coalesced_reads_total", "Reads sent upstream (executed) or served by an identical in-flight read (deduplicated)", ("site", "result")
+)
+post_loader = metrics.counter(
+    "wpmcp_post_loader_total", "get_post lookups: upstream batches, IDs loaded, and IDs already pending (deduplicated)", ("site", "kind")
+)
+admission_lanes = metrics.gauge("wpmcp_admission_lane", "Admission lanes: slot limit, slots in use and calls waiting", ("lane", "state"))
+jobs_active = metrics.gauge("wpmcp_jobs", "Background jobs queued or running", ("status",))
+log_records_dropped = metrics.counter("wpmcp_log_records_dropped_total", "Log records dropped because the log queue was full")
+log_records_sampled = metrics.counter("wpmcp_log_records_sampled_out_total", "Log records skipped by LOG_SAMPLE_RATES", ("event",))
+
+@metrics.collector
+def collect_runtime_metrics():
+    """Copy the stats() of long-lived components into metrics before a scrape"""
+    sse_sessions_active.set(value=len(sessions))
+    sse_sessions.set("opened", value=sessions.opened)
+    sse_sessions.set("rejected", value=sessions.rejected)
+    job_stats = jobs.stats()
+    jobs_active.set("queued", value=job_stats["queued"])
+    jobs_active.set("running", value=job_stats["running"])
+    log_records_dropped.set(value=log_handler.dropped)
+    for event, count in list(log_sampled_out.items()):
+        log_records_sampled.set(event, value=count)
+    sites_open.set(value=len(sites.active()))
+    for name, lane in admission.lanes.items():
+        admission_lanes.set(name, "limit", value=lane.concurrency)
+        admission_lanes.set(name, "in_use", value=lane.in_use)
+        admission_lanes.set(name, "queued", value=lane.queued)
+    sites_evicted.set(value=sites.evicted)
+    
+    # Gauges only describe clients that are still open
+    for family in (upstream_up, upstream_circuit_open, upstream_concurrency, pool_connections):
+        family.samples.clear()
+    for wp in sites.active():
+        collect_site_metrics(wp)
+
+def collect_site_metrics(wp: WordPressMCP):
+    """Metrics of one open site client"""
+    site = wp.site
+    if wp._upstream_check is not None:
+        upstream_up.set(site, value=1 if wp._upstream_check["reachable"] else 0)
+    upstream_retries.set(site, value=wp.retries)
+    upstream_circuit_open.set(site, value=1 if wp.breaker.state == "open" else 0)
+    if wp.token_auth:
+        upstream_tokens.set(site, "issued", value=wp.token_auth.issued)
+        upstream_tokens.set(site, "failed", value=wp.token_auth.failures)
+        upstream_tokens.set(site, "rejected", value=wp.token_auth.rejected)
+    limiter = wp.limiter.stats()
+    for state in ("limit", "in_use", "waiting"):
+        upstream_concurrency.set(site, state, value=limiter[state])
+    pool = wp.pool_stats()
+    pool_connections.set(site, "max", value=pool["max_connections"])
+    pool_connections.set(site, "in_flight", value=pool["in_flight"])
+    if "open_connections" in pool:
+        pool_connections.set(site, "open", value=pool["open_connections"])
+        pool_connections.set(site, "idle", value=pool["idle_connections"])
+    
+    caches = [("posts", wp.posts_cache), ("post", wp.post_cache), ("post_missing", wp.missing_posts), ("update_diff", wp.raw_fields)]
+    if wp.shared:
+        caches.append(("shared", wp.shared))
+    for name, cache in caches:
+        cache_lookups.set(site, name, "hit", value=cache.hits)
+        cache_lookups.set(site, name, "miss", value=cache.misses)
+    coalesced_reads.set(site, "executed", value=wp.reads.executed)
+    coalesced_reads.set(site, "deduplicated", value=wp.reads.deduplicated)
+    post_loader.set(site, "batches", value=wp.post_loader.batches)
+    post_loader.set(site, "loaded", value=wp.post_loader.loaded)
+    post_loader.set(site, "deduplicated", value=wp.post_loader.deduplicated)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics, summed over all worker processes"""
+    snapshots = [metrics.snapshot()]
+    if WORKERS > 1 and sessions.node is not None:
+        snapshots += metrics.peers(SHARED_STATE_DIR, sessions.node, METRICS_SNAPSHOT_INTERVAL * 3)
+    return Response(
+        content=metrics.render(Metrics.merge(snapshots)),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+def check_admin(request: Request) -> Optional[Response]:
+    """None if the request carries the admin bearer token, otherwise the error response to send"""
+    if not ADMIN_TOKEN:
+        return CompactJSONResponse(
+            status_code=404,
+            content={"success": False, "message": "Admin endpoints are disabled (ADMIN_TOKEN is not set)"}
+        )
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return CompactJSONResponse(
+            status_code=401,
+            content={"success": False, "message": "Invalid admin token"},
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return None
+
+@app.post("/admin/profile")
+async def start_profile(request: Request):
+    """Run the sampling profiler for ?seconds= (default 30) at ?interval= seconds between samples"""
+    denied = check_admin(request)
+    if denied:
+        return denied
+    
+    try:
+        seconds = float(request.query_params.get("seconds", 30))
+        interval = float(request.query_params.get("interval", PROFILE_SAMPLE_INTERVAL))
+    except ValueError:
+        seconds = interval = -1.0
+    if not 0 < seconds <= PROFILE_MAX_SECONDS or not 0.001 <= interval <= 1.0:
+        return CompactJSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "message": f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}] and interval in [0.001, 1]"
+            }
+        )
+    if profiler.running:
+        return CompactJSONResponse(
+            status_code=409,
+            content={"success": False, "message": "A profile is already being recorded", **profiler.stats()}
+        )
+    
+    path = profiler.start(seconds, interval)
+    logger.info(f"Sampling profiler started for {seconds:g}s, writing {path}")
+    return CompactJSONResponse(
+        status_code=202,
+        content={
+            "success": True,
+            "path": path,
+            "pid": os.getpid(),
+            "seconds": seconds,
+            "interval": interval,
+            "message": f"Profiling for {seconds:g}s; download with GET /admin/profile?download=true"
+        }
+    )
+
+@app.get("/admin/profile")
+async def profile_status(request: Request):
+    """Profiler state, or with ?download=true the last finished profile in folded-stack format"""
+    denied = check_admin(request)
+    if denied:
+        return denied
+    
+    if request.query_params.get("download", "").lower() not in ("1", "true", "yes"):
+        return CompactJSONResponse(content={"success": True, "pid": os.getpid(), **profiler.stats()})
+    
+    if profiler.running or not profiler.path or not os.path.exists(profiler.path):
+        return CompactJSONResponse(
+            status_code=409 if profiler.running else 404,
+            content={
+                "success": False,
+                "message": "Profile is still being recorded" if profiler.running else "No profile recorded by this worker"
+            }
+        )
+    with open(profiler.path, encoding="utf-8") as handle:
+        folded = handle.read()
+    return Response(
+        content=folded,
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{os.path.basename(profiler.path)}"'}
+    )
 
 @app.get("/sse")
 async def sse_endpoint(request: Request):
-    """SSE endpoint for ChatGPT connection"""
+    """
+    SSE endpoint for ChatGPT connection (MCP over SSE transport)
     
-    async def event_generator():
-        # Send initial endpoint event
-        yield {
-            "event": "endpoint",
-            "data": json.dumps({"url": "http://localhost:8000/mcp"})
-        }
-        
-        # Send heartbeat every 15 seconds
-        try:
-            while True:
-                if await request.is_disconnected():
-                    logger.info("SSE client disconnected")
-                    break
-                
-                yield {
-                    "event": "heartbeat",
-                    "data": json.dumps({"status": "alive"})
-                }
-                
-                await asyncio.sleep(15)
-        except Exception as e:
-            logger.error(f"SSE error: {e}")
+    Each connection gets a session. The first event tells the client where
+    to POST its messages; responses to those messages come back on this stream.
+    """
+    return open_sse_session(request, None)
+
+@app.get("/sites/{site}/sse")
+async def site_sse_endpoint(site: str, request: Request):
+    """SSE endpoint whose session works on one site (tool calls default to it)"""
+    if site not in sites:
+        return CompactJSONResponse(status_code=404, content={"error": f"Unknown site: {site}"})
+    return open_sse_session(request, site)
+
+def open_sse_session(request: Request, site: Optional[str]) -> Response:
+    """Open an MCP over SSE session, optionally bound to a site"""
+    session = sessions.create()
+    if session is None:
+        logger.warning(f"SSE connection rejected: {len(sessions)} sessions open")
+        return CompactJSONResponse(
+            status_code=503,
+            content={"error": "Too many open SSE sessions"}
+        )
+    
+    session.site = site
+    session.client = request_client(request)
+    logger.info(f"SSE session opened: {session.id} ({len(sessions)} active)")
     
-    return EventSourceResponse(
-        event_generator(),
+    # Tell the client where to send messages for this session
+    prefix = f"/sites/{site}" if site else ""
+    session.offer("endpoint", f"{request.scope.get('root_path', '')}{prefix}/mcp?session_id={session.id}")
+    
+    def on_close(closed: SSESession):
+        sessions.remove(closed)
+        logger.info(f"SSE session closed: {closed.id} ({len(sessions)} active)")
+    
+    return SSESessionResponse(
+        session,
+        on_close,
         headers={
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no"
         }
     )
 
-@app.post("/mcp")
-async def mcp_endpoint(request: Request):
-    """MCP JSON-RPC endpoint"""
-    try:
-        body = await request.json()
-        method = body.get("method")
-        params = body.get("params", {})
-        request_id = body.get("id")
+def jsonrpc_error(code: int, message: str, request_id: Any = None, data: Any = None) -> Dict[str, Any]:
+    """Build a JSON-RPC 2.0 error response object"""
+    error: Dict[str, Any] = {
+        "code": code,
+        "message": message
+    }
+    if data is not None:
+        error["data"] = data
+    return {
+        "jsonrpc": "2.0",
+        "error": error,
+        "id": request_id
+    }
+
+# HTTP status used when a single (non-batch) request fails with a given code
+JSONRPC_ERROR_STATUS = {
+    -32700: 400,
+    -32600: 400,
+    -32601: 400,
+    -32602: 400,
+    -32603: 500,
+    -32001: 429,  # Refused by admission control (error.data has reason and retry_after)
+}
+
+def observe_jsonrpc(method: Any, started: float, failed: bool):
+    """Record one answered JSON-RPC request; unknown method names are grouped as "other" """
+    if method != "tools/call" and method not in STATIC_METHODS:
+        method = "other"
+    jsonrpc_requests.inc(method, "error" if failed else "success")
+    jsonrpc_duration.observe(time.monotonic() - started, method)
+
+async def handle_jsonrpc(message: Any) -> Dict[str, Any]:
+    """
+    Process a single JSON-RPC message and record it in the metrics
+    
+    Args:
+        message: Decoded JSON-RPC request object
         
-        logger.info(f"MCP request: method={method}, id={request_id}")
+    Returns:
+        JSON-RPC response object (result or error)
+    """
+    started = time.monotonic()
+    method = message.get("method") if isinstance(message, dict) else None
+    with span("dispatch", **{"rpc.method": str(method)}):
+        response = await _handle_jsonrpc(message)
+    observe_jsonrpc(method, started, "error" in response)
+    return response
+
+async def _handle_jsonrpc(message: Any) -> Dict[str, Any]:
+    """
+    Process a single JSON-RPC message
+    
+    Args:
+        message: Decoded JSON-RPC request object
         
-        if method == "initialize":
-            result = {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "tools": {}
-                },
-                "serverInfo": {
-                    "name": "wordpress-mcp-server",
-                    "version": "1.0.0"
-                }
-            }
-            
-        elif method == "tools/list":
-            tools = await list_tools()
-            result = {
-                "tools": [
-                    {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "inputSchema": tool.inputSchema
-                    }
-                    for tool in tools
-                ]
-            }
+    Returns:
+        JSON-RPC response object (result or error)
+    """
+    if not isinstance(message, dict):
+        return jsonrpc_error(-32600, "Invalid Request")
+    
+    method = message.get("method")
+    params = message.get("params") or {}
+    request_id = message.get("id")
+    
+    try:
+        log_event(logging.INFO, "mcp.request", f"MCP request: {method}", method=method, id=request_id)
+        
+        if method in STATIC_METHODS:
+            result = tools.result(method)[0]
             
         elif method == "tools/call":
             tool_name = params.get("name")
             arguments = params.get("arguments", {})
             
-            content = await call_tool(tool_name, arguments)
+            # Reject bad calls before any upstream I/O
+            try:
+                with span("validate"):
+                    tool = tools.validate(tool_name, arguments)
+                    site = sites.resolve(arguments.get("site"))
+            except ToolArgumentError as e:
+                log_event(logging.INFO, "tool.call.rejected", f"Tool call rejected: {e}", tool=tool_name)
+                return jsonrpc_error(-32602, f"Invalid params: {str(e)}", request_id)
+            
+            # Event names only ever carry registered tool names (they key sampling and metric labels)
+            log_event(logging.INFO, f"tool.call.{tool.name}", f"Tool called: {tool.name}", tool=tool.name, arguments=arguments)
+            
+            # Refuse early instead of queueing without bound
+            try:
+                async with admission.admit(admission_client(), admission_lane(tool, arguments)):
+                    content = await run_tool(tool, arguments, site)
+            except Overloaded as e:
+                return jsonrpc_error(-32001, str(e), request_id, e.data())
             
             result = {
                 "content": [
@@ -626,17 +6612,7 @@ async def mcp_endpoint(request: Request):
             }
             
         else:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32601,
-                        "message": f"Method not found: {method}"
-                    },
-                    "id": request_id
-                }
-            )
+            return jsonrpc_error(-32601, f"Method not found: {method}", request_id)
         
         return {
             "jsonrpc": "2.0",
@@ -645,18 +6621,192 @@ async def mcp_endpoint(request: Request):
         }
         
     except Exception as e:
-        logger.error(f"MCP endpoint error: {e}")
-        return JSONResponse(
-            status_code=500,
-            content={
-                "jsonrpc": "2.0",
-                "error": {
-                    "code": -32603,
-                    "message": f"Internal error: {str(e)}"
-                },
-                "id": request_id if 'request_id' in locals() else None
-            }
+        logger.error(f"MCP request error: {e}")
+        return jsonrpc_error(-32603, f"Internal error: {str(e)}", request_id)
+
+async def handle_jsonrpc_batch(messages: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Process a JSON-RPC 2.0 batch concurrently
+    
+    Messages are dispatched in parallel, bounded by MCP_BATCH_CONCURRENCY.
+    Each message gets its own response, so one failing call does not fail
+    the whole batch. Notifications (messages without an id) get no response.
+    
+    Args:
+        messages: List of decoded JSON-RPC request objects
+        
+    Returns:
+        List of JSON-RPC response objects in request order
+    """
+    semaphore = asyncio.Semaphore(MCP_BATCH_CONCURRENCY)
+    
+    async def run(message: Any) -> Dict[str, Any]:
+        async with semaphore:
+            return await handle_jsonrpc(message)
+    
+    responses = await asyncio.gather(*(run(message) for message in messages))
+    
+    return [
+        response
+        for message, response in zip(messages, responses)
+        if not (isinstance(message, dict) and "id" not in message)
+    ]
+
+async def dispatch_to_session(session: SSESession, body: Any):
+    """Process a message POSTed for an SSE session and push the response to its stream"""
+    current_session.set(session)
+    current_site.set(session.site)
+    with Trace("SSE message", **{"mcp.session_id": session.id}) as trace:
+        await _dispatch_to_session(session, body)
+    if trace_exporter:
+        trace_exporter.export(trace)
+
+async def _dispatch_to_session(session: SSESession, body: Any):
+    try:
+        if isinstance(body, list):
+            if not body or len(body) > MCP_BATCH_MAX_SIZE:
+                await session.send("message", dump_json(jsonrpc_error(-32600, "Invalid Request: bad batch size")))
+                return
+            responses = await handle_jsonrpc_batch(body)
+            if responses:
+                await session.send("message", dump_json(responses))
+            return
+        
+        stream = get_streaming_call(body)
+        if stream is not None:
+            try:
+                async for event in stream:
+                    if not await session.send(event["event"], event["data"]):
+                        break
+            finally:
+                await stream.aclose()  # gives the lane slot back now, not when the generator is collected
+            return
+        
+        response = await handle_jsonrpc(body)
+        if not (isinstance(body, dict) and "id" not in body):
+            await session.send("message", dump_json(response))
+            
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"SSE session {session.id} dispatch error: {e}")
+
+@app.post("/mcp")
+async def mcp_endpoint(request: Request):
+    """MCP JSON-RPC endpoint (single requests and batches), traced per phase"""
+    current_client.set(request_client(request))
+    with Trace("POST /mcp") as trace:
+        response = await handle_mcp_request(request)
+    if TRACE_SERVER_TIMING:
+        response.headers["Server-Timing"] = trace.server_timing()
+    if trace_exporter:
+        trace_exporter.export(trace)
+    return response
+
+def request_client(request: Request) -> str:
+    """
+    Admission client of a request: its address
+    
+    Client-chosen values (headers, session IDs) are never used, so a client
+    can't spread its calls over many buckets. Behind a proxy listed in
+    TRUSTED_PROXIES, uvicorn has already replaced the address with the one
+    from X-Forwarded-For; from anyone else that header is ignored.
+    """
+    return f"ip:{request.client.host}" if request.client else "anonymous"
+
+@app.post("/sites/{site}/mcp")
+async def site_mcp_endpoint(site: str, request: Request):
+    """MCP JSON-RPC endpoint bound to one site: tool calls default to it and can't name another"""
+    if site not in sites:
+        return CompactJSONResponse(status_code=404, content=jsonrpc_error(-32600, f"Unknown site: {site}"))
+    current_site.set(site)
+    return await mcp_endpoint(request)
+
+async def handle_mcp_request(request: Request) -> Response:
+    """Answer one POST /mcp: a single JSON-RPC message, a batch, or a message for an SSE session"""
+    started = time.monotonic()
+    try:
+        with span("parse"):
+            body = await request.json()
+    except Exception as e:
+        logger.error(f"MCP endpoint parse error: {e}")
+        return CompactJSONResponse(
+            status_code=400,
+            content=jsonrpc_error(-32700, f"Parse error: {str(e)}")
+        )
+    
+    # Message for an SSE session: accept now, answer on the stream
+    session_id = request.query_params.get("session_id")
+    if session_id is not None:
+        session = sessions.get(session_id)
+        if session is not None:
+            session.spawn(dispatch_to_session(session, body))
+            return Response(status_code=202)
+        
+        # The stream may be held by another worker process
+        status = await session_router.forward(session_id, body) if session_router else 404
+        if status == 202:
+            return Response(status_code=202)
+        return CompactJSONResponse(
+            status_code=status,
+            content=jsonrpc_error(
+                -32600 if status == 404 else -32603,
+                f"Unknown SSE session: {session_id}" if status == 404 else "SSE session owner unavailable"
+            )
         )
+    
+    if isinstance(body, list):
+        if not body:
+            return CompactJSONResponse(
+                status_code=400,
+                content=jsonrpc_error(-32600, "Invalid Request: empty batch")
+            )
+        if len(body) > MCP_BATCH_MAX_SIZE:
+            return CompactJSONResponse(
+                status_code=400,
+                content=jsonrpc_error(
+                    -32600,
+                    f"Invalid Request: batch exceeds {MCP_BATCH_MAX_SIZE} messages"
+                )
+            )
+        
+        logger.info(f"MCP batch request: {len(body)} messages")
+        responses = await handle_jsonrpc_batch(body)
+        
+        if not responses:
+            return Response(status_code=204)
+        with span("serialize"):
+            return CompactJSONResponse(content=responses)
+    
+    if isinstance(body, dict) and body.get("method") in STATIC_METHODS and "id" in body:
+        # Always the full response: the client needs the reply carrying its id
+        # (conditional requests are served by GET /tools)
+        _, encoded, _ = tools.result(body["method"])
+        response = Response(
+            content=b'{"jsonrpc":"2.0","result":' + encoded
+            + b',"id":' + dump_json(body["id"]).encode("utf-8") + b'}',
+            media_type="application/json"
+        )
+        observe_jsonrpc(body["method"], started, False)
+        return response
+    
+    stream = None
+    if "text/event-stream" in request.headers.get("accept", ""):
+        stream = get_streaming_call(body)
+    if stream is not None:
+        return EventSourceResponse(stream, headers={"X-Accel-Buffering": "no"})
+    
+    response = await handle_jsonrpc(body)
+    
+    with span("serialize"):
+        if "error" in response:
+            retry_after = (response["error"].get("data") or {}).get("retry_after")
+            return CompactJSONResponse(
+                status_code=JSONRPC_ERROR_STATUS.get(response["error"]["code"], 500),
+                content=response,
+                headers={"Retry-After": str(max(math.ceil(retry_after), 1))} if retry_after is not None else None
+            )
+        return CompactJSONResponse(content=response)
 
 # ============================================================================
 # Main Entry Point
@@ -666,14 +6816,30 @@ if __name__ == "__main__":
     logger.info("=" * 60)
     logger.info("WordPress MCP SSE Server")
     logger.info("=" * 60)
-    logger.info(f"WordPress URL: {WORDPRESS_URL}")
-    logger.info("Starting server on http://0.0.0.0:8000")
+    for name, options in sites.sites.items():
+        logger.info(f"WordPress URL: {options['url']}" + (f" (site {name})" if SITES else ""))
+    logger.info(f"Starting server on http://{SERVER_HOST}:{SERVER_PORT} ({WORKERS} worker(s))")
     logger.info("=" * 60)
     
+    if WORKERS > 1:
+        # Workers share state through SHARED_STATE_DIR; start from a clean slate
+        try:
+            private_directory(SHARED_STATE_DIR)
+        except RuntimeError as e:
+            logger.error(f"Refusing to start: SHARED_STATE_DIR {e}")
+            sys.exit(1)
+        for name in os.listdir(SHARED_STATE_DIR):
+            if (name.startswith("cache") and ".sqlite3" in name) or (name.startswith("worker-") and name.endswith(".sock")):
+                os.unlink(os.path.join(SHARED_STATE_DIR, name))
+    
     uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=8000,
-        log_level="info"
+        "mcp_sse_server:app" if WORKERS > 1 else app,
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        workers=WORKERS,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        log_level=str(LOG_LEVEL).lower(),
+        proxy_headers=True,
+        forwarded_allow_ips=TRUSTED_PROXIES,
+        log_config=None  # Keep uvicorn's loggers on the queue handler set up above
     )
-
@@ -0,0 +1,215 @@
+"""
+Shared fixtures for the server's unit tests
+
+The server is a single module at the repository root; it is imported
+directly, without starting the app. WordPress is replaced by FakeWordPress,
+an in-memory REST API served through httpx.MockTransport.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mcp_sse_server  # noqa: E402
+
+
+class FakeClock:
+    """Stand-in for the time module as seen by mcp_sse_server, advanced by hand"""
+    
+    def __init__(self):
+        self.now = 1000.0
+        self.wall = time.time()
+    
+    def monotonic(self) -> float:
+        return self.now
+    
+    def time(self) -> float:
+        return self.wall + self.now
+    
+    def advance(self, seconds: float):
+        self.now += seconds
+    
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    """Freeze the server module's clock; the event loop keeps the real one"""
+    fake = FakeClock()
+    monkeypatch.setattr(mcp_sse_server, "time", fake)
+    return fake
+
+
+class FakeWordPress:
+    """
+    In-memory WordPress REST API (posts) for httpx.MockTransport
+    
+    Listings are ordered by ID and support page, per_page, include,
+    modified_after and _fields, with an ETag answered by 304 on
+    If-None-Match; every request is kept in `requests`.
+    Pages listed in fail_pages answer 400. /batch/v1 exists when
+    batch_max_items is set. Uploaded media bodies are kept in `media`.
+    """
+    
+    def __init__(self, posts: int = 20):
+        self.posts: Dict[int, Dict[str, Any]] = {}
+        self.requests: List[httpx.Request] = []
+        self.batch_max_items: Optional[int] = None
+        self.batches: List[List[Dict[str, Any]]] = []  # Sub-requests of every /batch/v1 call
+        self.media: Dict[int, bytes] = {}
+        self.fail_pages: set = set()
+        self.updates = 0  # Successful single-post writes (each creates a revision)
+        self._clock = 0
+        for _ in range(posts):
+            self.add_post(f"Post {len(self.posts) + 1}", f"<p>Content {len(self.posts) + 1}</p>")
+    
+    def add_post(self, title: str, content: str, excerpt: str = "", status: str = "publish") -> Dict[str, Any]:
+        post_id = max(self.posts, default=0) + 1
+        self.posts[post_id] = {"id": post_id, "status": status, "date": "2025-01-01T00:00:00", "link": f"http://wp.test/?p={post_id}", "slug": f"post-{post_id}"}
+        self._write(post_id, {"title": title, "content": content, "excerpt": excerpt})
+        return self.posts[post_id]
+    
+    def _write(self, post_id: int, data: Dict[str, Any]):
+        post = self.posts[post_id]
+        for field, value in data.items():
+            if field in ("title", "content", "excerpt"):
+                post[field] = {"raw": value, "rendered": value}
+            else:
+                post[field] = value
+        self._clock += 1
+        post["modified"] = post["modified_gmt"] = f"2025-02-01T00:00:{self._clock:02d}"
+    
+    def paths(self, method: str = "GET") -> List[str]:
+        """Paths of the requests received with method"""
+        return [request.url.path for request in self.requests if request.method == method]
+    
+    @staticmethod
+    def _project(post: Dict[str, Any], fields: Optional[str]) -> Dict[str, Any]:
+        if not fields:
+            return post
+        names = set(fields.split(","))
+        return {key: value for key, value in post.items() if key in names}
+    
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path.startswith("/wp-json/wp/v2/media"):
+            return self.upload(request)
+        body = json.loads(request.content) if request.content else None
+        return self.route(request.method, request.url.path, request.url.params, body, request.headers)
+    
+    def upload(self, request: httpx.Request) -> httpx.Response:
+        rest = request.url.path[len("/wp-json/wp/v2/media"):].strip("/")
+        if request.method == "POST" and not rest:
+            media_id = 1000 + len(self.media) + 1
+            self.media[media_id] = request.content
+            return httpx.Response(201, json={"id": media_id, "source_url": f"http://wp.test/uploads/{media_id}"})
+        if request.method == "GET" and rest and int(rest) in self.media:
+            return httpx.Response(200, json={"id": int(rest), "source_url": f"http://wp.test/uploads/{rest}"})
+        return httpx.Response(404, json={"code": "rest_post_invalid_id"})
+    
+    def route(self, method: str, path: str, params: Any, body: Any, headers: Any = None) -> httpx.Response:
+        if path == "/wp-json/batch/v1":
+            return self.batch(method, body)
+        prefix = "/wp-json/wp/v2/posts"
+        if not path.startswith(prefix):
+            return httpx.Response(404, json={"code": "rest_no_route"})
+        rest = path[len(prefix):].strip("/")
+        
+        if not rest and method == "GET":
+            listed = [post for _, post in sorted(self.posts.items()) if post["status"] != "trash"]
+            if params.get("include"):
+                wanted = {int(post_id) for post_id in params["include"].split(",")}
+                listed = [post for post in listed if post["id"] in wanted]
+            if params.get("modified_after"):
+                listed = [post for post in listed if post["modified_gmt"] > params["modified_after"]]
+            per_page, page = int(params.get("per_page", 10)), int(params.get("page", 1))
+            if page in self.fail_pages:
+                return httpx.Response(400, json={"code": "rest_post_invalid_page_number"})
+            pages = max(-(-len(listed) // per_page), 1)
+            content = json.dumps([self._project(post, params.get("_fields")) for post in listed[(page - 1) * per_page:page * per_page]])
+            etag = '"' + hashlib.sha256(content.encode("utf-8")).hexdigest()[:16] + '"'
+            if headers is not None and headers.get("If-None-Match") == etag:
+                return httpx.Response(304, headers={"ETag": etag})
+            return httpx.Response(
+                200,
+                content=content,
+                headers={"Content-Type": "application/json", "ETag": etag, "X-WP-Total": str(len(listed)), "X-WP-TotalPages": str(pages)}
+            )
+        if not rest and method == "POST":
+            post = self.add_post(body["title"], body["content"], body.get("excerpt", ""), body.get("status", "publish"))
+            return httpx.Response(201, json=post)
+        
+        post = self.posts.get(int(rest))
+        if post is None or post["status"] == "trash":
+            return httpx.Response(404, json={"code": "rest_post_invalid_id"})
+        if method == "GET":
+            return httpx.Response(200, json=self._project(post, params.get("_fields")))
+        if method == "POST":
+            self._write(post["id"], body)
+            self.updates += 1
+            return httpx.Response(200, json=post)
+        if method == "DELETE":
+            post["status"] = "trash"
+            return httpx.Response(200, json=post)
+        return httpx.Response(405, json={"code": "rest_no_route"})
+    
+    def batch(self, method: str, body: Any) -> httpx.Response:
+        if self.batch_max_items is None:
+            return httpx.Response(404, json={"code": "rest_no_route"})
+        if method == "OPTIONS":
+            return httpx.Response(200, json={"endpoints": [{"args": {"requests": {"maxItems": self.batch_max_items}}}]})
+        self.batches.append(body["requests"])
+        responses = []
+        for request in body["requests"]:
+            response = self.route(request["method"], "/wp-json" + request["path"], {}, request.get("body"))
+            responses.append({"status": response.status_code, "body": response.json(), "headers": {}})
+        return httpx.Response(207, json={"responses": responses})
+
+
+@pytest.fixture
+def wordpress() -> FakeWordPress:
+    return FakeWordPress()
+
+
+@pytest.fixture
+def make_client(wordpress):
+    """Factory for a WordPressMCP talking to the fake site; call it inside the test's event loop"""
+    def make(**options) -> mcp_sse_server.WordPressMCP:
+        wp = mcp_sse_server.WordPressMCP("http://wp.test", "editor", "secret", **options)
+        wp.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(wordpress.handler),
+            headers={"Content-Type": "application/json"}
+        )
+        return wp
+    return make
+
+
+@pytest.fixture
+def serve_site(make_client, monkeypatch):
+    """Serve tool calls from the fake site: installs a started one-site registry; call it inside the test's event loop"""
+    def serve(**options) -> mcp_sse_server.WordPressMCP:
+        wp = make_client(**options)
+        registry = mcp_sse_server.SiteRegistry({"default": {"url": "http://wp.test"}}, "default", 300.0, 4)
+        registry.started = True
+        registry._clients["default"] = wp
+        monkeypatch.setattr(mcp_sse_server, "sites", registry)
+        return wp
+    return serve
+
+
+@pytest.fixture
+def app_client():
+    """Factory for an httpx client calling the app in process (no lifespan); use it inside the test's event loop"""
+    def make(address: str = "10.0.0.1") -> httpx.AsyncClient:
+        transport = httpx.ASGITransport(app=mcp_sse_server.app, client=(address, 40000))
+        return httpx.AsyncClient(transport=transport, base_url="http://mcp.test")
+    return make
@@ -0,0 +1,188 @@
+"""Tests for admission control: fair lanes, load shedding and client rate limits"""
+
+import asyncio
+
+import pytest
+
+from mcp_sse_server import AdmissionController, FairLane, Overloaded
+
+
+async def queue_calls(lane, clients, order):
+    """Start one waiting call per client entry; each records its turn and frees the slot"""
+    async def call(client):
+        await lane.acquire(client)
+        order.append(client)
+        lane.release(0.01)
+    
+    tasks = [asyncio.ensure_future(call(client)) for client in clients]
+    await asyncio.sleep(0)
+    return tasks
+
+
+def test_freed_slots_go_to_clients_round_robin():
+    async def scenario():
+        lane = FairLane("read", concurrency=1, max_queue=100, max_wait=5.0)
+        await lane.acquire("bulk")
+        order = []
+        tasks = await queue_calls(lane, ["bulk", "bulk", "bulk", "interactive"], order)
+        lane.release(0.01)
+        await asyncio.gather(*tasks)
+        return lane, order
+    
+    lane, order = asyncio.run(scenario())
+    assert order == ["bulk", "interactive", "bulk", "bulk"]
+    assert lane.in_use == 0
+    assert lane.queued == 0
+    assert lane.admitted == 5
+
+
+def test_full_queue_is_refused_immediately():
+    async def scenario():
+        lane = FairLane("write", concurrency=1, max_queue=1, max_wait=5.0)
+        await lane.acquire("a")
+        waiter = asyncio.ensure_future(lane.acquire("a"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as refused:
+            await lane.acquire("b")
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return lane, refused.value
+    
+    lane, error = asyncio.run(scenario())
+    assert error.reason == "queue_full"
+    assert error.retry_after >= 1.0
+    assert lane.shed == 1
+
+
+def test_call_is_refused_when_expected_wait_exceeds_deadline():
+    async def scenario():
+        lane = FairLane("read", concurrency=1, max_queue=100, max_wait=1.0)
+        lane.service_time = 10.0
+        await lane.acquire("a")
+        with pytest.raises(Overloaded) as refused:
+            await lane.acquire("b")
+        return lane, refused.value
+    
+    lane, error = asyncio.run(scenario())
+    assert error.reason == "deadline"
+    assert error.data() == {"reason": "deadline", "retry_after": 10.0}
+    assert lane.queued == 0
+
+
+def test_waiter_that_times_out_gives_up_its_place():
+    async def scenario():
+        lane = FairLane("read", concurrency=1, max_queue=100, max_wait=0.05)
+        await lane.acquire("a")
+        with pytest.raises(Overloaded) as refused:
+            await lane.acquire("b")
+        assert lane.queued == 0
+        lane.release(0.01)
+        return lane, refused.value
+    
+    lane, error = asyncio.run(scenario())
+    assert error.reason == "deadline"
+    assert lane.in_use == 0
+    assert lane.shed == 1
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        lane = FairLane("read", concurrency=1, max_queue=100, max_wait=5.0)
+        await lane.acquire("a")
+        waiter = asyncio.ensure_future(lane.acquire("b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert lane.queued == 0
+        lane.release(0.01)
+        return lane
+    
+    assert asyncio.run(scenario()).in_use == 0
+
+
+def test_slot_handed_to_a_cancelled_waiter_is_passed_on():
+    async def scenario():
+        lane = FairLane("read", concurrency=1, max_queue=100, max_wait=5.0)
+        await lane.acquire("a")
+        waiter = asyncio.ensure_future(lane.acquire("b"))
+        await asyncio.sleep(0)
+        lane.release(0.01)
+        waiter.cancel()
+        outcome, = await asyncio.gather(waiter, return_exceptions=True)
+        if not isinstance(outcome, asyncio.CancelledError):
+            # Before Python 3.12 wait_for returns a result that is already set despite the cancel
+            lane.release(0.01)
+        return lane
+    
+    lane = asyncio.run(scenario())
+    assert lane.in_use == 0
+    assert lane.queued == 0
+
+
+def test_client_rate_limit_is_per_client(clock):
+    controller = AdmissionController(True, client_rate=1.0, client_burst=2.0, lanes=[])
+    controller.check_rate("ip:10.0.0.1")
+    controller.check_rate("ip:10.0.0.1")
+    with pytest.raises(Overloaded) as refused:
+        controller.check_rate("ip:10.0.0.1")
+    assert refused.value.reason == "rate_limited"
+    assert refused.value.retry_after == pytest.approx(1.0)
+    
+    controller.check_rate("ip:10.0.0.2")
+    clock.advance(1.0)
+    controller.check_rate("ip:10.0.0.1")
+    assert controller.rate_limited == 1
+
+
+def test_admit_releases_the_slot_when_the_call_fails():
+    async def scenario():
+        lane = FairLane("write", concurrency=1, max_queue=10, max_wait=1.0)
+        controller = AdmissionController(True, client_rate=0, client_burst=0, lanes=[lane])
+        with pytest.raises(ValueError):
+            async with controller.admit("a", "write"):
+                assert lane.in_use == 1
+                raise ValueError("tool failed")
+        async with controller.admit("b", "write"):
+            pass
+        return lane
+    
+    lane = asyncio.run(scenario())
+    assert lane.in_use == 0
+    assert lane.admitted == 2
+
+
+def test_disabled_controller_admits_everything():
+    async def scenario():
+        lane = FairLane("read", concurrency=1, max_queue=0, max_wait=0.0)
+        controller = AdmissionController(False, client_rate=1.0, client_burst=1.0, lanes=[lane])
+        async with controller.admit("a", "read"):
+            async with controller.admit("a", "read"):
+                pass
+        return lane
+    
+    assert asyncio.run(scenario()).admitted == 0
+
+
+def test_waiters_that_gave_up_do_not_inflate_the_expected_wait():
+    async def scenario():
+        lane = FairLane("read", concurrency=1, max_queue=100, max_wait=0.05)
+        lane.service_time = 0.04
+        await lane.acquire("a")
+        timed_out = await asyncio.gather(*(lane.acquire(f"c{n}") for n in range(5)), return_exceptions=True)
+        assert all(isinstance(error, Overloaded) for error in timed_out)
+        cancelled = asyncio.ensure_future(lane.acquire("d"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        
+        assert lane.stats()["clients_waiting"] == 0
+        assert lane.expected_wait("e") == pytest.approx(0.04)
+        waiter = asyncio.ensure_future(lane.acquire("e"))
+        await asyncio.sleep(0)
+        lane.release(0.04)
+        await waiter
+        return lane
+    
+    lane = asyncio.run(scenario())
+    assert lane.in_use == 1
+    assert lane.queued == 0
@@ -0,0 +1,138 @@
+"""Tests for request coalescing: SingleFlight and BatchLoader"""
+
+import asyncio
+
+import pytest
+
+from mcp_sse_server import BatchLoader, SingleFlight
+
+
+def test_single_flight_runs_concurrent_identical_calls_once():
+    calls = []
+    
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return f"value of {key}"
+    
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            flight.do("a", lambda: fetch("a")),
+            flight.do("a", lambda: fetch("a")),
+            flight.do("b", lambda: fetch("b"))
+        )
+        return flight, results
+    
+    flight, results = asyncio.run(scenario())
+    assert results == ["value of a", "value of a", "value of b"]
+    assert sorted(calls) == ["a", "b"]
+    assert flight.stats()["deduplicated"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_single_flight_shares_the_error_and_forgets_the_call():
+    attempts = 0
+    
+    async def fetch():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.01)
+        if attempts == 1:
+            raise ConnectionError("site down")
+        return "ok"
+    
+    async def scenario():
+        flight = SingleFlight()
+        first = await asyncio.gather(flight.do("k", fetch), flight.do("k", fetch), return_exceptions=True)
+        return first, await flight.do("k", fetch)
+    
+    first, retried = asyncio.run(scenario())
+    assert all(isinstance(result, ConnectionError) for result in first)
+    assert retried == "ok"
+    assert attempts == 2
+
+
+def test_single_flight_call_survives_one_cancelled_caller():
+    async def scenario():
+        flight = SingleFlight()
+        
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "ok"
+        
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        return await second
+    
+    assert asyncio.run(scenario()) == "ok"
+
+
+def recording_loader(batches, window=0.005, max_batch=100, fail=None):
+    async def batch_fn(group, keys):
+        batches.append((group, keys))
+        if fail is not None:
+            raise fail
+        return {key: f"{group}:{key}" for key in keys if key != 404}
+    return BatchLoader(batch_fn, window, max_batch)
+
+
+def test_keys_requested_together_share_one_batch_per_group():
+    batches = []
+    
+    async def scenario():
+        loader = recording_loader(batches)
+        return loader, await asyncio.gather(
+            loader.load("full", 1), loader.load("full", 2), loader.load("slug", 1), loader.load("full", 1)
+        )
+    
+    loader, results = asyncio.run(scenario())
+    assert results == ["full:1", "full:2", "slug:1", "full:1"]
+    assert sorted(batches) == [("full", [1, 2]), ("slug", [1])]
+    assert loader.stats()["deduplicated"] == 1
+
+
+def test_batches_are_split_at_max_batch():
+    batches = []
+    
+    async def scenario():
+        loader = recording_loader(batches, window=0.05, max_batch=3)
+        return await asyncio.gather(*(loader.load("full", key) for key in range(7)))
+    
+    results = asyncio.run(scenario())
+    assert results == [f"full:{key}" for key in range(7)]
+    assert [keys for _, keys in batches] == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_keys_left_out_by_the_batch_resolve_to_none():
+    async def scenario():
+        loader = recording_loader([])
+        return await asyncio.gather(loader.load("full", 1), loader.load("full", 404))
+    
+    assert asyncio.run(scenario()) == ["full:1", None]
+
+
+def test_batch_error_is_raised_to_every_caller():
+    batches = []
+    
+    async def scenario():
+        loader = recording_loader(batches, fail=ValueError("HTTP 500"))
+        return await asyncio.gather(loader.load("full", 1), loader.load("full", 2), return_exceptions=True)
+    
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert len(batches) == 1
+
+
+def test_close_cancels_pending_loads():
+    async def scenario():
+        loader = recording_loader([], window=10.0)
+        pending = asyncio.ensure_future(loader.load("full", 1))
+        await asyncio.sleep(0)
+        loader.close()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+    
+    asyncio.run(scenario())
@@ -0,0 +1,101 @@
+"""Tests for the bulk tools: /batch/v1 chunks, the parallel fallback and per-item results"""
+
+import asyncio
+
+import pytest
+
+
+def new_posts(count, start=1):
+    return [{"title": f"Bulk {n}", "content": f"<p>Bulk {n}</p>"} for n in range(start, start + count)]
+
+
+def test_creates_are_sent_in_chunks_of_max_items(wordpress, make_client):
+    wordpress.batch_max_items = 2
+    
+    async def scenario():
+        return await make_client().create_posts(new_posts(5))
+    
+    summary = asyncio.run(scenario())
+    assert summary["success"] and summary["succeeded"] == 5
+    assert [len(batch) for batch in wordpress.batches] == [2, 2, 1]
+    assert [result["post_id"] for result in summary["results"]] == [21, 22, 23, 24, 25]
+    assert wordpress.paths("POST") == ["/wp-json/batch/v1"] * 3
+    assert summary["message"] == "5 of 5 posts created successfully"
+
+
+@pytest.mark.parametrize("batch_max_items", [None, 3])
+def test_invalid_items_keep_their_place(wordpress, make_client, batch_max_items):
+    wordpress.batch_max_items = batch_max_items
+    posts = new_posts(3)
+    posts.insert(0, {"title": "No content"})
+    posts.insert(2, "not a post")
+    
+    async def scenario():
+        return await make_client().create_posts(posts)
+    
+    summary = asyncio.run(scenario())
+    assert [result["success"] for result in summary["results"]] == [False, True, False, True, True]
+    assert summary["results"][0]["message"] == "Each post requires title and content"
+    assert [wordpress.posts[result["post_id"]]["title"]["raw"] for result in summary["results"] if result["success"]] == ["Bulk 1", "Bulk 2", "Bulk 3"]
+    assert (summary["succeeded"], summary["failed"], summary["success"]) == (3, 2, False)
+
+
+def test_without_batching_each_item_is_its_own_request(wordpress, make_client):
+    async def scenario():
+        return await make_client().delete_posts([1, 2, 3])
+    
+    summary = asyncio.run(scenario())
+    assert summary["succeeded"] == 3
+    assert wordpress.batches == []
+    assert wordpress.paths("OPTIONS") == ["/wp-json/batch/v1"]
+    assert sorted(wordpress.paths("DELETE")) == [f"/wp-json/wp/v2/posts/{n}" for n in (1, 2, 3)]
+
+
+def test_failed_items_do_not_fail_the_batch(wordpress, make_client):
+    wordpress.batch_max_items = 10
+    
+    async def scenario():
+        return await make_client().delete_posts([1, 999, 2])
+    
+    summary = asyncio.run(scenario())
+    first, missing, second = summary["results"]
+    assert first["success"] and second["success"]
+    assert not missing["success"] and missing["post_id"] == 999
+    assert missing["message"].startswith("HTTP error deleting post: 404")
+    assert len(wordpress.batches) == 1
+    assert (wordpress.posts[1]["status"], wordpress.posts[2]["status"]) == ("trash", "trash")
+
+
+def test_falls_back_when_batching_goes_away(wordpress, make_client):
+    wordpress.batch_max_items = 2
+    
+    async def scenario():
+        wp = make_client()
+        first = await wp.create_posts(new_posts(2))
+        wordpress.batch_max_items = None  # plugin disabled between calls
+        second = await wp.create_posts(new_posts(3, start=3))
+        third = await wp.create_posts(new_posts(1, start=6))
+        return wp, first, second, third
+    
+    wp, first, second, third = asyncio.run(scenario())
+    assert first["succeeded"] == 2 and second["succeeded"] == 3 and third["succeeded"] == 1
+    assert wp._batch_max_items == 0
+    # One refused batch, then single requests; the limit isn't probed again
+    assert wordpress.paths("POST").count("/wp-json/batch/v1") == 2
+    assert wordpress.paths("POST").count("/wp-json/wp/v2/posts") == 4
+    assert wordpress.paths("OPTIONS") == ["/wp-json/batch/v1"]
+
+
+def test_bulk_writes_invalidate_cached_listings(wordpress, make_client):
+    wordpress.batch_max_items = 5
+    
+    async def scenario():
+        wp = make_client()
+        before = await wp.get_posts(per_page=5)
+        await wp.delete_posts([1])
+        after = await wp.get_posts(per_page=5)
+        return before, after
+    
+    before, after = asyncio.run(scenario())
+    assert [post["id"] for post in before["posts"]][0] == 1
+    assert 1 not in [post["id"] for post in after["posts"]]
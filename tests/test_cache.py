@@ -0,0 +1,114 @@
+"""Tests for the listing cache: TTLCache, write invalidation and ETag revalidation"""
+
+import asyncio
+
+from mcp_sse_server import TTLCache
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = TTLCache(max_entries=4, ttl=30.0)
+    cache.set("a", 1, metadata=('"v1"', None))
+    assert cache.get("a") == 1
+    
+    clock.advance(30.0)
+    assert cache.get("a") is None
+    assert cache.peek("a") == (1, ('"v1"', None))  # kept for revalidation
+    assert cache.refresh("a")
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1 and cache.stats()["revalidations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2, ttl=30.0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.peek("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = TTLCache(max_entries=2, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_with_a_predicate():
+    cache = TTLCache(max_entries=4, ttl=30.0)
+    for key in "abc":
+        cache.set(key, key.upper())
+    assert cache.invalidate(lambda key, value: value != "B") == 2
+    assert cache.stats()["entries"] == 1
+    assert cache.invalidate() == 1
+
+
+def listing_requests(wordpress):
+    return [request for request in wordpress.requests if request.method == "GET" and request.url.path == "/wp-json/wp/v2/posts"]
+
+
+def wordpress_etag(request, wordpress):
+    """ETag WordPress answered request with"""
+    return wordpress.route("GET", request.url.path, request.url.params, None).headers["ETag"]
+
+
+def test_listing_is_served_from_cache_until_it_expires(wordpress, make_client, clock):
+    async def scenario():
+        wp = make_client()
+        first = await wp.get_posts(per_page=5)
+        cached = await wp.get_posts(per_page=5)
+        clock.advance(31.0)
+        revalidated = await wp.get_posts(per_page=5)
+        return wp, first, cached, revalidated
+    
+    wp, first, cached, revalidated = asyncio.run(scenario())
+    assert first == cached == revalidated
+    requests = listing_requests(wordpress)
+    assert len(requests) == 2
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-None-Match"] == wordpress_etag(requests[0], wordpress)
+    assert wp.posts_cache.stats()["revalidations"] == 1
+
+
+def test_changed_listing_is_downloaded_again(wordpress, make_client, clock):
+    async def scenario():
+        wp = make_client()
+        await wp.get_posts(per_page=5)
+        wordpress._write(2, {"title": "Edited elsewhere"})
+        clock.advance(31.0)
+        return await wp.get_posts(per_page=5)
+    
+    result = asyncio.run(scenario())
+    assert result["posts"][1]["title"] == "Edited elsewhere"
+    assert len(listing_requests(wordpress)) == 2
+
+
+def test_writes_drop_only_the_listings_containing_the_post(wordpress, make_client):
+    async def scenario():
+        wp = make_client()
+        await wp.get_posts(per_page=5, page=1)
+        await wp.get_posts(per_page=5, page=2)
+        await wp.update_post(7, title="Changed")
+        wordpress.requests.clear()
+        first = await wp.get_posts(per_page=5, page=1)
+        second = await wp.get_posts(per_page=5, page=2)
+        return first, second
+    
+    first, second = asyncio.run(scenario())
+    assert [request.url.params["page"] for request in listing_requests(wordpress)] == ["2"]
+    assert second["posts"][1]["title"] == "Changed"
+    assert first["count"] == 5
+
+
+def test_creating_a_post_drops_every_listing(wordpress, make_client):
+    async def scenario():
+        wp = make_client()
+        await wp.get_posts(per_page=5, page=1)
+        await wp.create_post("Fresh", "<p>Fresh</p>")
+        return await wp.get_posts(per_page=5, page=1), wp
+    
+    _, wp = asyncio.run(scenario())
+    assert len(listing_requests(wordpress)) == 2
+    assert wp.posts_cache.stats()["entries"] == 1
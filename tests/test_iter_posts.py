@@ -0,0 +1,99 @@
+"""Tests for the full-site post iterator: page prefetch, early stop and the buffered fallback"""
+
+import asyncio
+
+import httpx
+import pytest
+
+import mcp_sse_server
+from mcp_sse_server import ToolArgumentError, tools
+
+
+def run_checked(scenario):
+    """Run a scenario and return (result, unhandled loop errors, tasks left behind)"""
+    async def main():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context["message"]))
+        result = await scenario()
+        await asyncio.sleep(0.01)
+        left = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        return result, errors, left
+    return asyncio.run(main())
+
+
+def test_iterates_every_post_once_in_id_order(wordpress, make_client):
+    async def scenario():
+        wp = make_client()
+        return [post["id"] async for post in wp.iter_posts(per_page=3)]
+    
+    ids, errors, left = run_checked(scenario)
+    assert ids == list(range(1, 21))
+    assert wordpress.paths().count("/wp-json/wp/v2/posts") == 7
+    assert (errors, left) == ([], [])
+
+
+def test_pages_are_requested_ahead_of_the_consumer(wordpress, make_client):
+    def requested_pages():
+        return [int(request.url.params["page"]) for request in wordpress.requests]
+    
+    async def scenario():
+        wp = make_client()
+        pages = wp.iter_post_pages(per_page=2, prefetch=3)
+        await pages.__anext__()
+        await asyncio.sleep(0.01)
+        while_first = requested_pages()
+        await pages.__anext__()
+        await asyncio.sleep(0.01)
+        while_second = requested_pages()
+        await pages.aclose()
+        return while_first, while_second
+    
+    (while_first, while_second), errors, left = run_checked(scenario)
+    assert while_first == [1, 2, 3, 4]
+    assert while_second == [1, 2, 3, 4, 5]
+    assert (errors, left) == ([], [])
+
+def test_stopping_early_cancels_and_awaits_prefetched_pages(wordpress, make_client):
+    async def scenario():
+        wp = make_client()
+        pages = wp.iter_post_pages(per_page=2, prefetch=4)
+        first = await pages.__anext__()
+        await pages.aclose()
+        return first
+    
+    first, errors, left = run_checked(scenario)
+    assert [post["id"] for post in first["posts"]] == [1, 2]
+    assert first["total_pages"] == 10
+    assert (errors, left) == ([], [])
+
+
+def test_failing_page_stops_the_iteration_without_stray_tasks(wordpress, make_client):
+    wordpress.fail_pages = {3}
+    
+    async def scenario():
+        wp = make_client()
+        seen = []
+        with pytest.raises(httpx.HTTPStatusError):
+            async for page in wp.iter_post_pages(per_page=2, prefetch=4):
+                seen.append(page["page"])
+        return seen
+    
+    seen, errors, left = run_checked(scenario)
+    assert seen == [1, 2]
+    assert (errors, left) == ([], [])
+
+
+def test_buffered_result_is_capped(wordpress, make_client, monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "ITER_POSTS_MAX_BUFFERED", 5)
+    
+    async def scenario():
+        return await make_client().collect_posts(max_posts=10 ** 9)
+    
+    result = asyncio.run(scenario())
+    assert (result["count"], result["total"], result["truncated"]) == (5, 20, True)
+
+
+def test_max_posts_above_the_buffer_limit_is_rejected():
+    with pytest.raises(ToolArgumentError, match="max_posts must be <= "):
+        tools.validate("iter_posts", {"max_posts": 10 ** 9})
+    tools.validate("iter_posts", {"max_posts": mcp_sse_server.ITER_POSTS_MAX_BUFFERED})
@@ -0,0 +1,171 @@
+"""Tests for background jobs: JobJournal and JobManager submit, status, cancel and recovery"""
+
+import asyncio
+import json
+
+import pytest
+
+import mcp_sse_server
+from mcp_sse_server import JobJournal, JobManager, RegisteredTool, SessionManager, current_session, run_tool, tools
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = JobManager(workers=1, max_queued=2)
+    monkeypatch.setattr(mcp_sse_server, "jobs", manager)
+    return manager
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+async def call(name, **arguments):
+    """Result of a tool call, decoded"""
+    content = await run_tool(tools.get(name), arguments, "default")
+    return json.loads(content[0].text)
+
+
+async def finished(manager, job_id):
+    """Wait for a job to reach a final state and return its journal row"""
+    for _ in range(200):
+        row = await manager.journal.get(job_id)
+        if row["status"] in JobManager.FINISHED:
+            return row
+        await asyncio.sleep(0.005)
+    raise AssertionError(f"job {job_id} didn't finish")
+
+
+def blocking_tool(started, release):
+    async def handler(wp, arguments):
+        started.set()
+        await release.wait()
+        return {"success": True, "message": "done"}
+    return RegisteredTool("blocking", "Waits to be released", {"type": "object"}, handler, background=True)
+
+
+def test_background_call_runs_and_reports_progress(wordpress, serve_site, manager, monkeypatch, journal_path):
+    monkeypatch.setattr(mcp_sse_server, "sessions", SessionManager(max_sessions=1, queue_size=20))
+    wordpress.batch_max_items = 2
+    
+    async def scenario():
+        serve_site()
+        await manager.start(JobJournal(journal_path))
+        session = mcp_sse_server.sessions.create()
+        current_session.set(session)
+        try:
+            submitted = await call("delete_posts", post_ids=[1, 2, 3], **{"async": True})
+            await finished(manager, submitted["job_id"])
+            status = await call("job_status", job_id=submitted["job_id"])
+            await asyncio.sleep(0.01)  # the final notification is sent from a task
+            frames = []
+            while not session.queue.empty():
+                frames.append(session.queue.get_nowait())
+        finally:
+            await manager.stop()
+        return submitted, status, frames
+    
+    submitted, status, frames = asyncio.run(scenario())
+    assert submitted["success"] and submitted["status"] == "queued"
+    assert "streamed over the SSE session" in submitted["message"]
+    assert (status["status"], status["progress"], status["total"]) == ("completed", 3, 3)
+    assert status["result"]["succeeded"] == 3
+    messages = [json.loads(frame.decode("utf-8").split("data: ", 1)[1]) for frame in frames]
+    assert [message["params"]["progress"] for message in messages[:-1]] == [2, 3]
+    assert messages[-1]["method"] == "notifications/message"
+    assert messages[-1]["params"]["data"]["status"] == "completed"
+
+
+def test_running_and_queued_jobs_can_be_cancelled(serve_site, manager, journal_path):
+    async def scenario():
+        serve_site()
+        await manager.start(JobJournal(journal_path))
+        started, release = asyncio.Event(), asyncio.Event()
+        tool = blocking_tool(started, release)
+        try:
+            running = await manager.submit(tool, {})
+            waiting = await manager.submit(tool, {})
+            await started.wait()
+            cancelled_queued = await manager.cancel(waiting.id)
+            cancelled_running = await manager.cancel(running.id)
+            rows = [await finished(manager, job.id) for job in (running, waiting)]
+            unknown = await manager.cancel("missing")
+            stats = manager.stats()
+        finally:
+            await manager.stop()
+        return cancelled_queued, cancelled_running, rows, unknown, stats
+    
+    cancelled_queued, cancelled_running, rows, unknown, stats = asyncio.run(scenario())
+    assert (cancelled_queued, cancelled_running) == ("cancelled", "cancelling")
+    assert [row["status"] for row in rows] == ["cancelled", "cancelled"]
+    assert rows[1]["error"] == "Cancelled before it started"
+    assert unknown is None
+    assert stats["cancelled"] == 2 and stats["running"] == 0
+
+
+def test_full_queue_rejects_new_jobs(serve_site, manager, journal_path):
+    manager.workers = 0  # nothing takes jobs off the queue
+    
+    async def scenario():
+        serve_site()
+        await manager.start(JobJournal(journal_path))
+        try:
+            results = [await call("delete_posts", post_ids=[n], **{"async": True}) for n in (1, 2, 3)]
+        finally:
+            await manager.stop()
+        return results
+    
+    results = asyncio.run(scenario())
+    assert [result["success"] for result in results] == [True, True, False]
+    assert results[2]["message"].startswith("Too many background jobs queued")
+    assert manager.rejected == 1
+
+
+def test_jobs_of_a_dead_process_are_resumed_or_interrupted(wordpress, serve_site, manager, journal_path):
+    async def scenario():
+        serve_site()
+        journal = JobJournal(journal_path)
+        for job_id, name, arguments in (
+            ("resumable", "delete_posts", {"post_ids": [4]}),
+            ("unsafe", "create_posts", {"posts": [{"title": "Twice?", "content": "No"}]})
+        ):
+            job = mcp_sse_server.Job(job_id, tools.get(name), arguments, "4000000", None, manager)
+            await journal.insert(job)
+            await journal.update(job_id, status="running")
+        await manager.start(journal)
+        try:
+            return [await finished(manager, job_id) for job_id in ("resumable", "unsafe")]
+        finally:
+            await manager.stop()
+    
+    resumed, interrupted = asyncio.run(scenario())
+    assert resumed["status"] == "completed"
+    assert wordpress.posts[4]["status"] == "trash"
+    assert interrupted["status"] == "interrupted"
+    assert "not safe to repeat" in interrupted["error"]
+    assert len(wordpress.posts) == 20
+    assert manager.recovered == 1
+
+
+def test_journal_prunes_only_old_finished_jobs(journal_path, clock, manager):
+    async def scenario():
+        journal = JobJournal(journal_path)
+        try:
+            for job_id, status in (("old", "completed"), ("queued", "queued")):
+                await journal.insert(mcp_sse_server.Job(job_id, tools.get("delete_posts"), {}, "1", None, manager))
+                await journal.update(job_id, status=status)
+            clock.advance(7200.0)
+            await journal.insert(mcp_sse_server.Job("new", tools.get("delete_posts"), {}, "1", None, manager))
+            await journal.update("new", status="failed")
+            pruned = await journal.prune(3600.0)
+            remaining = [await journal.get(job_id) for job_id in ("old", "queued", "new")]
+            claimed = (await journal.claim("queued", "1", "2"), await journal.claim("queued", "1", "3"))
+        finally:
+            await journal.close()
+        return pruned, remaining, claimed
+    
+    pruned, (old, queued, new), claimed = asyncio.run(scenario())
+    assert pruned == 1
+    assert old is None and queued["status"] == "queued" and new["status"] == "failed"
+    assert claimed == (True, False)
@@ -0,0 +1,149 @@
+"""Tests for structured logging: truncation, event sampling and the non-blocking queue handler"""
+
+import json
+import logging
+import sys
+
+import pytest
+
+import mcp_sse_server
+from mcp_sse_server import (
+    JSONLogFormatter, LogQueueHandler, TextLogFormatter, event_sample_rate, log_event, parse_sample_rates, truncate
+)
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+    
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def records():
+    handler = Records()
+    mcp_sse_server.logger.addHandler(handler)
+    yield handler.records
+    mcp_sse_server.logger.removeHandler(handler)
+
+
+@pytest.fixture
+def sampling(monkeypatch):
+    """Install LOG_SAMPLE_RATES for a test"""
+    def configure(spec):
+        monkeypatch.setattr(mcp_sse_server, "log_sample_rates", parse_sample_rates(spec))
+        monkeypatch.setattr(mcp_sse_server, "_event_rates", {})
+        monkeypatch.setattr(mcp_sse_server, "log_sampled_out", {})
+    return configure
+
+
+def test_large_values_are_shortened(monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "LOG_MAX_ITEMS", 3)
+    value = {
+        "content": "x" * 30,
+        "image": b"\x89PNG" * 10,
+        "ids": list(range(5)),
+        "nested": {"title": "short", 7: ("a" * 12,)},
+        "flags": (True, None, 1.5),
+        "other": ValueError("y" * 20)
+    }
+    assert truncate(value, 10) == {
+        "content": "xxxxxxxxxx...(+20 chars)",
+        "image": "<40 bytes>",
+        "ids": [0, 1, 2, "...(+2 items)"],
+        "nested": {"title": "short", "7": ["aaaaaaaaaa...(+2 chars)"]},
+        "flags": [True, None, 1.5],
+        "other": "yyyyyyyyyy...(+10 chars)"
+    }
+
+
+def test_sample_rates_are_validated():
+    assert parse_sample_rates(" tool.call=0.1, mcp.request = 0 ,") == {"tool.call": 0.1, "mcp.request": 0.0}
+    with pytest.raises(ValueError, match="must be event=share"):
+        parse_sample_rates("tool.call")
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        parse_sample_rates("tool.call=2")
+
+
+def test_rates_fall_back_to_the_parent_event(sampling):
+    sampling("tool=0.5,tool.call.get_posts=0.01")
+    assert event_sample_rate("tool.call.get_posts") == 0.01
+    assert event_sample_rate("tool.call.create_post") == 0.5
+    assert event_sample_rate("mcp.request") == 1.0
+
+
+def test_sampled_events_are_counted_and_tagged(sampling, records, monkeypatch):
+    sampling("tool.call=0.25")
+    draws = iter([0.9, 0.1, 0.5])
+    monkeypatch.setattr(mcp_sse_server.random, "random", lambda: next(draws))
+    for _ in range(3):
+        log_event(logging.INFO, "tool.call.get_posts", "Tool called: get_posts", tool="get_posts")
+    log_event(logging.INFO, "mcp.request", "MCP request: tools/list", method="tools/list")
+    
+    assert [record.event for record in records] == ["tool.call.get_posts", "mcp.request"]
+    assert records[0].fields == {"tool": "get_posts", "sample_rate": 0.25}
+    assert records[1].fields == {"method": "tools/list"}
+    assert mcp_sse_server.log_sampled_out == {"tool.call.get_posts": 2}
+
+
+def test_event_fields_are_truncated_when_logged(records, monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "LOG_MAX_FIELD_CHARS", 8)
+    log_event(logging.INFO, "tool.call.create_post", "Tool called", arguments={"content": "<p>" + "a" * 100 + "</p>"})
+    assert records[0].fields["arguments"]["content"] == "<p>aaaaa...(+99 chars)"
+
+
+def test_debug_events_cost_nothing_when_disabled(records, sampling, monkeypatch):
+    sampling("")
+    monkeypatch.setattr(mcp_sse_server, "truncate", lambda value: pytest.fail("truncated a disabled record"))
+    log_event(logging.DEBUG, "upstream.response", "Response", body="x" * 1000)
+    assert records == []
+    assert mcp_sse_server._event_rates == {}
+
+
+def make_record(message, *args, **extra):
+    record = logging.LogRecord("mcp_sse_server", logging.WARNING, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_queue_handler_freezes_records_and_drops_when_full():
+    handler = LogQueueHandler(size=1)
+    handler.context = lambda record: setattr(record, "trace_id", "abc")
+    mutable = ["before"]
+    
+    handler.handle(make_record("value %s", mutable))
+    mutable[0] = "after"
+    handler.handle(make_record("second"))
+    
+    record = handler.queue.get_nowait()
+    assert (record.msg, record.args, record.trace_id) == ("value ['before']", None, "abc")
+    assert handler.stats()["dropped"] == 1
+
+
+def test_queue_handler_formats_exceptions_up_front():
+    handler = LogQueueHandler(size=1)
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = make_record("failed")
+        record.exc_info = sys.exc_info()
+    handler.handle(record)
+    record = handler.queue.get_nowait()
+    assert record.exc_info is None
+    assert "RuntimeError: boom" in record.exc_text
+
+
+def test_formatters_include_event_fields_and_trace(monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "LOG_MAX_MESSAGE_CHARS", 12)
+    record = make_record("Tool called: get_posts", event="tool.call.get_posts", fields={"tool": "get_posts", "level": "x"}, trace_id="t1")
+    record.message = record.getMessage()
+    
+    entry = json.loads(JSONLogFormatter().format(record))
+    assert entry["message"] == "Tool called:...(+10 chars)"
+    assert (entry["event"], entry["tool"], entry["trace_id"]) == ("tool.call.get_posts", "get_posts", "t1")
+    assert entry["level"] == "WARNING"  # fields never replace the built-in keys
+    
+    line = TextLogFormatter().format(record)
+    assert line.endswith(' - WARNING - Tool called:...(+10 chars) tool="get_posts" level="x" trace_id=t1')
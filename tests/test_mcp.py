@@ -0,0 +1,118 @@
+"""Tests for the /mcp JSON-RPC endpoint: single requests, batches and the static tool list"""
+
+import asyncio
+import json
+
+import httpx
+
+import mcp_sse_server
+
+
+def call_app(method, path, **kwargs):
+    """Send one request to the app in process (no lifespan, no WordPress)"""
+    async def send():
+        transport = httpx.ASGITransport(app=mcp_sse_server.app, client=("10.0.0.1", 40000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://mcp.test") as client:
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(send())
+
+
+def test_static_methods_always_answer_post_with_the_request_id():
+    etag = call_app("GET", "/tools").headers["ETag"]
+    response = call_app(
+        "POST", "/mcp",
+        json={"jsonrpc": "2.0", "method": "tools/list", "id": 7},
+        headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    body = response.json()
+    assert body["id"] == 7
+    assert "get_posts" in [tool["name"] for tool in body["result"]["tools"]]
+
+
+def test_tool_list_endpoint_supports_conditional_requests():
+    first = call_app("GET", "/tools")
+    assert first.status_code == 200
+    assert first.json() == mcp_sse_server.tools.result("tools/list")[0]
+    
+    cached = call_app("GET", "/tools", headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert call_app("GET", "/tools", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def call_tool(request_id, name, **arguments):
+    return {"jsonrpc": "2.0", "method": "tools/call", "params": {"name": name, "arguments": arguments}, "id": request_id}
+
+
+def tool_result(response):
+    return json.loads(response["result"]["content"][0]["text"])
+
+
+def test_batch_answers_each_message_in_order(wordpress, serve_site, app_client):
+    async def scenario():
+        serve_site()
+        async with app_client() as client:
+            return await client.post("/mcp", json=[
+                call_tool(1, "get_post", post_id=3),
+                {"jsonrpc": "2.0", "method": "tools/list", "id": "list"},
+                call_tool(2, "get_post", post_id=999),
+                {"jsonrpc": "2.0", "method": "notifications/initialized"},
+                call_tool(3, "get_post", post_id="3"),
+                "not a request",
+                {"jsonrpc": "2.0", "method": "resources/list", "id": 4},
+                call_tool(5, "get_post", post_id=5),
+            ])
+    
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    found, listed, missing, invalid, not_request, unknown, other = response.json()
+    assert [found["id"], listed["id"], missing["id"], invalid["id"], not_request["id"], unknown["id"], other["id"]] == [1, "list", 2, 3, None, 4, 5]
+    assert tool_result(found)["post"]["title"] == "Post 3"
+    assert tool_result(other)["post"]["title"] == "Post 5"
+    assert "tools" in listed["result"]
+    assert tool_result(missing) == {"success": False, "post": None, "message": "Post ID 999 not found"}
+    assert invalid["error"]["code"] == -32602
+    assert not_request["error"] == {"code": -32600, "message": "Invalid Request"}
+    assert unknown["error"]["code"] == -32601
+    # The get_post calls ran together and were loaded in one upstream request
+    assert wordpress.paths() == ["/wp-json/wp/v2/posts"]
+
+
+def test_batch_of_notifications_has_no_content():
+    response = call_app("POST", "/mcp", json=[
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": 1}}
+    ])
+    assert response.status_code == 204
+    assert response.content == b""
+
+
+def test_batch_size_is_checked(monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "MCP_BATCH_MAX_SIZE", 3)
+    empty = call_app("POST", "/mcp", json=[])
+    assert empty.status_code == 400
+    assert empty.json()["error"]["message"] == "Invalid Request: empty batch"
+    
+    oversized = call_app("POST", "/mcp", json=[{"jsonrpc": "2.0", "method": "tools/list", "id": n} for n in range(4)])
+    assert oversized.status_code == 400
+    assert oversized.json()["error"]["message"] == "Invalid Request: batch exceeds 3 messages"
+
+
+def test_batch_concurrency_is_bounded(monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "MCP_BATCH_CONCURRENCY", 2)
+    running, peak = 0, 0
+    
+    async def handle(message):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"jsonrpc": "2.0", "result": {}, "id": message["id"]}
+    
+    monkeypatch.setattr(mcp_sse_server, "handle_jsonrpc", handle)
+    responses = asyncio.run(mcp_sse_server.handle_jsonrpc_batch([{"id": n} for n in range(6)]))
+    assert [response["id"] for response in responses] == list(range(6))
+    assert peak == 2
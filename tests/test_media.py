@@ -0,0 +1,136 @@
+"""Tests for upload_media: streaming uploads, hash dedupe and URL source checks"""
+
+import asyncio
+import socket
+
+import httpx
+import pytest
+
+import mcp_sse_server
+from mcp_sse_server import MediaIndex, is_public_address, media_host_allowed, pin_media_url
+
+
+@pytest.fixture
+def media_root(tmp_path, monkeypatch):
+    root = tmp_path / "uploads"
+    root.mkdir()
+    monkeypatch.setattr(mcp_sse_server, "MEDIA_LOCAL_ROOT", str(root))
+    monkeypatch.setattr(mcp_sse_server, "MEDIA_DEDUPE_MIN_BYTES", 16)
+    monkeypatch.setattr(mcp_sse_server, "MEDIA_CHUNK_SIZE", 1024)
+    return root
+
+
+def test_same_file_is_uploaded_once(wordpress, make_client, media_root, tmp_path):
+    payload = bytes(range(256)) * 20
+    (media_root / "photo.jpg").write_bytes(payload)
+    (media_root / "copy.jpg").write_bytes(payload)
+    
+    async def scenario():
+        wp = make_client()
+        wp.media_index = MediaIndex(str(tmp_path / "media.sqlite3"))
+        try:
+            first = await wp.upload_media([{"source": "photo.jpg", "alt_text": "A photo"}])
+            second = await wp.upload_media([{"source": "copy.jpg"}])
+            wordpress.media.clear()  # deleted from the library
+            third = await wp.upload_media([{"source": "photo.jpg"}])
+        finally:
+            await wp.media_index.close()
+        return [summary["results"][0] for summary in (first, second, third)]
+    
+    first, second, third = asyncio.run(scenario())
+    assert (first["deduplicated"], second["deduplicated"], third["deduplicated"]) == (False, True, False)
+    assert second["media_id"] == first["media_id"]
+    assert first["mime_type"] == "image/jpeg"
+    assert wordpress.media[third["media_id"]] == payload
+    uploads = [request for request in wordpress.requests if request.method == "POST"]
+    assert len(uploads) == 2
+    assert uploads[0].url.params["alt_text"] == "A photo"
+    assert uploads[0].headers["Content-Disposition"] == 'attachment; filename="photo.jpg"'
+
+
+def test_local_sources_must_stay_inside_the_root(wordpress, make_client, media_root):
+    async def scenario():
+        return await make_client().upload_media([{"source": "../outside.txt"}, {"source": "missing.txt"}])
+    
+    summary = asyncio.run(scenario())
+    assert summary["failed"] == 2
+    assert all("File not found in MEDIA_LOCAL_ROOT" in result["message"] for result in summary["results"])
+    assert wordpress.requests == []
+
+
+@pytest.mark.parametrize("address, public", [
+    ("93.184.216.34", True),
+    ("2606:2800:220:1::1", True),
+    ("10.0.0.5", False),
+    ("127.0.0.1", False),
+    ("169.254.169.254", False),
+    ("::ffff:127.0.0.1", False),
+    ("::1", False),
+    ("0.0.0.0", False),
+    ("224.0.0.1", False),
+])
+def test_only_globally_routable_addresses_are_public(address, public):
+    assert is_public_address(address) is public
+
+
+def test_host_allowlist(monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "MEDIA_URL_HOSTS", "cdn.example.com, *.images.test")
+    assert media_host_allowed("CDN.example.com")
+    assert media_host_allowed("a.b.images.test")
+    assert not media_host_allowed("images.test.evil.com")
+    assert not media_host_allowed("example.com")
+
+
+def resolving_to(monkeypatch, *addresses):
+    async def getaddrinfo(self, host, port, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port)) for address in addresses]
+    monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", getaddrinfo)
+
+
+def test_url_is_pinned_to_the_resolved_public_address(monkeypatch):
+    resolving_to(monkeypatch, "93.184.216.34")
+    url, headers, extensions = asyncio.run(pin_media_url(httpx.URL("https://cdn.example.com:8443/a.png")))
+    assert str(url) == "https://93.184.216.34:8443/a.png"
+    assert headers == {"Host": "cdn.example.com:8443"}
+    assert extensions == {"sni_hostname": "cdn.example.com"}
+
+
+@pytest.mark.parametrize("url, addresses, error", [
+    ("ftp://cdn.example.com/a.png", ["93.184.216.34"], r"Only http\(s\) URLs"),
+    ("http://internal.example.com/a.png", ["10.0.0.5"], "doesn't resolve to a public address"),
+    ("http://mixed.example.com/a.png", ["93.184.216.34", "127.0.0.1"], "doesn't resolve to a public address"),
+    ("http://169.254.169.254/latest/meta-data", [], "doesn't resolve to a public address"),
+])
+def test_url_sources_with_internal_addresses_are_refused(monkeypatch, url, addresses, error):
+    resolving_to(monkeypatch, *addresses)
+    with pytest.raises(ValueError, match=error):
+        asyncio.run(pin_media_url(httpx.URL(url)))
+
+
+def test_redirects_are_checked_on_every_hop(wordpress, make_client, monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "MEDIA_ALLOW_URLS", True)
+    fetched = []
+    
+    def source(request):
+        fetched.append((str(request.url), request.headers["Host"]))
+        if request.url.path == "/image.png":
+            return httpx.Response(200, content=b"PNG" * 10, headers={"Content-Type": "image/png"})
+        if request.url.path == "/moved":
+            return httpx.Response(302, headers={"Location": "/image.png"})
+        return httpx.Response(302, headers={"Location": "http://127.0.0.1/admin"})
+    
+    async def scenario():
+        wp = make_client()
+        wp._source_client = httpx.AsyncClient(transport=httpx.MockTransport(source), follow_redirects=False)
+        return await wp.upload_media([
+            {"source": "http://93.184.216.34/moved"},
+            {"source": "http://93.184.216.34/escape"}
+        ])
+    
+    summary = asyncio.run(scenario())
+    moved, escape = summary["results"]
+    assert moved["success"] and moved["bytes"] == 30 and moved["mime_type"] == "image/png"
+    assert not escape["success"]
+    assert "127.0.0.1 doesn't resolve to a public address" in escape["message"]
+    assert all(host == "93.184.216.34" for _, host in fetched)
+    assert "http://127.0.0.1/admin" not in [url for url, _ in fetched]
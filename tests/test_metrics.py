@@ -0,0 +1,78 @@
+"""Tests for the Prometheus metrics registry and the request latency histograms"""
+
+import asyncio
+
+import httpx
+import pytest
+
+import mcp_sse_server
+from mcp_sse_server import Metrics
+
+
+def test_render_writes_cumulative_histogram_buckets():
+    registry = Metrics()
+    requests = registry.counter("demo_requests_total", "Requests", ("method",))
+    latency = registry.histogram("demo_seconds", "Latency", ("method",), buckets=(0.1, 1.0))
+    requests.inc("tools/list")
+    requests.inc("tools/list")
+    latency.observe(0.05, "tools/list")
+    latency.observe(0.5, "tools/list")
+    latency.observe(5.0, "tools/list")
+    
+    text = registry.render(Metrics.merge([registry.snapshot()]))
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{method="tools/list"} 2' in text
+    assert 'demo_seconds_bucket{method="tools/list",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{method="tools/list",le="1"} 2' in text
+    assert 'demo_seconds_bucket{method="tools/list",le="+Inf"} 3' in text
+    assert 'demo_seconds_sum{method="tools/list"} 5.55' in text
+    assert 'demo_seconds_count{method="tools/list"} 3' in text
+
+
+def test_worker_snapshots_are_summed():
+    first = {"demo_total": [[["a"], 2.0]], "demo_seconds": [[["a"], [1, 0, 0.1]]]}
+    second = {"demo_total": [[["a"], 3.0], [["b"], 1.0]], "demo_seconds": [[["a"], [0, 1, 2.0]]]}
+    merged = Metrics.merge([first, second])
+    assert merged["demo_total"] == {("a",): 5.0, ("b",): 1.0}
+    assert merged["demo_seconds"] == {("a",): [1, 1, 2.1]}
+
+
+def test_label_values_are_escaped():
+    registry = Metrics()
+    registry.counter("demo_total", "Demo", ("tool",)).inc('say "hi"\n')
+    assert 'demo_total{tool="say \\"hi\\"\\n"} 1' in registry.render(Metrics.merge([registry.snapshot()]))
+
+
+def test_static_method_latency_covers_the_whole_request(clock, monkeypatch):
+    result = mcp_sse_server.tools.result
+    
+    def slow_result(method):
+        clock.advance(0.2)
+        return result(method)
+    
+    monkeypatch.setattr(mcp_sse_server.tools, "result", slow_result)
+    histogram = mcp_sse_server.jsonrpc_duration
+    before = list(histogram.samples.get(("initialize",), [0] * (len(histogram.buckets) + 2)))
+    
+    async def send():
+        transport = httpx.ASGITransport(app=mcp_sse_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://mcp.test") as client:
+            return await client.post("/mcp", json={"jsonrpc": "2.0", "method": "initialize", "id": 1})
+    
+    assert asyncio.run(send()).status_code == 200
+    after = histogram.samples[("initialize",)]
+    assert after[-1] - before[-1] == pytest.approx(0.2)
+    assert after[histogram.buckets.index(0.25)] == before[histogram.buckets.index(0.25)] + 1
+
+
+def test_metrics_endpoint_serves_the_text_format():
+    async def send():
+        transport = httpx.ASGITransport(app=mcp_sse_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://mcp.test") as client:
+            await client.post("/mcp", json={"jsonrpc": "2.0", "method": "tools/list", "id": 1})
+            return await client.get("/metrics")
+    
+    response = asyncio.run(send())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'wpmcp_jsonrpc_requests_total{method="tools/list",outcome="success"}' in response.text
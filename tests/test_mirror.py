@@ -0,0 +1,171 @@
+"""Tests for the local post mirror: incremental sync, reconcile, full-text search and our own writes"""
+
+import asyncio
+
+import pytest
+
+import mcp_sse_server
+from mcp_sse_server import PostMirror, tools
+
+
+@pytest.fixture
+def mirrored(make_client, tmp_path):
+    """Factory for a client with a mirror in tmp_path; call it inside the test's event loop"""
+    def make(**options):
+        wp = make_client(**options)
+        wp.mirror = PostMirror(str(tmp_path / "mirror.sqlite3"), wp)
+        return wp
+    return make
+
+
+def listing_params(wordpress):
+    return [dict(request.url.params) for request in wordpress.requests if request.url.path == "/wp-json/wp/v2/posts"]
+
+
+def test_first_sync_mirrors_every_post_and_search_ranks_them(wordpress, mirrored):
+    wordpress.add_post("Gardening basics", "<p>Tomatoes need <b>sun</b> and water</p>")
+    wordpress.add_post("Cooking", "<p>Sun-dried tomatoes in a gardening magazine</p>")
+    
+    async def scenario():
+        wp = mirrored()
+        try:
+            await wp.mirror.sync()
+            return (
+                await wp.mirror.search("gardening tomatoes"),
+                await wp.mirror.search("tomato*"),
+                await wp.mirror.search("content 7"),
+                await wp.mirror.search('"'),
+                (await wp.mirror.stats())["posts"]
+            )
+        finally:
+            await wp.mirror.close()
+    
+    ranked, prefixed, exact, empty, count = asyncio.run(scenario())
+    assert [post["id"] for post in ranked] == [21, 22]  # a title match ranks first
+    assert ranked[0]["snippet"] == "[Tomatoes] need sun and water"
+    assert {post["id"] for post in prefixed} == {21, 22}
+    assert [post["id"] for post in exact] == [7]
+    assert empty == []
+    assert count == 22
+
+
+def test_later_syncs_fetch_only_changed_posts(wordpress, mirrored):
+    async def scenario():
+        wp = mirrored()
+        try:
+            await wp.mirror.sync()
+            wordpress.requests.clear()
+            wordpress._write(5, {"title": "Renamed elsewhere"})
+            await wp.mirror.sync()
+            return await wp.mirror.get(5), await wp.mirror.search("renamed")
+        finally:
+            await wp.mirror.close()
+    
+    post, found = asyncio.run(scenario())
+    params = listing_params(wordpress)
+    assert len(params) == 1
+    assert params[0]["modified_after"] == "2025-02-01T00:00:19"  # newest mirrored change, less a second
+    assert post["title"] == "Renamed elsewhere"
+    assert [post["id"] for post in found] == [5]
+
+
+def test_reconcile_drops_posts_deleted_elsewhere(wordpress, mirrored, monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "MIRROR_RECONCILE_INTERVAL", 0)
+    
+    async def scenario():
+        wp = mirrored()
+        try:
+            await wp.mirror.sync()
+            wordpress.posts[3]["status"] = "trash"
+            del wordpress.posts[4]
+            await wp.mirror.sync()
+            return await wp.mirror.get(3), await wp.mirror.get(4), await wp.mirror.search("content 3")
+        finally:
+            await wp.mirror.close()
+    
+    assert asyncio.run(scenario()) == (None, None, [])
+    assert {"_fields": "id", "status": "any", "per_page": "100", "page": "1"} in listing_params(wordpress)
+
+
+def test_our_writes_are_applied_without_a_sync(wordpress, mirrored):
+    wordpress.batch_max_items = 10
+    
+    async def scenario():
+        wp = mirrored()
+        try:
+            await wp.mirror.sync()
+            wordpress.requests.clear()
+            await wp.update_post(2, title="Updated here")
+            created = await wp.create_posts([{"title": "Brand new", "content": "<p>Fresh words</p>"}])
+            await wp.delete_posts([6])
+            return (
+                await wp.mirror.get(2),
+                await wp.mirror.search("fresh"),
+                await wp.mirror.get(6),
+                created["results"][0]["post_id"]
+            )
+        finally:
+            await wp.mirror.close()
+    
+    updated, found, deleted, created_id = asyncio.run(scenario())
+    assert updated["title"] == "Updated here"
+    assert [post["id"] for post in found] == [created_id]
+    assert deleted is None
+    assert not any("modified_after" in params for params in listing_params(wordpress))  # no sync ran
+
+
+def test_recently_synced_mirror_answers_get_post(wordpress, mirrored, clock):
+    async def scenario():
+        wp = mirrored()
+        try:
+            await wp.mirror.sync()
+            wordpress.requests.clear()
+            fresh = await wp.get_post(8)
+            from_mirror = len(wordpress.requests)
+            clock.advance(mcp_sse_server.POST_CACHE_TTL + 1)
+            await wp.get_post(9)
+            return fresh, from_mirror, len(wordpress.requests)
+        finally:
+            await wp.mirror.close()
+    
+    fresh, from_mirror, after_ttl = asyncio.run(scenario())
+    assert fresh["post"]["title"] == "Post 8"
+    assert from_mirror == 0
+    assert after_ttl == 1
+
+
+def test_only_one_worker_holds_the_sync_lease(make_client, tmp_path):
+    async def scenario():
+        first, second = (PostMirror(str(tmp_path / "mirror.sqlite3"), make_client()) for _ in range(2))
+        second.node = "another-worker"
+        try:
+            return [
+                await first._thread.run(first._acquire_lease),
+                await second._thread.run(second._acquire_lease),
+                await first._thread.run(first._acquire_lease)
+            ]
+        finally:
+            await first.close()
+            await second.close()
+    
+    assert asyncio.run(scenario()) == [True, False, True]
+
+
+def test_search_tool_needs_the_mirror(mirrored, make_client):
+    handler = tools.get("search_posts").handler
+    
+    async def scenario():
+        wp = mirrored()
+        try:
+            await wp.mirror.sync()
+            found = await handler(wp, {"query": "content 12", "status": "publish"})
+            drafts = await handler(wp, {"query": "content 12", "status": "draft"})
+        finally:
+            await wp.mirror.close()
+        return found, drafts, await handler(make_client(), {"query": "content"})
+    
+    found, drafts, disabled = asyncio.run(scenario())
+    assert found["count"] == 1 and found["posts"][0]["id"] == 12
+    assert drafts["count"] == 0
+    assert not disabled["success"]
+    assert disabled["message"] == "Post mirror is disabled (set MIRROR_ENABLED)"
@@ -0,0 +1,61 @@
+"""Tests for the compiled tool argument validator"""
+
+import pytest
+
+from mcp_sse_server import ToolArgumentError, compile_schema, tools
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "per_page": {"type": "integer", "minimum": 1, "maximum": 100},
+        "status": {"type": "string", "enum": ["publish", "draft"]},
+        "ratio": {"type": "number"},
+        "sticky": {"type": "boolean"},
+        "ids": {
+            "type": "array",
+            "items": {"type": "integer", "minimum": 1},
+            "minItems": 1,
+            "maxItems": 3,
+            "uniqueItems": True
+        }
+    },
+    "required": ["status"]
+}
+
+validate = compile_schema(SCHEMA)
+
+
+def test_valid_arguments_pass():
+    validate({"status": "draft", "per_page": 100, "ratio": 0.5, "sticky": False, "ids": [1, 2, 3]})
+    validate({"status": "publish", "ratio": 2, "unknown": "ignored"})
+
+
+@pytest.mark.parametrize("arguments, message", [
+    ([], "arguments must be of type object"),
+    ({}, "arguments missing required field(s): status"),
+    ({"status": "trash"}, "arguments.status must be one of ['publish', 'draft']"),
+    ({"status": "draft", "per_page": 0}, "arguments.per_page must be >= 1"),
+    ({"status": "draft", "per_page": 101}, "arguments.per_page must be <= 100"),
+    ({"status": "draft", "per_page": "10"}, "arguments.per_page must be of type integer"),
+    ({"status": "draft", "per_page": 1.5}, "arguments.per_page must be of type integer"),
+    ({"status": "draft", "per_page": True}, "arguments.per_page must be of type integer"),
+    ({"status": "draft", "ratio": False}, "arguments.ratio must be of type number"),
+    ({"status": "draft", "sticky": 1}, "arguments.sticky must be of type boolean"),
+    ({"status": "draft", "ids": []}, "arguments.ids must contain at least 1 items"),
+    ({"status": "draft", "ids": [1, 2, 3, 4]}, "arguments.ids must contain at most 3 items"),
+    ({"status": "draft", "ids": [1, 1]}, "arguments.ids must contain unique items"),
+    ({"status": "draft", "ids": [1, 0]}, "arguments.ids[] must be >= 1"),
+    ({"status": "draft", "ids": [1, "2"]}, "arguments.ids[] must be of type integer"),
+])
+def test_invalid_arguments_are_rejected(arguments, message):
+    with pytest.raises(ToolArgumentError) as rejected:
+        validate(arguments)
+    assert str(rejected.value) == message
+
+
+def test_registry_rejects_unknown_tools_and_bad_arguments():
+    with pytest.raises(ToolArgumentError, match="Unknown tool: no_such_tool"):
+        tools.validate("no_such_tool", {})
+    with pytest.raises(ToolArgumentError, match="post_ids"):
+        tools.validate("get_posts_by_ids", {})
+    assert tools.validate("get_posts_by_ids", {"post_ids": [1, 2]}).name == "get_posts_by_ids"
@@ -0,0 +1,150 @@
+"""Tests for multi-site routing: the site registry, client lifetime and site-bound endpoints"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import mcp_sse_server
+from mcp_sse_server import SiteRegistry, ToolArgumentError, current_site, load_sites
+from conftest import FakeWordPress
+
+
+SHOP = {"url": "http://shop.test", "username": "admin", "password": "pw", "rate_limit": 5.0, "cache_ttl": 0}
+BLOG = {"url": "http://blog.test"}
+
+
+def test_without_sites_the_single_site_comes_from_wordpress_url(monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "WORDPRESS_URL", "http://wp.test/")
+    assert load_sites() == {"default": {"url": "http://wp.test/", "username": mcp_sse_server.WORDPRESS_USERNAME, "password": mcp_sse_server.WORDPRESS_PASSWORD}}
+
+
+@pytest.mark.parametrize("configured, error", [
+    ("[1, 2]", "must map site names"),
+    ("{oops", "must be a JSON object"),
+    ({"bad name": BLOG}, "may only contain"),
+    ({"blog": {"username": "x"}}, "needs a url"),
+    ({"blog": {**BLOG, "colour": "red"}}, "unknown settings: colour"),
+    ({"blog": {**BLOG, "auth": "oauth"}}, "expected one of basic, jwt"),
+])
+def test_malformed_registries_are_refused(monkeypatch, configured, error):
+    monkeypatch.setattr(mcp_sse_server, "SITES", configured)
+    with pytest.raises(ValueError, match=error):
+        load_sites()
+
+
+def test_sites_can_come_from_json(monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "SITES", json.dumps({"shop": SHOP, "blog": BLOG}))
+    assert load_sites() == {"shop": SHOP, "blog": BLOG}
+    with pytest.raises(ValueError, match="DEFAULT_SITE 'news'"):
+        SiteRegistry({"shop": SHOP}, "news", 600.0, 10)
+
+
+def test_calls_go_to_the_named_site_the_endpoint_site_or_the_default():
+    registry = SiteRegistry({"shop": SHOP, "blog": BLOG}, "", 600.0, 10)
+    assert registry.default == "shop" and registry.multiple
+    assert registry.resolve(None) == "shop"
+    assert registry.resolve("blog") == "blog"
+    with pytest.raises(ToolArgumentError, match="Unknown site: news"):
+        registry.resolve("news")
+    
+    token = current_site.set("blog")
+    try:
+        assert registry.resolve(None) == "blog"
+        with pytest.raises(ToolArgumentError, match="this endpoint serves 'blog'"):
+            registry.resolve("shop")
+    finally:
+        current_site.reset(token)
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "SITES", {"shop": SHOP, "blog": BLOG, "news": {"url": "http://news.test"}})
+    monkeypatch.setattr(mcp_sse_server, "MEDIA_INDEX_PATH", str(tmp_path / "media.sqlite3"))
+    return SiteRegistry(mcp_sse_server.SITES, "shop", 600.0, 2)
+
+
+def test_each_site_gets_its_own_client_and_settings(registry, tmp_path):
+    async def scenario():
+        try:
+            shop, blog = registry.get("shop"), registry.get("blog")
+            return shop, blog, registry.get("shop"), registry.stats()
+        finally:
+            await registry.close()
+    
+    shop, blog, again, stats = asyncio.run(scenario())
+    assert again is shop and shop is not blog
+    assert (shop.api_root, blog.api_root) == ("http://shop.test/wp-json", "http://blog.test/wp-json")
+    assert (shop.rate_limiter.rate, shop.posts_cache.enabled, blog.posts_cache.enabled) == (5.0, False, True)
+    assert (tmp_path / "media-shop.sqlite3").exists() and (tmp_path / "media-blog.sqlite3").exists()
+    assert stats["open"] == 2 and stats["created"] == 2
+    assert stats["clients"]["shop"]["rate_limit"] == 5.0
+
+
+def test_least_recently_used_idle_client_is_closed(registry):
+    async def scenario():
+        try:
+            registry.get("shop")
+            registry.get("blog")
+            async with registry.client("blog"):
+                registry.get("shop")
+                registry.get("news")  # blog is busy: shop goes although just used
+                opened = [wp.site for wp in registry.active()]
+            await asyncio.sleep(0)
+            return opened, registry.stats()
+        finally:
+            await registry.close()
+    
+    opened, stats = asyncio.run(scenario())
+    assert opened == ["blog", "news"]
+    assert stats["evicted"] == 1 and stats["created"] == 3
+
+
+def test_idle_clients_are_closed_in_the_background(registry, clock):
+    async def scenario():
+        registry.idle_timeout = 0.01
+        task = asyncio.ensure_future(registry.run())
+        try:
+            registry.get("shop")
+            clock.advance(1.0)
+            await asyncio.sleep(1.1)
+            return registry.stats()
+        finally:
+            task.cancel()
+            await registry.close()
+    
+    stats = asyncio.run(scenario())
+    assert stats["open"] == 0 and stats["evicted"] == 1
+
+
+def test_site_endpoints_serve_only_their_site(app_client, monkeypatch):
+    shop, blog = FakeWordPress(posts=3), FakeWordPress(posts=5)
+    
+    async def scenario():
+        registry = SiteRegistry({"shop": SHOP, "blog": BLOG}, "shop", 600.0, 10)
+        registry.started = True
+        for name, fake in (("shop", shop), ("blog", blog)):
+            wp = mcp_sse_server.WordPressMCP(f"http://{name}.test", "", "", site=name)
+            wp.client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+            registry._clients[name] = wp
+        monkeypatch.setattr(mcp_sse_server, "sites", registry)
+        
+        def call(request_id, **arguments):
+            return {"jsonrpc": "2.0", "method": "tools/call", "id": request_id, "params": {"name": "get_posts", "arguments": arguments}}
+        
+        async with app_client() as client:
+            return [
+                await client.post("/mcp", json=call(1)),
+                await client.post("/mcp", json=call(2, site="blog")),
+                await client.post("/sites/blog/mcp", json=call(3)),
+                await client.post("/sites/blog/mcp", json=call(4, site="shop")),
+                await client.post("/sites/news/mcp", json=call(5))
+            ]
+    
+    default, named, scoped, crossed, unknown = asyncio.run(scenario())
+    counts = [json.loads(response.json()["result"]["content"][0]["text"])["count"] for response in (default, named, scoped)]
+    assert counts == [3, 5, 5]
+    assert crossed.status_code == 400
+    assert "this endpoint serves 'blog'" in crossed.json()["error"]["message"]
+    assert unknown.status_code == 404
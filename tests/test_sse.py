@@ -0,0 +1,179 @@
+"""Tests for the SSE transport: sessions, the heartbeat wheel and stream lifetime"""
+
+import asyncio
+import json
+
+import pytest
+
+import mcp_sse_server
+from mcp_sse_server import HEARTBEAT_FRAME, HeartbeatWheel, SessionManager, SSESession, SSESessionResponse
+
+
+def test_heartbeats_go_only_to_idle_sessions_and_drops_are_counted(clock):
+    wheel = HeartbeatWheel(interval=15.0, slots=1)
+    idle, busy, full, closed = (SSESession(name, 1) for name in ("idle", "busy", "full", "closed"))
+    full.offer_frame(b"event: message\n\n")
+    closed.close()
+    for session in (idle, busy, full, closed):
+        wheel.add(session)
+    
+    clock.advance(15.0)
+    busy.last_sent = clock.monotonic()
+    wheel.tick()
+    
+    stats = wheel.stats()
+    assert (stats["heartbeats_sent"], stats["heartbeats_dropped"], stats["heartbeats_skipped"]) == (1, 2, 1)
+    assert idle.queue.get_nowait() == HEARTBEAT_FRAME
+    assert full.dropped == 1
+
+
+def test_wheel_visits_one_slot_per_tick(clock):
+    wheel = HeartbeatWheel(interval=15.0, slots=3)
+    sessions = [SSESession(str(n), 10) for n in range(6)]
+    for session in sessions:
+        wheel.add(session)
+    wheel.discard(sessions[0])
+    
+    clock.advance(15.0)
+    wheel.tick()
+    assert [session.queue.qsize() for session in sessions] == [0, 0, 0, 1, 0, 0]
+    wheel.tick()
+    wheel.tick()
+    assert [session.queue.qsize() for session in sessions] == [0, 1, 1, 1, 1, 1]
+    assert wheel.stats()["ticks"] == 3
+
+
+def test_stream_ends_and_session_is_removed_on_disconnect():
+    manager = SessionManager(max_sessions=10, queue_size=10)
+    sent = []
+    
+    async def scenario():
+        session = manager.create()
+        session.offer("endpoint", "/mcp?session_id=x")
+        response = SSESessionResponse(session, manager.remove)
+        disconnected = asyncio.Event()
+        
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+        
+        async def send(message):
+            sent.append(message)
+            if message.get("body", b"").startswith(b"event: endpoint"):
+                disconnected.set()
+        
+        await asyncio.wait_for(response({"type": "http"}, receive, send), 1.0)
+    
+    asyncio.run(scenario())
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[1]["body"] == b"event: endpoint\r\ndata: /mcp?session_id=x\r\n\r\n"
+    assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+    assert len(manager) == 0
+
+
+def test_session_whose_stream_never_starts_is_removed(monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "SSE_SEND_TIMEOUT", 0.02)
+    manager = SessionManager(max_sessions=1, queue_size=10)
+    
+    async def scenario():
+        SSESessionResponse(manager.create(), manager.remove)
+        assert manager.create() is None
+        await asyncio.sleep(0.05)
+        return manager.create()
+    
+    assert asyncio.run(scenario()) is not None
+    assert manager.stats()["rejected"] == 1
+
+
+def parse_frame(frame):
+    """(event, decoded data) of one encoded SSE frame"""
+    lines = frame.decode("utf-8").split("\r\n")
+    event = lines[0][len("event: "):]
+    data = "\n".join(line[len("data: "):] for line in lines[1:] if line.startswith("data: "))
+    return event, json.loads(data)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = SessionManager(max_sessions=10, queue_size=10)
+    monkeypatch.setattr(mcp_sse_server, "sessions", manager)
+    return manager
+
+
+def test_session_messages_are_accepted_and_answered_on_the_stream(manager, serve_site, app_client):
+    async def scenario():
+        serve_site()
+        session = manager.create()
+        async with app_client() as client:
+            url = f"/mcp?session_id={session.id}"
+            accepted = [
+                await client.post(url, json={"jsonrpc": "2.0", "method": "notifications/initialized"}),
+                await client.post(url, json={"jsonrpc": "2.0", "method": "tools/call", "id": 1, "params": {"name": "get_post", "arguments": {"post_id": 4}}}),
+                await client.post(url, json=[{"jsonrpc": "2.0", "method": "tools/list", "id": 2}, {"jsonrpc": "2.0", "method": "nope", "id": 3}]),
+            ]
+        frames = [await asyncio.wait_for(session.queue.get(), 1.0) for _ in range(2)]
+        return accepted, frames, session.queue.qsize()
+    
+    accepted, frames, left = asyncio.run(scenario())
+    assert [response.status_code for response in accepted] == [202, 202, 202]
+    assert all(response.content == b"" for response in accepted)
+    events, answers = zip(*(parse_frame(frame) for frame in frames))
+    assert events == ("message", "message")
+    single = next(answer for answer in answers if isinstance(answer, dict))
+    batch = next(answer for answer in answers if isinstance(answer, list))
+    assert single["id"] == 1
+    assert json.loads(single["result"]["content"][0]["text"])["post"]["title"] == "Post 4"
+    assert [response["id"] for response in batch] == [2, 3]
+    assert batch[1]["error"]["code"] == -32601
+    assert left == 0  # nothing for the notification
+
+
+def test_message_for_an_unknown_session_is_rejected(manager, app_client):
+    async def scenario():
+        async with app_client() as client:
+            return await client.post("/mcp?session_id=gone", json={"jsonrpc": "2.0", "method": "tools/list", "id": 1})
+    
+    response = asyncio.run(scenario())
+    assert response.status_code == 404
+    assert response.json()["error"] == {"code": -32600, "message": "Unknown SSE session: gone"}
+
+
+def test_closing_a_session_cancels_its_pending_work(manager):
+    async def scenario():
+        session = manager.create()
+        started = asyncio.Event()
+        
+        async def work():
+            started.set()
+            await asyncio.sleep(10)
+        
+        session.spawn(work())
+        await started.wait()
+        task = next(iter(session._tasks))
+        manager.remove(session)
+        await asyncio.sleep(0)
+        return session, task
+    
+    session, task = asyncio.run(scenario())
+    assert task.cancelled()
+    assert session.queue.get_nowait() is None  # wakes the stream writer
+    assert manager.get(session.id) is None and len(manager) == 0
+
+
+def test_slow_reader_is_disconnected_instead_of_buffered():
+    async def scenario():
+        session = SSESession("slow", 1)
+        first = await session.send("message", "{}")
+        second = await session.send("message", "{}", timeout=0.01)
+        return session, first, second
+    
+    session, first, second = asyncio.run(scenario())
+    assert (first, second) == (True, False)
+    assert session.closed
+
+
+def test_sessions_are_capped(manager):
+    manager.max_sessions = 2
+    assert manager.create() is not None and manager.create() is not None
+    assert manager.create() is None
+    assert manager.stats()["rejected"] == 1
@@ -0,0 +1,180 @@
+"""Tests for TokenAuth: token exchange, background refresh and the Basic auth fallback"""
+
+import asyncio
+import base64
+import json
+
+import httpx
+
+import mcp_sse_server
+from mcp_sse_server import TokenAuth
+
+BASIC = "Basic " + base64.b64encode(b"editor:secret").decode()
+
+
+def make_jwt(claims):
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+    return f"eyJhbGciOiJIUzI1NiJ9.{payload}.signature"
+
+
+class TokenEndpoint:
+    """Fake token endpoint answering with the queued responses, then the last one again"""
+    
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+    
+    async def __call__(self, url, credentials):
+        assert credentials == {"username": "editor", "password": "secret"}
+        self.calls += 1
+        response = self.responses[min(self.calls, len(self.responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def token_response(token):
+    return httpx.Response(200, json={"token": token})
+
+
+def make_auth(endpoint):
+    return TokenAuth("http://wp.test/wp-json/jwt-auth/v1/token", "editor", "secret", endpoint)
+
+
+async def settle():
+    """Let background refresh tasks run"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_requests_share_one_exchange(clock):
+    endpoint = TokenEndpoint(token_response("t1"))
+    
+    async def scenario():
+        auth = make_auth(endpoint)
+        return await asyncio.gather(*(auth.token() for _ in range(10)))
+    
+    assert asyncio.run(scenario()) == ["t1"] * 10
+    assert endpoint.calls == 1
+
+
+def test_token_is_refreshed_in_the_background_before_expiry(clock):
+    first = make_jwt({"exp": clock.time() + 600})
+    endpoint = TokenEndpoint(token_response(first), token_response("t2"))
+    
+    async def scenario():
+        auth = make_auth(endpoint)
+        assert await auth.token() == first
+        clock.advance(299)
+        assert await auth.token() == first
+        assert endpoint.calls == 1
+        
+        clock.advance(2)
+        assert await auth.token() == first
+        await settle()
+        return await auth.token()
+    
+    assert asyncio.run(scenario()) == "t2"
+    assert endpoint.calls == 2
+
+
+def test_failed_refresh_keeps_the_token_and_backs_off(clock):
+    endpoint = TokenEndpoint(token_response("t1"), httpx.Response(500, text="boom"))
+    
+    async def scenario():
+        auth = make_auth(endpoint)
+        await auth.token()
+        clock.advance(mcp_sse_server.WORDPRESS_TOKEN_TTL - mcp_sse_server.WORDPRESS_TOKEN_REFRESH_MARGIN)
+        for _ in range(20):
+            assert await auth.token() == "t1"
+            await settle()
+        assert endpoint.calls == 2
+        
+        clock.advance(mcp_sse_server.WORDPRESS_TOKEN_RETRY_INTERVAL)
+        assert await auth.token() == "t1"
+        await settle()
+        return auth
+    
+    auth = asyncio.run(scenario())
+    assert endpoint.calls == 3
+    assert auth.stats()["mode"] == "jwt"
+    assert auth.failures == 2
+
+
+def test_missing_token_endpoint_falls_back_to_basic_for_good(clock):
+    endpoint = TokenEndpoint(httpx.Response(404, json={"code": "rest_no_route"}))
+    
+    async def scenario():
+        auth = make_auth(endpoint)
+        assert await auth.token() is None
+        clock.advance(86400)
+        return await auth.token()
+    
+    assert asyncio.run(scenario()) is None
+    assert endpoint.calls == 1
+
+
+def test_failed_exchange_uses_basic_until_the_retry_interval(clock):
+    endpoint = TokenEndpoint(httpx.ConnectError("refused"), httpx.Response(403, json={}), token_response("t1"))
+    
+    async def scenario():
+        auth = make_auth(endpoint)
+        assert await auth.token() is None
+        assert await auth.token() is None
+        assert endpoint.calls == 1
+        
+        clock.advance(mcp_sse_server.WORDPRESS_TOKEN_RETRY_INTERVAL)
+        assert await auth.token() is None
+        clock.advance(mcp_sse_server.WORDPRESS_TOKEN_RETRY_INTERVAL)
+        return auth, await auth.token()
+    
+    auth, token = asyncio.run(scenario())
+    assert token == "t1"
+    assert endpoint.calls == 3
+    assert auth.last_error is None
+
+
+def test_rejected_token_is_replaced_and_the_request_resent(clock):
+    endpoint = TokenEndpoint(token_response("t1"), token_response("t2"))
+    seen = []
+    
+    def site(request):
+        seen.append(request.headers["Authorization"])
+        if request.headers["Authorization"] == "Bearer t1":
+            return httpx.Response(403, json={"code": "jwt_auth_invalid_token"})
+        return httpx.Response(200, json={"id": 1})
+    
+    async def scenario():
+        async with httpx.AsyncClient(auth=make_auth(endpoint), transport=httpx.MockTransport(site)) as client:
+            return await client.post("http://wp.test/wp-json/wp/v2/posts", json={"title": "x"})
+    
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert seen == ["Bearer t1", "Bearer t2"]
+
+
+def test_requests_without_a_token_use_basic_auth(clock):
+    endpoint = TokenEndpoint(httpx.Response(404))
+    seen = []
+    
+    def site(request):
+        seen.append(request.headers["Authorization"])
+        return httpx.Response(200, json=[])
+    
+    async def scenario():
+        auth = make_auth(endpoint)
+        async with httpx.AsyncClient(auth=auth, transport=httpx.MockTransport(site)) as client:
+            await client.get("http://wp.test/wp-json/wp/v2/posts")
+        return auth
+    
+    auth = asyncio.run(scenario())
+    assert seen == [BASIC]
+    assert auth.stats()["mode"] == "basic"
+    assert auth.basic_requests == 1
+
+
+def test_jwt_expiry_reads_the_exp_claim():
+    assert TokenAuth.jwt_expiry(make_jwt({"exp": 1700000000})) == 1700000000.0
+    assert TokenAuth.jwt_expiry(make_jwt({"sub": "1"})) is None
+    assert TokenAuth.jwt_expiry(make_jwt({"exp": True})) is None
+    assert TokenAuth.jwt_expiry("not-a-jwt") is None
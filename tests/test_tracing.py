@@ -0,0 +1,126 @@
+"""Tests for request tracing: spans, the Server-Timing header, OTLP export and the sampling profiler"""
+
+import asyncio
+import json
+
+import pytest
+
+import mcp_sse_server
+from mcp_sse_server import NULL_SPAN, SPAN_CLIENT, SPAN_SERVER, SamplingProfiler, Trace, TraceExporter, span
+
+
+def timing_phases(header):
+    """{phase: description or None} of a Server-Timing header"""
+    phases = {}
+    for part in header.split(", "):
+        name, *params = part.split(";")
+        phases[name] = next((param[len("desc="):].strip('"') for param in params if param.startswith("desc=")), None)
+    return phases
+
+
+def test_tool_call_reports_its_phases(wordpress, serve_site, app_client):
+    async def scenario():
+        serve_site()
+        async with app_client() as client:
+            return await client.post("/mcp", json={
+                "jsonrpc": "2.0", "method": "tools/call", "id": 1,
+                "params": {"name": "delete_posts", "arguments": {"post_ids": [1, 2]}}
+            })
+    
+    response = asyncio.run(scenario())
+    assert response.status_code == 200
+    phases = timing_phases(response.headers["Server-Timing"])
+    assert {"parse", "dispatch", "validate", "admission", "tool", "upstream", "serialize", "total"} <= set(phases)
+    assert phases["upstream"] == "3x"  # batch probe and two deletes
+    assert list(phases)[-1] == "total"
+
+
+def test_server_timing_can_be_turned_off(app_client, monkeypatch):
+    monkeypatch.setattr(mcp_sse_server, "TRACE_SERVER_TIMING", False)
+    
+    async def scenario():
+        async with app_client() as client:
+            return await client.post("/mcp", json={"jsonrpc": "2.0", "method": "nope", "id": 1})
+    
+    assert "Server-Timing" not in asyncio.run(scenario()).headers
+
+
+def test_spans_nest_and_export_as_otlp():
+    assert span("outside a request") is NULL_SPAN
+    
+    with Trace("POST /mcp", **{"mcp.session_id": "abc"}) as trace:
+        with span("dispatch", **{"rpc.method": "tools/call"}) as dispatch:
+            with span("upstream", SPAN_CLIENT, retries=2, cached=False) as upstream:
+                upstream.set("http.response.status_code", 200)
+    
+    exported = trace.to_otlp()["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_name = {record["name"]: record for record in exported}
+    assert [record["name"] for record in exported] == ["upstream", "dispatch", "POST /mcp"]
+    assert by_name["upstream"]["parentSpanId"] == dispatch.span_id
+    assert by_name["dispatch"]["parentSpanId"] == trace.root.span_id
+    assert "parentSpanId" not in by_name["POST /mcp"]
+    assert (by_name["POST /mcp"]["kind"], by_name["upstream"]["kind"]) == (SPAN_SERVER, SPAN_CLIENT)
+    assert {record["traceId"] for record in exported} == {trace.trace_id}
+    assert by_name["upstream"]["attributes"] == [
+        {"key": "retries", "value": {"intValue": "2"}},
+        {"key": "cached", "value": {"boolValue": False}},
+        {"key": "http.response.status_code", "value": {"intValue": "200"}}
+    ]
+    assert int(by_name["upstream"]["startTimeUnixNano"]) >= int(by_name["POST /mcp"]["startTimeUnixNano"])
+
+
+def test_exporter_samples_buffers_and_writes_lines(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(TraceExporter, "MAX_PENDING", 2)
+    exporter = TraceExporter(str(path), sample_rate=1.0)
+    for name in ("first", "second", "third"):
+        with Trace(name) as trace:
+            pass
+        exporter.export(trace)
+    TraceExporter(str(path), sample_rate=0.0).export(trace)
+    
+    asyncio.run(exporter.flush())
+    lines = path.read_text(encoding="utf-8").splitlines()
+    names = [json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["name"] for line in lines]
+    assert names == ["first", "second"]
+    assert exporter.stats() == {"path": str(path), "pending": 0, "exported": 2, "dropped": 1}
+
+
+@pytest.fixture
+def admin(monkeypatch, tmp_path):
+    monkeypatch.setattr(mcp_sse_server, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(mcp_sse_server, "profiler", SamplingProfiler(str(tmp_path)))
+    return {"Authorization": "Bearer s3cret"}
+
+
+def test_profiler_records_folded_stacks(admin, app_client):
+    async def scenario():
+        async with app_client() as client:
+            denied = await client.post("/admin/profile", headers={"Authorization": "Bearer wrong"})
+            invalid = await client.post("/admin/profile?seconds=0", headers=admin)
+            started = await client.post("/admin/profile?seconds=0.05&interval=0.005", headers=admin)
+            busy = await client.post("/admin/profile?seconds=0.05", headers=admin)
+            not_ready = await client.get("/admin/profile?download=true", headers=admin)
+            while mcp_sse_server.profiler.running:
+                await asyncio.sleep(0.01)
+            download = await client.get("/admin/profile?download=true", headers=admin)
+        return denied, invalid, started, busy, not_ready, download
+    
+    denied, invalid, started, busy, not_ready, download = asyncio.run(scenario())
+    assert denied.status_code == 401 and denied.headers["WWW-Authenticate"] == "Bearer"
+    assert invalid.status_code == 400
+    assert started.status_code == 202
+    assert (busy.status_code, not_ready.status_code) == (409, 409)
+    assert download.status_code == 200
+    lines = download.text.splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == mcp_sse_server.profiler.samples
+
+
+def test_admin_endpoints_are_off_without_a_token(app_client):
+    async def scenario():
+        async with app_client() as client:
+            return await client.get("/admin/profile")
+    
+    response = asyncio.run(scenario())
+    assert response.status_code == 404
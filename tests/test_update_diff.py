@@ -0,0 +1,84 @@
+"""Tests for diff-aware updates: update_post and update_posts send only changed fields"""
+
+import asyncio
+import json
+
+import pytest
+
+
+def sent_updates(wordpress):
+    """Bodies of the single-post writes and batched writes WordPress received"""
+    bodies = [
+        json.loads(request.content) for request in wordpress.requests
+        if request.method == "POST" and request.url.path.startswith("/wp-json/wp/v2/posts/")
+    ]
+    bodies += [item["body"] for batch in wordpress.batches for item in batch]
+    return bodies
+
+
+def test_unchanged_update_is_skipped(wordpress, make_client):
+    async def scenario():
+        return await make_client().update_post(1, title="Post 1", content="<p>Content 1</p>")
+    
+    result = asyncio.run(scenario())
+    assert result["success"] and result["skipped"]
+    assert result["changed_fields"] == []
+    assert result["bytes_saved"] > 0
+    assert wordpress.updates == 0
+
+
+def test_only_changed_fields_are_sent(wordpress, make_client):
+    async def scenario():
+        wp = make_client()
+        first = await wp.update_post(1, title="New title", content="<p>Content 1</p>")
+        wordpress.requests.clear()
+        second = await wp.update_post(1, title="New title", content="<p>Content 1</p>")
+        return wp, first, second
+    
+    wp, first, second = asyncio.run(scenario())
+    assert first["changed_fields"] == ["title"]
+    assert sent_updates(wordpress) == []
+    assert second["skipped"]
+    # The remembered raw values are revalidated with modified_gmt only
+    assert [request.url.params["_fields"] for request in wordpress.requests] == ["modified_gmt"]
+    assert wp.updates_skipped == 1
+
+
+@pytest.mark.parametrize("batch_max_items", [None, 2])
+def test_bulk_update_diffs_each_post_with_or_without_batching(wordpress, make_client, batch_max_items):
+    wordpress.batch_max_items = batch_max_items
+    
+    async def scenario():
+        wp = make_client()
+        return wp, await wp.update_posts([
+            {"post_id": 1, "title": "Post 1"},
+            {"post_id": 2, "title": "Retitled", "content": "<p>Content 2</p>"},
+            {"post_id": 999, "title": "Missing"},
+            {"post_id": 3, "excerpt": "New excerpt"},
+            {"post_id": 4}
+        ])
+    
+    wp, summary = asyncio.run(scenario())
+    results = summary["results"]
+    assert [result["success"] for result in results] == [True, True, False, True, False]
+    assert [result.get("skipped") for result in results] == [True, False, None, False, None]
+    assert results[1]["changed_fields"] == ["title"]
+    assert results[3]["changed_fields"] == ["excerpt"]
+    assert "404" in results[2]["message"]
+    assert sorted(sent_updates(wordpress), key=str) == [{"excerpt": "New excerpt"}, {"title": "Retitled"}]
+    assert wordpress.updates == 2
+    assert wp.update_bytes_saved == sum(result.get("bytes_saved", 0) for result in results)
+    assert wordpress.posts[2]["title"]["raw"] == "Retitled"
+
+
+def test_bulk_no_op_retag_sends_nothing(wordpress, make_client):
+    wordpress.batch_max_items = 10
+    
+    async def scenario():
+        return await make_client().update_posts([{"post_id": n, "title": f"Post {n}"} for n in range(1, 6)])
+    
+    summary = asyncio.run(scenario())
+    assert summary["succeeded"] == 5
+    assert all(result["skipped"] for result in summary["results"])
+    assert wordpress.batches == []
+    assert wordpress.updates == 0
@@ -0,0 +1,105 @@
+"""Tests for upstream protection: CircuitBreaker and AIMDLimiter"""
+
+import asyncio
+
+import pytest
+
+from mcp_sse_server import AIMDLimiter, CircuitBreaker, CircuitOpenError
+
+
+def test_circuit_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.before_request()
+    assert breaker.state == "closed"
+    
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_half_open_circuit_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+    clock.advance(10.0)
+    
+    breaker.before_request()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_request()
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+    clock.advance(10.0)
+    breaker.before_request()
+    breaker.record_failure()
+    
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+    clock.advance(5.0)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_probe_that_never_reports_back_is_replaced(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+    clock.advance(10.0)
+    breaker.before_request()
+    clock.advance(10.0)
+    breaker.before_request()
+    assert breaker.state == "half_open"
+
+
+def test_aimd_limit_holds_callers_over_the_limit():
+    async def scenario():
+        limiter = AIMDLimiter(initial=2, minimum=1, maximum=4, latency_target=1.0)
+        await limiter.acquire()
+        await limiter.acquire()
+        third = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not third.done()
+        assert limiter.waiting == 1
+        
+        await limiter.release(0.01, overloaded=False)
+        await asyncio.wait_for(third, 1.0)
+        return limiter
+    
+    limiter = asyncio.run(scenario())
+    assert limiter.in_use == 2
+    assert limiter.limit == pytest.approx(2.5)
+
+
+def test_aimd_limit_grows_to_maximum_and_halves_once_per_interval(clock):
+    async def scenario():
+        limiter = AIMDLimiter(initial=2, minimum=1, maximum=4, latency_target=1.0)
+        for _ in range(20):
+            await limiter.acquire()
+            await limiter.release(0.01, overloaded=False)
+        assert limiter.limit == 4
+        
+        clock.advance(5.0)
+        for _ in range(2):
+            await limiter.acquire()
+        await limiter.release(0.01, overloaded=True)
+        await limiter.release(2.0, overloaded=False)
+        assert limiter.limit == 2
+        
+        for _ in range(3):
+            clock.advance(1.0)
+            await limiter.acquire()
+            await limiter.release(0.01, overloaded=True)
+        return limiter
+    
+    assert asyncio.run(scenario()).limit == 1
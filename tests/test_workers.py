@@ -0,0 +1,118 @@
+"""Tests for multi-worker state: SharedCache, SessionRouter and the state directory"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from mcp_sse_server import SessionManager, SessionRouter, SharedCache, private_directory
+
+
+def test_shared_entries_belong_to_a_generation(tmp_path, clock):
+    async def scenario():
+        first = SharedCache(str(tmp_path / "cache.sqlite3"), ttl=30.0)
+        second = SharedCache(str(tmp_path / "cache.sqlite3"), ttl=30.0)
+        try:
+            generation = await first.generation()
+            await first.set("posts:10:1:", generation, {"count": 1}, ['"v1"', None])
+            seen = await second.get("posts:10:1:", generation)
+            bumped = await second.bump_generation()
+            after_bump = (await first.generation(), await first.get("posts:10:1:", generation))
+            await first.set("posts:10:1:", bumped, {"count": 2})
+            clock.advance(31.0)
+            expired = await second.get("posts:10:1:", bumped)
+        finally:
+            await first.close()
+            await second.close()
+        return generation, seen, bumped, after_bump, expired, first.stats()
+    
+    generation, seen, bumped, after_bump, expired, stats = asyncio.run(scenario())
+    assert seen == ({"count": 1}, ['"v1"', None])
+    assert bumped == generation + 1
+    assert after_bump == (bumped, None)
+    assert expired is None
+    assert (stats["hits"], stats["misses"]) == (0, 1)
+
+
+def test_workers_share_listings_and_invalidate_each_other(wordpress, make_client, tmp_path):
+    async def scenario():
+        caches = [SharedCache(str(tmp_path / "cache.sqlite3"), ttl=30.0) for _ in range(2)]
+        first, second = (make_client(shared=cache) for cache in caches)
+        try:
+            await first.get_posts(per_page=5)
+            from_shared = await second.get_posts(per_page=5)
+            listings = len(wordpress.paths())
+            await first.update_post(2, title="Written by the first worker")
+            refreshed = await second.get_posts(per_page=5)
+        finally:
+            for cache in caches:
+                await cache.close()
+        return from_shared, listings, refreshed
+    
+    from_shared, listings, refreshed = asyncio.run(scenario())
+    assert from_shared["count"] == 5
+    assert listings == 1
+    assert refreshed["posts"][1]["title"] == "Written by the first worker"
+
+
+@pytest.fixture
+def routers(tmp_path):
+    """Two workers' routers, "a" and "b", each with its own sessions"""
+    def make(node):
+        manager = SessionManager(max_sessions=10, queue_size=10)
+        manager.node = node
+        return SessionRouter(str(tmp_path), node, manager)
+    return make("a"), make("b")
+
+
+def test_messages_are_forwarded_to_the_owning_worker(routers):
+    a, b = routers
+    
+    async def scenario():
+        await b.start()
+        try:
+            session = b.manager.create()
+            status = await a.forward(session.id, {"jsonrpc": "2.0", "method": "tools/list", "id": 9})
+            frame = await asyncio.wait_for(session.queue.get(), 1.0)
+            unknown = await a.forward("b.missing", {"jsonrpc": "2.0", "method": "tools/list", "id": 10})
+        finally:
+            await b.close()
+        return session, status, frame, unknown
+    
+    session, status, frame, unknown = asyncio.run(scenario())
+    assert session.id.startswith("b.")
+    assert status == 202
+    assert json.loads(frame.decode("utf-8").split("data: ", 1)[1])["id"] == 9
+    assert unknown == 404
+    assert (a.forwarded, b.received) == (2, 2)
+    assert not os.path.exists(b.socket_path("b"))
+
+
+def test_sessions_without_a_live_owner_are_not_found(routers):
+    a, _ = routers
+    
+    async def scenario():
+        return [
+            await a.forward("b.0123", {}),  # worker b isn't listening
+            await a.forward("a.0123", {}),  # our own session would have been found locally
+            await a.forward("0123", {})  # single-process session ID
+        ]
+    
+    assert asyncio.run(scenario()) == [404, 404, 404]
+    assert a.failed == 0
+
+
+def test_state_directory_must_be_private(tmp_path):
+    path = str(tmp_path / "state")
+    assert private_directory(path) == path
+    assert os.stat(path).st_mode & 0o777 == 0o700
+    assert private_directory(path) == path
+    
+    os.chmod(path, 0o755)
+    with pytest.raises(RuntimeError, match="accessible to other users"):
+        private_directory(path)
+    
+    os.symlink(str(tmp_path), str(tmp_path / "link"))
+    with pytest.raises(RuntimeError, match="symlinks are not accepted"):
+        private_directory(str(tmp_path / "link"))